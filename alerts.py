@@ -0,0 +1,294 @@
+import itertools
+import json
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Lowest to highest
+PRIORITIES = ("Low", "Medium", "High", "Critical")
+RANK = {priority: rank for rank, priority in enumerate(PRIORITIES)}
+# Seconds before another alert of the same kind for the same resident is sent;
+# one of higher priority always goes through
+DEDUP_SECONDS = {"fall": 60, "at_risk": 15 * 60, "unusual": 30 * 60, "inactivity": 60 * 60}
+DEFAULT_DEDUP_SECONDS = 10 * 60
+# Unacknowledged alerts of these priorities are sent again, one level up
+# (Critical stays Critical), after this many seconds
+ESCALATION_SECONDS = {"Critical": 2 * 60, "High": 10 * 60}
+MAX_ESCALATIONS = 2
+
+
+# One alert as dispatched. text is the formatted message the channels send;
+# root is the id of the first alert of an escalation chain.
+class Alert:
+    __slots__ = ("alert_id", "resident_id", "kind", "message", "priority", "emergency", "text", "ts",
+                 "escalations", "root", "dispatched_at")
+
+    def __init__(self, alert_id, resident_id, kind, message, priority, emergency, text, ts, escalations=0, root=None):
+        self.alert_id = alert_id
+        self.resident_id = resident_id
+        self.kind = kind
+        self.message = message
+        self.priority = priority
+        self.emergency = emergency
+        self.text = text
+        self.ts = ts
+        self.escalations = escalations
+        self.root = alert_id if root is None else root
+        self.dispatched_at = time.perf_counter()
+
+    def to_dict(self):
+        return {
+            "id": self.alert_id, "resident": self.resident_id, "kind": self.kind, "priority": self.priority,
+            "emergency": self.emergency, "message": self.text, "ts": self.ts, "escalations": self.escalations,
+            "root": self.root,
+        }
+
+
+# rate tokens per second up to burst; take() spends one if there is one
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+# A delivery target for alerts at or above min_priority. deliver() runs on a
+# pipeline worker and raises to have the alert retried.
+class Channel:
+    name = "channel"
+
+    def __init__(self, min_priority="Low"):
+        self.min_priority = min_priority
+
+    def accepts(self, alert):
+        return RANK[alert.priority] >= RANK[self.min_priority]
+
+    def deliver(self, alert):
+        raise NotImplementedError
+
+
+# Appends each alert to a JSON Lines file
+class LogChannel(Channel):
+    name = "log"
+
+    def __init__(self, path, min_priority="Low"):
+        super().__init__(min_priority)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def deliver(self, alert):
+        line = json.dumps(alert.to_dict()) + "\n"
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+# POSTs each alert as JSON; stands in for a pager or SMS gateway
+class WebhookChannel(Channel):
+    name = "webhook"
+
+    def __init__(self, url, min_priority="High", timeout=5.0):
+        super().__init__(min_priority)
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, alert):
+        body = json.dumps(alert.to_dict()).encode()
+        request = urllib.request.Request(self.url, body, {"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+# Speaks each alert through speak(text, language, priority)
+class AudioChannel(Channel):
+    name = "audio"
+
+    def __init__(self, speak, language=lambda: "en", min_priority="Low"):
+        super().__init__(min_priority)
+        self.speak = speak
+        self.language = language
+
+    def deliver(self, alert):
+        self.speak(alert.text, self.language(), alert.priority)
+
+
+# Decides which alerts go out and fans them out to the channels.
+# dispatch() drops an alert when the same kind was sent for the resident
+# within its dedup window, or when the resident's token bucket is empty
+# (Critical alerts are never rate limited). Sent alerts are handed to
+# on_dispatch(alert) on the caller's thread, then delivered to every channel
+# that accepts them, with retries and exponential backoff. Each channel has
+# its own worker pool so a slow or failing webhook never holds up the log.
+# High and Critical alerts are escalated through set_timer/cancel_timer (a
+# MonitoringEngine's) until acknowledge() is called.
+class AlertPipeline:
+    def __init__(self, channels, clock=time.time, workers=4, retries=3, backoff=0.5, rate=20 / 3600, burst=5,
+                 dedup_seconds=None, escalation_seconds=None, formatter=None, set_timer=None, cancel_timer=None,
+                 on_dispatch=None, latency_samples=1000):
+        self.channels = []
+        self.clock = clock
+        self.retries = retries
+        self.backoff = backoff
+        self.rate = rate
+        self.burst = burst
+        self.dedup_seconds = DEDUP_SECONDS if dedup_seconds is None else dedup_seconds
+        self.escalation_seconds = ESCALATION_SECONDS if escalation_seconds is None else escalation_seconds
+        self.formatter = formatter or (lambda message, emergency, priority: message)
+        self.set_timer = set_timer
+        self.cancel_timer = cancel_timer
+        self.on_dispatch = on_dispatch
+        self.workers = workers
+        self.latency_samples = latency_samples
+        self.pools = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.last_sent = {}  # (resident_id, kind) -> (ts, priority rank) of the last alert sent
+        self.buckets = {}  # resident_id -> TokenBucket
+        self.open = {}  # root alert id -> latest Alert of a chain awaiting acknowledgement
+        self.dispatched = 0
+        self.suppressed = {"duplicate": 0, "rate_limited": 0}
+        self.escalated = 0
+        self.acknowledged = 0
+        self.retried = 0
+        self.delivered = {}
+        self.failed = {}
+        self.latencies = {}
+        for channel in channels:
+            self.add_channel(channel)
+
+    def add_channel(self, channel):
+        with self.lock:
+            self.channels.append(channel)
+            self.pools[channel.name] = ThreadPoolExecutor(self.workers, f"alerts-{channel.name}")
+            self.delivered[channel.name] = 0
+            self.failed[channel.name] = 0
+            self.latencies[channel.name] = deque(maxlen=self.latency_samples)
+
+    # The Alert when sent, or None when suppressed
+    def dispatch(self, resident_id, kind, message, priority="Medium", emergency=False):
+        now = self.clock()
+        rank = RANK[priority]
+        with self.lock:
+            last = self.last_sent.get((resident_id, kind))
+            if last is not None and now - last[0] < self.dedup_seconds.get(kind, DEFAULT_DEDUP_SECONDS) and rank <= last[1]:
+                self.suppressed["duplicate"] += 1
+                return None
+            if priority != "Critical":
+                bucket = self.buckets.get(resident_id)
+                if bucket is None:
+                    bucket = self.buckets[resident_id] = TokenBucket(self.rate, self.burst, now)
+                if not bucket.take(now):
+                    self.suppressed["rate_limited"] += 1
+                    return None
+            self.last_sent[(resident_id, kind)] = (now, rank)
+            alert = self._new(resident_id, kind, message, priority, emergency, now)
+        self._send(alert)
+        return alert
+
+    def _new(self, resident_id, kind, message, priority, emergency, now, escalations=0, root=None):
+        text = self.formatter(message, emergency, priority)
+        return Alert(next(self.ids), resident_id, kind, message, priority, emergency, text, now, escalations, root)
+
+    def _send(self, alert):
+        with self.lock:
+            self.dispatched += 1
+        if self.on_dispatch is not None:
+            self.on_dispatch(alert)
+        for channel in self.channels:
+            if channel.accepts(alert):
+                self.pools[channel.name].submit(self._deliver, alert, channel)
+        delay = self.escalation_seconds.get(alert.priority)
+        if delay is not None and self.set_timer is not None and alert.escalations < MAX_ESCALATIONS:
+            with self.lock:
+                self.open[alert.root] = alert
+            self.set_timer(("escalate", alert.root), alert.ts + delay, lambda: self._escalate(alert.root))
+
+    def _deliver(self, alert, channel):
+        for attempt in range(self.retries + 1):
+            try:
+                channel.deliver(alert)
+                with self.lock:
+                    self.delivered[channel.name] += 1
+                    self.latencies[channel.name].append(time.perf_counter() - alert.dispatched_at)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    with self.lock:
+                        self.failed[channel.name] += 1
+                    print(f"Alert {alert.alert_id} not delivered to {channel.name}: {e}")
+                    return
+                with self.lock:
+                    self.retried += 1
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _escalate(self, root):
+        with self.lock:
+            alert = self.open.pop(root, None)
+            if alert is None:
+                return  # acknowledged meanwhile
+            self.escalated += 1
+            priority = PRIORITIES[min(RANK[alert.priority] + 1, len(PRIORITIES) - 1)]
+            minutes = round((self.clock() - alert.ts) / 60)
+            escalated = self._new(
+                alert.resident_id, alert.kind, f"Not acknowledged after {minutes} min: {alert.message}", priority,
+                True, self.clock(), alert.escalations + 1, root,
+            )
+        self._send(escalated)
+
+    # Stops escalation of the chain the alert id belongs to; returns its
+    # latest Alert, or None when it was not awaiting acknowledgement
+    def acknowledge(self, alert_id):
+        with self.lock:
+            for root, alert in self.open.items():
+                if alert_id in (root, alert.alert_id):
+                    del self.open[root]
+                    self.acknowledged += 1
+                    break
+            else:
+                return None
+        if self.cancel_timer is not None:
+            self.cancel_timer(("escalate", root))
+        return alert
+
+    def open_alerts(self):
+        with self.lock:
+            return [alert.to_dict() for alert in self.open.values()]
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=True)
+
+    def stats(self):
+        with self.lock:
+            latency = {}
+            for name, samples in self.latencies.items():
+                samples = sorted(samples)
+                latency[name] = {
+                    "p50_ms": round(samples[len(samples) // 2] * 1000, 3) if samples else None,
+                    "p99_ms": round(samples[int(len(samples) * 0.99)] * 1000, 3) if samples else None,
+                    "max_ms": round(samples[-1] * 1000, 3) if samples else None,
+                }
+            return {
+                "dispatched": self.dispatched,
+                "suppressed": dict(self.suppressed),
+                "delivered": dict(self.delivered),
+                "failed": dict(self.failed),
+                "retried": self.retried,
+                "escalated": self.escalated,
+                "acknowledged": self.acknowledged,
+                "open": len(self.open),
+                "latency": latency,
+            }
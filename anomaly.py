@@ -0,0 +1,243 @@
+import bisect
+import math
+
+METRICS = ("heart_rate", "systolic", "diastolic", "glucose")
+METRIC_LABELS = {
+    "heart_rate": "heart rate",
+    "systolic": "systolic pressure",
+    "diastolic": "diastolic pressure",
+    "glucose": "glucose",
+}
+# Smallest spread a baseline is credited with, so a resident whose readings
+# barely move is not flagged for ordinary jitter
+MIN_SPREAD = {"heart_rate": 3.0, "systolic": 5.0, "diastolic": 4.0, "glucose": 8.0}
+
+# Weight of each new reading in the moving mean and variance (about the last 40 readings)
+EWMA_ALPHA = 0.05
+# Readings needed before a baseline flags anything
+WARMUP_READINGS = 20
+# Standard deviations from the moving mean that count as unusual
+Z_THRESHOLD = 4.0
+# Usual range: the 5th to 95th percentile of the resident's readings
+LOW_QUANTILE = 0.05
+HIGH_QUANTILE = 0.95
+
+
+# Exponentially weighted mean and variance
+class Ewma:
+    __slots__ = ("alpha", "mean", "var", "primed")
+
+    def __init__(self, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self.mean = 0.0
+        self.var = 0.0
+        self.primed = False
+
+    def add(self, x):
+        if not self.primed:
+            self.mean = x
+            self.primed = True
+            return
+        diff = x - self.mean
+        increment = self.alpha * diff
+        self.mean += increment
+        self.var = (1 - self.alpha) * (self.var + diff * increment)
+
+
+# Welford's running count, mean and variance over every reading
+class Welford:
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.count += 1
+        diff = x - self.mean
+        self.mean += diff / self.count
+        self.m2 += diff * (x - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+# P² estimate of one quantile (Jain and Chlamtac, 1985): five markers whose
+# heights are nudged towards the quantile as readings arrive, so no readings
+# are kept
+class P2Quantile:
+    __slots__ = ("p", "heights", "positions", "count")
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.count = 0
+
+    def add(self, x):
+        q = self.heights
+        self.count += 1
+        if self.count <= 5:
+            bisect.insort(q, x)
+            return
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            n[1] += 1
+            n[2] += 1
+            n[3] += 1
+        elif x < q[1]:
+            n[1] += 1
+            n[2] += 1
+            n[3] += 1
+        elif x < q[2]:
+            n[2] += 1
+            n[3] += 1
+        elif x < q[3]:
+            n[3] += 1
+        elif x > q[4]:
+            q[4] = x
+        n[4] += 1
+        # Move a middle marker one place when it is a place or more from
+        # where the quantile puts it after count readings
+        p, last = self.p, self.count - 1
+        delta = 1 + last * p / 2 - n[1]
+        if (delta >= 1 and n[2] - n[1] > 1) or (delta <= -1 and n[0] - n[1] < -1):
+            self._move(1, 1 if delta > 0 else -1)
+        delta = 1 + last * p - n[2]
+        if (delta >= 1 and n[3] - n[2] > 1) or (delta <= -1 and n[1] - n[2] < -1):
+            self._move(2, 1 if delta > 0 else -1)
+        delta = 1 + last * (1 + p) / 2 - n[3]
+        if (delta >= 1 and n[4] - n[3] > 1) or (delta <= -1 and n[2] - n[3] < -1):
+            self._move(3, 1 if delta > 0 else -1)
+
+    # Piecewise-parabolic height for marker i moved by d, or linear when the
+    # parabola would leave the neighbouring markers' range
+    def _move(self, i, d):
+        q, n = self.heights, self.positions
+        height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+        if not q[i - 1] < height < q[i + 1]:
+            height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+        q[i] = height
+        n[i] += d
+
+    def value(self):
+        q = self.heights
+        if len(q) == 5:
+            return q[2]
+        if not q:
+            return None
+        return q[round(self.p * (len(q) - 1))]
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+class Anomaly:
+    __slots__ = ("metric", "value", "expected", "spread", "z", "low", "high")
+
+    def __init__(self, metric, value, expected, spread, z, low, high):
+        self.metric = metric
+        self.value = value
+        self.expected = expected
+        self.spread = spread
+        self.z = z
+        self.low = low
+        self.high = high
+
+    def describe(self):
+        return (
+            f"{METRIC_LABELS[self.metric]} {self.value:g} (usual {self.expected:.0f} ± {self.spread:.0f}, "
+            f"range {self.low:.0f}-{self.high:.0f})"
+        )
+
+
+# One metric's baseline: moving mean and spread, lifetime mean and spread,
+# and the usual range. Constant memory however many readings it has seen.
+class MetricBaseline:
+    __slots__ = ("metric", "min_spread", "recent", "lifetime", "low", "high")
+
+    def __init__(self, metric, alpha=EWMA_ALPHA):
+        self.metric = metric
+        self.min_spread = MIN_SPREAD[metric]
+        self.recent = Ewma(alpha)
+        self.lifetime = Welford()
+        self.low = P2Quantile(LOW_QUANTILE)
+        self.high = P2Quantile(HIGH_QUANTILE)
+
+    # The anomaly x would be, scored before it joins the baseline; None if usual
+    def score(self, x, warmup, z_threshold):
+        if self.lifetime.count < warmup:
+            return None
+        spread = max(math.sqrt(self.recent.var), self.min_spread)
+        z = (x - self.recent.mean) / spread
+        if abs(z) < z_threshold:
+            return None
+        low, high = self.low.value(), self.high.value()
+        if low <= x <= high:
+            return None  # far from the last few weeks, but not from the resident's history
+        return Anomaly(self.metric, x, self.recent.mean, spread, z, low, high)
+
+    def add(self, x):
+        self.recent.add(x)
+        self.lifetime.add(x)
+        self.low.add(x)
+        self.high.add(x)
+
+    def to_dict(self):
+        return {
+            "count": self.lifetime.count,
+            "mean": round(self.recent.mean, 1),
+            "spread": round(math.sqrt(self.recent.var), 1),
+            "lifetime_mean": round(self.lifetime.mean, 1),
+            "lifetime_spread": round(self.lifetime.std, 1),
+            "low": _round(self.low.value()),
+            "high": _round(self.high.value()),
+        }
+
+
+# Streaming anomaly detection for one resident: each reading is scored
+# against the resident's own baseline and then added to it, so a heart rate
+# of 90 is flagged for someone who sits at 62 even though it is well under
+# the fixed 100 bpm threshold. update() returns only onsets: metrics that are
+# unusual now and were not on the reading before, so a lasting deviation
+# raises one alert.
+class AnomalyDetector:
+    def __init__(self, z_threshold=Z_THRESHOLD, warmup=WARMUP_READINGS, alpha=EWMA_ALPHA):
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.baselines = [MetricBaseline(metric, alpha) for metric in METRICS]
+        self.flagged = set()  # metrics unusual on the last reading
+
+    def update(self, reading):
+        if not reading.is_complete():
+            return []  # falls logged before any measurement
+        onsets = []
+        flagged = set()
+        values = (reading.heart_rate, reading.systolic, reading.diastolic, reading.glucose)
+        for baseline, value in zip(self.baselines, values):
+            anomaly = baseline.score(value, self.warmup, self.z_threshold)
+            if anomaly is not None:
+                flagged.add(baseline.metric)
+                if baseline.metric not in self.flagged:
+                    onsets.append(anomaly)
+            baseline.add(value)
+        self.flagged = flagged
+        return onsets
+
+    # Build the baseline from readings already logged, without flagging them
+    def warm_up(self, readings):
+        for reading in readings:
+            if reading.is_complete():
+                values = (reading.heart_rate, reading.systolic, reading.diastolic, reading.glucose)
+                for baseline, value in zip(self.baselines, values):
+                    baseline.add(value)
+
+    def to_dict(self):
+        return {baseline.metric: baseline.to_dict() for baseline in self.baselines}
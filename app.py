@@ -1,32 +1,94 @@
+import functools
+import math
 import time
 import random
 import json
 import os
 import pygame
-import schedule
-from flask import Flask, render_template, jsonify, request, session
+from flask import Flask, Response, abort, has_request_context, render_template, jsonify, request, session
 import threading
 from datetime import datetime, timedelta
-from gtts import gTTS
+from alerts import AlertPipeline, AudioChannel, LogChannel, WebhookChannel
+from anomaly import AnomalyDetector
+from chats import ChatStore
+from cluster import Election, FileLock, LeaderClient, LeaderError, LeaderServer
+from audio import (
+    AudioBundle, AudioCache, AudioPlayer, PygameBackend, SpeechSynthesizer, gtts_synthesize, remove_stale_temp_files,
+)
+from events import EventBus
+from prompts import (
+    ACTIVITIES, CATEGORY_MESSAGES, DEFAULT_CATEGORY_MESSAGE, DEFAULT_SCHEDULE, HEALTH_SUGGESTIONS, KEYWORD_PHRASES,
+    CAREGIVER_CONFIRMATION, FALL_NOTICE, HEALTH_NORMAL, REMINDER_CONFIRMATION, SCHEDULE_ADJUSTED,
+    SCHEDULE_RESTORED, VOICE_FALLBACKS, format_alert,
+)
+from ingest import MAX_TIMESTAMP, IngestError, parse_readings
+from intents import build_matchers
+from monitor import MonitoringEngine
+from recent import RecentCache
+from rollups import RESOLUTIONS, RollupEngine, choose_resolution
+from records import ACTIVITY_KINDS, ActivityEvent, HealthReading, format_time
+from scheduler import Scheduler
+from sensors import SensorHub, SocketSource, is_fall
+from risk import AT_RISK, NORMAL, RiskThresholds, evaluate_batch, risk_code, suggestion_keys
+from storage import DEFAULT_RESIDENT, RESIDENT_ID_PATTERN, JsonStorage, migrate_json_array, open_storage
 
 app = Flask(__name__)
 app.secret_key = "your_secret_key_here"
+# Records keep epoch timestamps; templates show them with {{ ts|clock }}
+app.add_template_filter(format_time, "clock")
 
 # File paths for logging
-HEALTH_LOG_FILE = "logs/health_log.json"
-ACTIVITY_LOG_FILE = "logs/activity_log.json"
+HEALTH_LOG_FILE = "logs/health_log.json"  # legacy JSON array, migrated on startup
+HEALTH_LOG_DIR = "logs/health_log"
+ACTIVITY_LOG_DIR = "logs/activity_log"  # append-only activity journal; a legacy activity_log.json is imported
 SCHEDULE_FILE = "logs/schedule.json"
 CUSTOM_REMINDERS_FILE = "logs/custom_reminders.json"
-
-# Initialize logs if they don't exist
-for file in [HEALTH_LOG_FILE, ACTIVITY_LOG_FILE, SCHEDULE_FILE, CUSTOM_REMINDERS_FILE]:
-    if not os.path.exists(file):
-        with open(file, "w") as f:
-            json.dump([], f)
-
-# Global flag to manage audio playback
-playing = False
-audio_lock = threading.Lock()
+SQLITE_DB_FILE = "logs/elderly_care.db"
+RESIDENTS_DIR = "logs/residents"  # per-resident files for every resident but the default one
+ROLLUPS_DIR = "logs/rollups"  # per-resident trend rollups, rebuilt from the health log when missing
+CHATS_DIR = "logs/chats"  # chat conversations pushed out of memory
+ALERT_LOG_FILE = "logs/alerts.jsonl"  # every alert delivered, one JSON object per line
+LEADER_LOCK_FILE = "logs/leader.lock"  # held by the leader when several processes serve the app
+LEADER_SOCKET = "logs/leader.sock"  # followers reach the leader here
+WRITE_LOCK_FILE = "logs/write.lock"  # taken around storage writes by every process
+
+# Storage engine: "json" (default) or "sqlite"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+# Set by wsgi.py, where several worker processes serve the same logs/
+# directory. They share the SQLite store, and storage writes hold a lock that
+# spans processes.
+MULTI_PROCESS = os.environ.get("MULTI_PROCESS", "0") != "0"
+
+
+def _open_storage(backend, shared=False):
+    return open_storage(
+        backend, HEALTH_LOG_DIR, ACTIVITY_LOG_DIR, SCHEDULE_FILE, CUSTOM_REMINDERS_FILE, SQLITE_DB_FILE, RESIDENTS_DIR,
+        shared,
+    )
+
+
+storage = _open_storage(STORAGE_BACKEND, MULTI_PROCESS)
+_write_lock = FileLock(WRITE_LOCK_FILE) if MULTI_PROCESS else threading.Lock()
+if isinstance(storage, JsonStorage):
+    # The old JSON array health log is imported once
+    migrate_json_array(HEALTH_LOG_FILE, storage.health_log)
+else:
+    # Workers starting together import only once
+    with _write_lock:
+        if storage.is_empty():
+            # First start on SQLite: carry over what the JSON backend recorded
+            json_storage = _open_storage("json")
+            migrate_json_array(HEALTH_LOG_FILE, json_storage.health_log)
+            storage.import_from(json_storage)
+            json_storage.close()
+
+# Synthesized speech is cached on disk, so repeated prompts skip gTTS
+# and prompts pre-rendered by prerender.py play without any synthesis at all
+AUDIO_CACHE_DIR = "audio_cache"
+AUDIO_CACHE_MAX_BYTES = 50 * 1024 * 1024
+AUDIO_BUNDLE_DIR = "audio_bundle"
+audio_cache = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, bundle=AudioBundle(AUDIO_BUNDLE_DIR))
+remove_stale_temp_files()
 
 # Initialize pygame mixer for audio
 try:
@@ -34,9 +96,169 @@ try:
 except Exception as e:
     print(f"Failed to initialize pygame.mixer: {e}")
 
+
+# Changes on every start, so ETags and SSE ids from an earlier run never match
+BOOT_ID = os.urandom(4).hex()
+
+# New readings, activity and alerts are pushed to dashboards over /api/stream
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 3000
+# Each open stream holds a server thread until the client goes away. Past
+# this many per process, /api/stream answers 503 and dashboards poll instead,
+# so streams never take every thread (wsgi.py lowers it to fit --threads).
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", "64"))
+_stream_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+event_bus = EventBus()
+# The leader's client on a follower process (see start_worker), else None
+leader_client = None
+
+
+# A follower's events go to the leader, which numbers them for every
+# process's /api/stream clients
+def publish(event_type, data, resident_id=None):
+    if leader_client is not None:
+        leader_client.notify("publish", event_type, data, resident_id)
+    else:
+        event_bus.publish(event_type, data, resident_id)
+
+
+# Residents are picked with ?resident=<id> (or a form/JSON field) and
+# remembered in the session
+def current_resident():
+    resident_id = request.values.get("resident")
+    if resident_id is None and request.is_json:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):  # a JSON array body carries no resident field
+            resident_id = payload.get("resident")
+    if resident_id is None:
+        return session.get("resident", DEFAULT_RESIDENT)
+    if not RESIDENT_ID_PATTERN.match(str(resident_id)):
+        abort(400, description="Invalid resident id")
+    session["resident"] = resident_id
+    return resident_id
+
+
+# The monitoring loop runs outside any request, so it speaks in the defaults
+def current_language():
+    return session.get("language", "en") if has_request_context() else "en"
+
+
+def current_gender():
+    return session.get("gender", "male") if has_request_context() else "male"
+
+
+# The latest readings and activity stay in memory so dashboard and API reads
+# never scan the logs; writes go through record_health/record_activity.
+# Each resident's window is loaded from storage on first use.
+RECENT_CACHE_SIZE = 100
+
+
+def _load_recent(kind, resident_id):
+    if kind == "health":
+        entries, cursor = storage.recent_health(RECENT_CACHE_SIZE, resident_id), storage.health_cursor(resident_id)
+    else:
+        entries, cursor = storage.recent_activity(RECENT_CACHE_SIZE, resident_id), storage.activity_cursor(resident_id)
+    return [RECORD_TYPES[kind].from_dict(entry) for entry in entries], cursor
+
+
+def _count_alerts(resident_id, day):
+    return storage.count_activity(day, "alert", resident_id)
+
+
+def _storage_cursor(kind, resident_id):
+    return storage.health_cursor(resident_id) if kind == "health" else storage.activity_cursor(resident_id)
+
+
+RECORD_TYPES = {"health": HealthReading, "activity": ActivityEvent}
+# With several processes, each checks storage for what the others wrote
+recent_cache = RecentCache(
+    RECENT_CACHE_SIZE, loader=_load_recent, current=_storage_cursor if MULTI_PROCESS else None,
+    count_alerts=_count_alerts,
+)
+rollups = RollupEngine(storage, ROLLUPS_DIR, _write_lock, MULTI_PROCESS)
+
+
+# Every resident's trend rollups are loaded in the background once the app
+# starts serving, so the first trend view does not wait on the health log
+def preload_rollups():
+    threading.Thread(target=lambda: rollups.preload(storage.residents()), name="rollups", daemon=True).start()
+
+
+def record_health(reading, store=None, resident_id=DEFAULT_RESIDENT):
+    entry = reading.to_dict()
+    with _write_lock:
+        cursor = (store or storage).append_health(entry, resident_id)
+        recent_cache.add("health", reading, cursor, resident_id)
+        if store is None or store is storage:
+            rollups.add(resident_id, [reading], cursor)
+    publish("health", entry, resident_id)
+
+
+# Many readings in one storage write; cursors of a batch are consecutive
+def record_health_many(readings, store=None, resident_id=DEFAULT_RESIDENT):
+    if not readings:
+        return
+    entries = [reading.to_dict() for reading in readings]
+    with _write_lock:
+        last_cursor = (store or storage).append_health_many(entries, resident_id)
+        recent_cache.extend("health", readings, last_cursor - len(readings) + 1, resident_id)
+        if store is None or store is storage:
+            rollups.add(resident_id, readings, last_cursor)
+    for entry in entries:
+        publish("health", entry, resident_id)
+
+
+def record_activity(message, resident_id=DEFAULT_RESIDENT, kind="other", priority=None):
+    event = ActivityEvent(time.time(), message, kind, priority)
+    entry = event.to_dict()
+    with _write_lock:
+        cursor = storage.append_activity(entry, resident_id)
+        recent_cache.add("activity", event, cursor, resident_id)
+    publish("activity", entry, resident_id)
+
+
+def _log_voice_failure(message, language, error):
+    record_activity(f"Voice playback failed for '{message}' in {language}: {error}", kind="voice")
+
+
+# Every agent speaks through one audio worker with a bounded priority queue;
+# synthesis runs ahead of playback on a small thread pool
+TTS_POOL_SIZE = int(os.environ.get("TTS_POOL_SIZE", "2"))
+TTS_TIMEOUT = float(os.environ.get("TTS_TIMEOUT", "10"))
+AUDIO_QUEUE_DEPTH = int(os.environ.get("AUDIO_QUEUE_DEPTH", "32"))
+speech_synthesizer = SpeechSynthesizer(
+    audio_cache, functools.partial(gtts_synthesize, timeout=TTS_TIMEOUT), workers=TTS_POOL_SIZE, timeout=TTS_TIMEOUT
+)
+audio_player = AudioPlayer(
+    speech_synthesizer, PygameBackend(), max_queue=AUDIO_QUEUE_DEPTH, on_error=_log_voice_failure, fallbacks=VOICE_FALLBACKS
+)
+
+# Headless servers and benchmarks run with VOICE_ENABLED=0
+VOICE_ENABLED = os.environ.get("VOICE_ENABLED", "1") != "0"
+
+
+# Only the leader has a speaker; followers send it what to say
+def speak(message, language, priority="Medium"):
+    if not VOICE_ENABLED:
+        return
+    if leader_client is not None:
+        leader_client.notify("speak", message, language, priority)
+    else:
+        audio_player.say(message, language, priority)
+
+
+# Every resident's reminders share one scheduler thread, started by ElderlyCareSystem.run
+reminder_scheduler = Scheduler()
+
+# Besides the fixed thresholds, readings are compared with the resident's own
+# baseline; this many standard deviations away counts as unusual
+ANOMALY_Z_SCORE = float(os.environ.get("ANOMALY_Z_SCORE", "4"))
+
 # Health Monitoring Agent
 class HealthMonitoringAgent:
-    def __init__(self):
+    def __init__(self, store=None, resident_id=DEFAULT_RESIDENT):
+        self.storage = store or storage
+        self.resident_id = resident_id
         self.heart_rate = None
         self.blood_pressure = (None, None)
         self.glucose = None
@@ -45,7 +267,10 @@ class HealthMonitoringAgent:
         self.bp_low_threshold = (90, 60)
         self.glucose_threshold = 130
         self.glucose_low_threshold = 70
+        self.anomaly_detector = AnomalyDetector(ANOMALY_Z_SCORE)
+        self.anomalies = []  # unusual-for-this-resident onsets in the last reading or batch
         self.last_activity_time = time.time()
+        self.inactivity_seconds = 1800
         self.health_status = "Normal"
         self.last_health_status = "Normal"
         self.last_user_input_time = time.time()
@@ -60,148 +285,128 @@ class HealthMonitoringAgent:
         else:
             return False, "No new data to monitor."
 
-        log_entry = {
-            "timestamp": time.ctime(),
-            "heart_rate": self.heart_rate,
-            "blood_pressure": f"{self.blood_pressure[0]}/{self.blood_pressure[1]}",
-            "glucose": self.glucose,
-            "event": None,
-            "source": source
-        }
-        self._log_data(HEALTH_LOG_FILE, log_entry)
-
-        hr_risk = self.heart_rate > self.hr_threshold
-        bp_high_risk = self.blood_pressure[0] > self.bp_threshold[0] or self.blood_pressure[1] > self.bp_threshold[1]
-        bp_low_risk = self.blood_pressure[0] < self.bp_low_threshold[0] or self.blood_pressure[1] < self.bp_low_threshold[1]
-        glucose_high_risk = self.glucose > self.glucose_threshold
-        glucose_low_risk = self.glucose < self.glucose_low_threshold
-
-        risk_message = ""
-        if hr_risk or bp_high_risk or bp_low_risk or glucose_high_risk or glucose_low_risk:
-            risk_message = "At Risk"
-        else:
-            risk_message = "Healthy"
+        reading = HealthReading(
+            self.last_user_input_time, self.heart_rate, self.blood_pressure[0], self.blood_pressure[1], self.glucose,
+            source=source,
+        )
+        self._log_data(reading)
+        self.anomalies = self.anomaly_detector.update(reading)
+
+        code = risk_code(self.heart_rate, self.blood_pressure[0], self.blood_pressure[1], self.glucose, self.thresholds())
+        risk_message = "At Risk" if code else "Healthy"
 
         self.last_health_status = self.health_status
-        self.health_status = "At Risk" if risk_message == "At Risk" else "Normal"
+        self.health_status = AT_RISK if code else NORMAL
         return True, risk_message
 
-    def detect_unusual_behavior(self):
-        current_time = time.time()
-        if (current_time - self.last_activity_time) > 1800:
+    # Log and score a ReadingBatch from /api/ingest in one write and one risk
+    # pass. The agent ends up holding the last reading and its status.
+    def monitor_batch(self, batch):
+        scored = self.score_batch(batch.heart_rate, batch.systolic, batch.diastolic, batch.glucose)
+        readings = batch.readings("Sensor Input")
+        record_health_many(readings, self.storage, self.resident_id)
+        update = self.anomaly_detector.update
+        self.anomalies = [anomaly for reading in readings for anomaly in update(reading)]
+
+        if len(batch):
+            self.heart_rate = batch.heart_rate[-1]
+            self.blood_pressure = (batch.systolic[-1], batch.diastolic[-1])
+            self.glucose = batch.glucose[-1]
+            self.last_user_input_time = time.time()
+            self.last_health_status = self.health_status
+            self.health_status = scored.last_status
+        return scored
+
+    def thresholds(self):
+        return RiskThresholds(
+            self.hr_threshold, self.bp_threshold, self.bp_low_threshold, self.glucose_threshold, self.glucose_low_threshold
+        )
+
+    # Score many readings at once, e.g. a sensor backlog or history after a
+    # threshold change. Columns are lists or NumPy arrays; nothing is logged.
+    def score_batch(self, heart_rate, systolic, diastolic, glucose, use_numpy=None):
+        return evaluate_batch(
+            heart_rate, systolic, diastolic, glucose, self.thresholds(), self.health_status, use_numpy
+        )
+
+    def detect_unusual_behavior(self, current_time=None):
+        if current_time is None:
+            current_time = time.time()
+        if (current_time - self.last_activity_time) >= self.inactivity_seconds:
             return True, "Inactivity detected: No movement for 30 minutes."
         return False, "Activity normal."
 
-    def detect_fall(self):
-        if random.random() < 0.1:
-            log_entry = {
-                "timestamp": time.ctime(),
-                "heart_rate": self.heart_rate,
-                "blood_pressure": f"{self.blood_pressure[0]}/{self.blood_pressure[1]}",
-                "glucose": self.glucose,
-                "event": "Fall detected"
-            }
-            self._log_data(HEALTH_LOG_FILE, log_entry)
-            return True, "Fall detected!"
+    # samples: an accelerometer window in g, see sensors.is_fall
+    def detect_fall(self, samples):
+        if is_fall(samples):
+            return self.record_fall()
         return False, "No fall detected."
 
-    def _log_data(self, file, entry):
-        with open(file, "r") as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                data = []
-        data.append(entry)
-        with open(file, "w") as f:
-            json.dump(data, f)
-
-    def _play_voice(self, message, language):
-        global playing, audio_lock
-        with audio_lock:
-            if playing:
-                print("Audio already playing, skipping new request.")
-                return
-            playing = True
-
-        def play_audio():
-            global playing
-            try:
-                audio_file = f"temp_{int(time.time() * 1000)}.mp3"
-                print(f"Generating audio for: {message} in language: {language}")
-                lang_code = "hi" if language == "hi" else "en"
-                tts = gTTS(text=message, lang=lang_code)
-                tts.save(audio_file)
-                print(f"Audio file saved as: {audio_file}")
-                pygame.mixer.music.load(audio_file)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    pygame.time.Clock().tick(10)
-                os.remove(audio_file)
-                print(f"Audio playback completed and file {audio_file} removed.")
-            except Exception as e:
-                print(f"Error in audio playback: {e}")
-                self._log_activity(f"Voice playback failed for '{message}' in {language}: {e}")
-            finally:
-                with audio_lock:
-                    playing = False
-
-        threading.Thread(target=play_audio, daemon=True).start()
+    def record_fall(self):
+        self._log_data(HealthReading(
+            time.time(), self.heart_rate, self.blood_pressure[0], self.blood_pressure[1], self.glucose, "Fall detected"
+        ))
+        return True, "Fall detected!"
+
+    def _log_data(self, reading):
+        record_health(reading, self.storage, self.resident_id)
+
+    def _play_voice(self, message, language, priority="Medium"):
+        speak(message, language, priority)
 
 # Health Suggestions Agent
 class HealthSuggestionsAgent(HealthMonitoringAgent):
     def __init__(self):
         super().__init__()
-        self.suggestions = {
-            "high_heart_rate": "Your heart rate is high. Please try to rest and breathe deeply.",
-            "high_bp": "Your blood pressure is high. Please sit down and avoid stress.",
-            "low_bp": "Your blood pressure is low. Please have some water or a snack.",
-            "high_glucose": "Your glucose is high. Avoid sweets and consult your doctor.",
-            "low_glucose": "Your glucose is low. Please eat a small piece of fruit."
-        }
+        self.suggestions = HEALTH_SUGGESTIONS
 
     def get_suggestions(self, heart_rate, blood_pressure, glucose, hr_threshold, bp_threshold, bp_low_threshold, glucose_threshold, glucose_low_threshold):
-        suggestions = []
-        if heart_rate > hr_threshold:
-            suggestions.append(self.suggestions["high_heart_rate"])
-        if blood_pressure[0] > bp_threshold[0] or blood_pressure[1] > bp_threshold[1]:
-            suggestions.append(self.suggestions["high_bp"])
-        if blood_pressure[0] < bp_low_threshold[0] or blood_pressure[1] < bp_low_threshold[1]:
-            suggestions.append(self.suggestions["low_bp"])
-        if glucose > glucose_threshold:
-            suggestions.append(self.suggestions["high_glucose"])
-        if glucose < glucose_low_threshold:
-            suggestions.append(self.suggestions["low_glucose"])
-        return suggestions
+        thresholds = RiskThresholds(hr_threshold, bp_threshold, bp_low_threshold, glucose_threshold, glucose_low_threshold)
+        return self.suggestions_for(risk_code(heart_rate, blood_pressure[0], blood_pressure[1], glucose, thresholds))
+
+    # Suggestions for a risk code from risk_code() or RiskBatch.codes
+    def suggestions_for(self, code):
+        return [self.suggestions[key] for key in suggestion_keys(int(code))]
 
 # Reminder Agent
+# Reminders that came due while the process was down fire on boot when they
+# are at most this many seconds late; older ones are only logged as missed
+MISSED_REMINDER_GRACE = int(os.environ.get("MISSED_REMINDER_GRACE", str(12 * 3600)))
+
+
 class ReminderAgent:
-    def __init__(self):
-        self.schedule = [
-            {"task": "Take your morning medication", "language": "en", "critical": True, "time": None, "category": "medicine", "triggered": False},
-            {"task": "सुबह की दवा लें", "language": "hi", "critical": True, "time": None, "category": "medicine", "triggered": False},
-            {"task": "Go for a short walk", "language": "en", "critical": False, "time": None, "category": "other", "triggered": False},
-            {"task": "डॉक्टर के पास जाएं", "language": "hi", "critical": True, "time": None, "category": "doctor", "triggered": False}
-        ]
+    def __init__(self, resident_id=DEFAULT_RESIDENT, scheduler=None, lock=None):
+        self.resident_id = resident_id
+        self.scheduler = scheduler if scheduler is not None else reminder_scheduler
+        self.lock = lock or threading.RLock()  # held while a reminder fires
+        self.schedule = [dict(task) for task in DEFAULT_SCHEDULE]
         self.custom_reminders = []
+        self.job_keys = set()
         self._load_schedule()
         self._load_custom_reminders()
-        self.job = None
+        self.storage_version = storage.reminders_version(resident_id)
+        self.fire_missed()
+        self.schedule_all()
+
+    def reload_if_changed(self):
+        version = storage.reminders_version(self.resident_id)
+        if version != self.storage_version:
+            self._load_schedule()
+            self._load_custom_reminders()
+            self.storage_version = version
+            self.schedule_all()
+            return True
+        return False
 
     def _load_schedule(self):
-        if os.path.exists(SCHEDULE_FILE):
-            with open(SCHEDULE_FILE, "r") as f:
-                try:
-                    self.schedule = json.load(f)
-                except json.JSONDecodeError:
-                    pass
+        schedule_data = storage.load_schedule(self.resident_id)
+        if schedule_data is not None:
+            self.schedule = schedule_data
 
     def _load_custom_reminders(self):
-        if os.path.exists(CUSTOM_REMINDERS_FILE):
-            with open(CUSTOM_REMINDERS_FILE, "r") as f:
-                try:
-                    self.custom_reminders = json.load(f)
-                except json.JSONDecodeError:
-                    pass
+        reminders = storage.load_custom_reminders(self.resident_id)
+        if reminders is not None:
+            self.custom_reminders = reminders
 
     def adjust_schedule(self, health_status, unusual_behavior=False, delay_minutes=10):
         if health_status or unusual_behavior:
@@ -224,9 +429,10 @@ class ReminderAgent:
                     reminder["time"] = "Skipped"
                     self._log_activity(f"Skipping custom reminder '{reminder['message']}'")
                     self._play_voice(f"Skipping your reminder '{reminder['message']}. Please rest.", "en")
+            self._reschedule_all()
             self._save_schedule()
             self._save_custom_reminders()
-            self._play_voice("Adjusting your schedule due to health or behavior. Please rest.", session.get("language", "en"))
+            self._play_voice(SCHEDULE_ADJUSTED, current_language())
         else:
             for task in self.schedule:
                 if task.get("time") and isinstance(task.get("time"), datetime) and task["time"] < datetime.now():
@@ -235,47 +441,120 @@ class ReminderAgent:
             for reminder in self.custom_reminders:
                 if reminder.get("time") and isinstance(reminder.get("time"), datetime) and reminder["time"] < datetime.now():
                     reminder["time"] = None
+            self._reschedule_all()
             self._save_schedule()
             self._save_custom_reminders()
-            self._play_voice("Your health has improved. Schedule restored.", session.get("language", "en"))
+            self._play_voice(SCHEDULE_RESTORED, current_language())
+
+    # Jobs are keyed by resident, kind and position in the list, so
+    # scheduling an item again moves its job instead of adding another
+    def _job_key(self, kind, item, index=None):
+        if index is None:
+            items = self.schedule if kind == "task" else self.custom_reminders
+            index = next(i for i, other in enumerate(items) if other is item)
+        return (self.resident_id, kind, index)
+
+    def _set_job(self, key, due, interval=None):
+        if not self.scheduler.reschedule(key, due):
+            self.scheduler.schedule(key, due, lambda: self._run_job(key), interval)
+        self.job_keys.add(key)
+
+    def _cancel_job(self, key):
+        self.scheduler.cancel(key)
+        self.job_keys.discard(key)
+
+    def _run_job(self, key):
+        _, kind, index = key
+        with self.lock:
+            items = self.schedule if kind == "task" else self.custom_reminders
+            if index < len(items):
+                (self._trigger_reminder if kind == "task" else self._trigger_custom_reminder)(items[index])
+
+    # Register every reminder with the scheduler, dropping jobs left from before
+    def schedule_all(self):
+        for key in list(self.job_keys):
+            self._cancel_job(key)
+        self._reschedule_all()
+
+    def _reschedule_all(self):
+        for index, task in enumerate(self.schedule):
+            self.schedule_reminder(task, log=False, index=index)
+        for index, reminder in enumerate(self.custom_reminders):
+            self.schedule_custom_reminder(reminder, log=False, index=index)
+
+    # Anything due by now that never fired: only possible if the process was
+    # down at the time, since running jobs mark what they fire
+    def missed_reminders(self, now=None):
+        now = now or datetime.now()
+        missed = []
+        for task in self.schedule:
+            if isinstance(task.get("time"), datetime) and task["time"] <= now and not task.get("triggered", False):
+                missed.append(("task", task))
+        for reminder in self.custom_reminders:
+            if isinstance(reminder.get("time"), datetime) and reminder["time"] <= now and "triggered" not in reminder:
+                missed.append(("custom", reminder))
+        return missed
+
+    def fire_missed(self, now=None):
+        now = now or datetime.now()
+        missed = self.missed_reminders(now)
+        for kind, item in missed:
+            label = item["task"] if kind == "task" else item["message"]
+            due = item["time"].strftime("%Y-%m-%d %H:%M")
+            if (now - item["time"]).total_seconds() <= MISSED_REMINDER_GRACE:
+                self._log_activity(f"Missed reminder: {label} (due {due}), firing now")
+                (self._trigger_reminder if kind == "task" else self._trigger_custom_reminder)(item)
+            else:
+                self._log_activity(f"Missed reminder expired: {label} (due {due})")
+                item["triggered"] = True
+        if missed:
+            self._save_schedule()
+            self._save_custom_reminders()
+        return len(missed)
 
-    def schedule_reminder(self, task):
+    # Tasks repeat daily from their time; a time already past starts tomorrow
+    def schedule_reminder(self, task, log=True, index=None):
+        key = self._job_key("task", task, index)
         if task.get("time") and isinstance(task.get("time"), datetime):
-            task_time = task["time"].strftime("%H:%M")
-            schedule.every().day.at(task_time).do(self._trigger_reminder, task)
-            self._log_activity(f"Scheduled reminder: {task['task']} at {task_time}")
+            due = task["time"].timestamp()
+            now = time.time()
+            if due <= now:
+                due += math.ceil((now - due) / 86400) * 86400
+            self._set_job(key, due, interval=86400)
+            if log:
+                self._log_activity(f"Scheduled reminder: {task['task']} at {task['time'].strftime('%H:%M')}")
+        else:
+            self._cancel_job(key)
 
     def _trigger_reminder(self, task):
         if not task.get("triggered", False):
-            category_message = {
-                "medicine": "Time to take your medicine",
-                "doctor": "Time to visit the doctor",
-                "other": "Time for your activity"
-            }.get(task["category"], "Time for your task")
+            category_message = CATEGORY_MESSAGES.get(task["category"], DEFAULT_CATEGORY_MESSAGE)
             message = f"{category_message}: {task['task']}"
             self._log_activity(message)
             self._play_voice(message, task["language"])
-            self._play_voice("Have you completed this? (Simulated: Yes)", task["language"])
+            self._play_voice(REMINDER_CONFIRMATION, task["language"])
             self._log_activity("User confirmed: Yes")
             task["triggered"] = True
             self._save_schedule()
 
-    def schedule_custom_reminder(self, reminder):
-        if reminder.get("time") and isinstance(reminder.get("time"), datetime):
-            reminder_time = reminder["time"].strftime("%H:%M")
-            schedule.every().day.at(reminder_time).do(self._trigger_custom_reminder, reminder)
-            self._log_activity(f"Scheduled custom reminder: {reminder['message']} at {reminder_time}")
+    # Custom reminders fire once, at their date and time
+    def schedule_custom_reminder(self, reminder, log=True, index=None):
+        key = self._job_key("custom", reminder, index)
+        if reminder.get("time") and isinstance(reminder.get("time"), datetime) and "triggered" not in reminder:
+            self._set_job(key, reminder["time"].timestamp())
+            if log:
+                self._log_activity(
+                    f"Scheduled custom reminder: {reminder['message']} at {reminder['time'].strftime('%Y-%m-%d %H:%M')}"
+                )
+        else:
+            self._cancel_job(key)
 
     def _trigger_custom_reminder(self, reminder):
         if "triggered" not in reminder:
-            category_message = {
-                "medicine": "Time to take your medicine",
-                "doctor": "Time to visit the doctor",
-                "other": "Time for your activity"
-            }.get(reminder.get("category", "other"), "Time for your task")
+            category_message = CATEGORY_MESSAGES.get(reminder.get("category", "other"), DEFAULT_CATEGORY_MESSAGE)
             message = f"{category_message}: {reminder['message']}"
             self._log_activity(f"Triggering reminder: {message}")
-            self._play_voice(message, session.get("language", "en"))
+            self._play_voice(message, current_language())
             reminder["triggered"] = True
             self._save_custom_reminders()
 
@@ -288,368 +567,386 @@ class ReminderAgent:
         self._log_activity(f"Set custom reminder: {message} at {time_str}")
 
     def _save_schedule(self):
-        with open(SCHEDULE_FILE, "w") as f:
-            json.dump(self.schedule, f)
+        storage.save_schedule(self.schedule, self.resident_id)
+        self.storage_version = storage.reminders_version(self.resident_id)
 
     def _save_custom_reminders(self):
-        with open(CUSTOM_REMINDERS_FILE, "w") as f:
-            json.dump(self.custom_reminders, f)
+        storage.save_custom_reminders(self.custom_reminders, self.resident_id)
+        self.storage_version = storage.reminders_version(self.resident_id)
 
     def _log_activity(self, message):
-        with open(ACTIVITY_LOG_FILE, "r") as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                data = []
-        data.append({"timestamp": time.ctime(), "activity": message})
-        with open(ACTIVITY_LOG_FILE, "w") as f:
-            json.dump(data[-5:], f)
-
-    def _play_voice(self, message, language):
-        global playing, audio_lock
-        with audio_lock:
-            if playing:
-                print("Audio already playing, skipping new request.")
-                return
-            playing = True
-
-        def play_audio():
-            global playing
-            try:
-                audio_file = f"temp_{int(time.time() * 1000)}.mp3"
-                print(f"Generating audio for: {message} in language: {language}")
-                lang_code = "hi" if language == "hi" else "en"
-                tts = gTTS(text=message, lang=lang_code)
-                tts.save(audio_file)
-                print(f"Audio file saved as: {audio_file}")
-                pygame.mixer.music.load(audio_file)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    pygame.time.Clock().tick(10)
-                os.remove(audio_file)
-                print(f"Audio playback completed and file {audio_file} removed.")
-            except Exception as e:
-                print(f"Error in audio playback: {e}")
-                self._log_activity(f"Voice playback failed for '{message}' in {language}: {e}")
-            finally:
-                with audio_lock:
-                    playing = False
-
-        threading.Thread(target=play_audio, daemon=True).start()
+        record_activity(message, self.resident_id, "reminder")
+
+    def _play_voice(self, message, language, priority="Medium"):
+        speak(message, language, priority)
+
+# Chat keywords are compiled once per language into phrase indexes
+INTENT_MATCHERS = build_matchers(ACTIVITIES, KEYWORD_PHRASES)
 
 # Social Engagement Agent (Chatbot)
+# Keeps no history: each call returns the messages it adds, and the routes
+# keep them in the session's conversation in chat_store
 class SocialEngagementAgent:
-    def __init__(self):
-        self.activities = {
-            "en": {
-                "welcome": {
-                    "male": "Welcome, Grandpa!",
-                    "female": "Welcome, Grandma!"
-                },
-                "questions": [
-                    "That’s a wonderful memory! Do you have any other special moments?",
-                    "I enjoy hearing about your day. What else is on your mind?",
-                    "What a lovely story! Have you had any fun adventures lately?",
-                    "That sounds exciting! Tell me more about your friends.",
-                    "I’m all ears! What’s something new happening in your life?"
-                ],
-                "labels": {
-                    "heart_rate": "Heart Rate (bpm)",
-                    "blood_pressure": "Blood Pressure (Systolic/Diastolic)",
-                    "glucose": "Glucose (mg/dL)",
-                    "submit_health": "Submit Health Data",
-                    "reminder_time": "Reminder Time (YYYY-MM-DD HH:MM)",
-                    "reminder_message": "Reminder Message",
-                    "reminder_category": "Category",
-                    "set_reminder": "Set Reminder",
-                    "chat": "Let's Chat!",
-                    "type_message": "Type your message...",
-                    "send": "Send",
-                    "start_chat": "Start Chat",
-                    "recent_health": "Your Recent Health"
-                },
-                "keywords": {
-                    "happy": "I’m glad you’re feeling happy! What made your day special?",
-                    "good": "That’s great to hear! Any plans for today?",
-                    "family": "Family is so important. Who’s your favorite person to spend time with?",
-                    "tired": "I’m sorry you’re tired. Would you like a tip to relax?",
-                    "birthday": "What a surprise! Did you celebrate with cake?",
-                    "friends": "Your friends sound amazing! What do you love most about them?",
-                    "summer": "Summer sounds wonderful! What’s your favorite summer activity?",
-                    "enjoying": "I’m happy you’re enjoying yourself! What else are you doing?",
-                    "fun": "That sounds fun! What other activities do you enjoy?",
-                    "great": "Great to know! What’s making your day great?",
-                    "default": [
-                        "That’s interesting! Tell me more about what you enjoy related to that.",
-                        "I’d love to hear more about that topic. What else can you share?",
-                        "That sounds lovely! Can you tell me more about your experience?"
-                    ]
-                }
-            },
-            "hi": {
-                "welcome": {
-                    "male": "नमस्ते बाबाजी!",
-                    "female": "नमस्ते अम्माजी!"
-                },
-                "questions": [
-                    "यह एक अद्भुत याद है! क्या आपके पास कोई अन्य विशेष पल हैं?",
-                    "मुझे आपके दिन के बारे में सुनना अच्छा लगता है। और क्या आपके दिमाग में है?",
-                    "क्या शानदार कहानी! हाल ही में कोई मज़ेदार साहसिक कार्य हुआ?",
-                    "यह रोमांचक लगता है! अपने दोस्तों के बारे में और बताएं।",
-                    "मैं सुनने के लिए तैयार हूँ! आपके जीवन में क्या नया हो रहा है?"
-                ],
-                "labels": {
-                    "heart_rate": "हृदय गति (बीपीएम)",
-                    "blood_pressure": "रक्तचाप (सिस्टोलिक/डायस्टोलिक)",
-                    "glucose": "ग्लूकोज (मिलीग्राम/डीएल)",
-                    "submit_health": "स्वास्थ्य डेटा सबमिट करें",
-                    "reminder_time": "रिमाइंडर समय (YYYY-MM-DD HH:MM)",
-                    "reminder_message": "रिमाइंडर संदेश",
-                    "reminder_category": "श्रेणी",
-                    "set_reminder": "रिमाइंडर सेट करें",
-                    "chat": "चैट शुरू करें!",
-                    "type_message": "अपना संदेश टाइप करें...",
-                    "send": "भेजें",
-                    "start_chat": "चैट शुरू करें",
-                    "recent_health": "आपका हालिया स्वास्थ्य"
-                },
-                "keywords": {
-                    "खुश": "मुझे खुशी है कि आप खुश हैं! आपके दिन को खास क्या बनाया?",
-                    "अच्छा": "यह सुनकर अच्छा लगा! आज आपके कोई प्लान हैं?",
-                    "परिवार": "परिवार बहुत महत्वपूर्ण है। आपका पसंदीदा व्यक्ति कौन है?",
-                    "थका": "मुझे दुख है कि आप थके हैं। क्या आपको आराम की सलाह चाहिए?",
-                    "जन्मदिन": "क्या आश्चर्यजनक पल! क्या आपने केक के साथ जश्न मनाया?",
-                    "दोस्त": "आपके दोस्त शानदार लगते हैं! आप उन्हें सबसे ज्यादा क्या पसंद करते हैं?",
-                    "गर्मी": "गर्मी अद्भुत लगती है! आपका पसंदीदा गर्मी का काम क्या है?",
-                    "आनंद": "मुझे खुशी है कि आप आनंद ले रहे हैं! और क्या कर रहे हैं?",
-                    "मज़ा": "यह मज़ेदार लगता है! आप और कौन सी गतिविधियाँ पसंद करते हैं?",
-                    "शानदार": "शानदार जानकर अच्छा लगा! आपका दिन शानदार क्यों है?",
-                    "default": [
-                        "यह रोचक है! उससे संबंधित और बताएं।",
-                        "मुझे उस विषय पर और सुनना अच्छा लगेगा। और क्या बता सकते हैं?",
-                        "यह प्यारा लगता है! अपने अनुभव के बारे में और बताएं।"
-                    ]
-                }
-            }
-        }
-        self.chat_history = []
+    def __init__(self, resident_id=DEFAULT_RESIDENT):
+        self.resident_id = resident_id
+        self.activities = ACTIVITIES
         self.current_language = "en"
         self.last_audio_time = 0
         self.audio_cooldown = 2  # 2-second cooldown between audios
 
     def start_chat(self, language="en", gender="male"):
-        self.chat_history = []
         self.current_language = language
         greeting = self.activities[language]["welcome"][gender]
-        self.chat_history.append({"role": "system", "message": greeting})
         self._log_activity(f"Chat started in {language} for {gender}: {greeting}")
-        self._play_voice(greeting, language)
-        return self.chat_history
+        self._play_voice(greeting, language, "Low")
+        return [{"role": "system", "message": greeting}]
 
     def respond_to_user(self, user_message, language="en", gender="male"):
-        self.chat_history.append({"role": "user", "message": user_message})
+        messages = [{"role": "user", "message": user_message}]
         self._log_activity(f"User: {user_message}")
 
-        activity = self.activities[language]
-        user_message_lower = user_message.lower()
-        response = random.choice(activity["keywords"]["default"])  # Default response
-
-        # Enhanced keyword matching for context
-        for keyword, replies in activity["keywords"].items():
-            if keyword in user_message_lower and not response.startswith("That’s interesting!") and not response.startswith("I’d love to hear"):
-                if isinstance(replies, list):
-                    response = random.choice(replies)
-                else:
-                    response = replies
-                break
+        # Best-scoring keyword intent, or one of the default replies
+        intent = INTENT_MATCHERS[language].match(user_message)
+        replies = intent.replies if intent is not None else self.activities[language]["keywords"]["default"]
+        response = replies if isinstance(replies, str) else random.choice(replies)
 
         current_time = time.time()
         if current_time - self.last_audio_time >= self.audio_cooldown:
-            self.chat_history.append({"role": "system", "message": response})
-            self._play_voice(response, language)
+            messages.append({"role": "system", "message": response})
+            self._play_voice(response, language, "Low")
             self.last_audio_time = current_time
         else:
-            self.chat_history.append({"role": "system", "message": response + " (Audio delayed due to cooldown)"})
+            messages.append({"role": "system", "message": response + " (Audio delayed due to cooldown)"})
             print(f"Audio delayed for: {response}")
 
         self._log_activity(response)
-        return self.chat_history
+        return messages
 
     def _log_activity(self, message):
-        with open(ACTIVITY_LOG_FILE, "r") as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                data = []
-        data.append({"timestamp": time.ctime(), "activity": message})
-        with open(ACTIVITY_LOG_FILE, "w") as f:
-            json.dump(data[-5:], f)
-
-    def _play_voice(self, message, language):
-        global playing, audio_lock
-        with audio_lock:
-            if playing:
-                print("Audio already playing, skipping new request.")
-                return
-            playing = True
-
-        def play_audio():
-            global playing
-            try:
-                audio_file = f"temp_{int(time.time() * 1000)}.mp3"
-                print(f"Generating audio for: {message} in language: {language}")
-                lang_code = "hi" if language == "hi" else "en"
-                tts = gTTS(text=message, lang=lang_code)
-                tts.save(audio_file)
-                print(f"Audio file saved as: {audio_file}")
-                pygame.mixer.music.load(audio_file)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    pygame.time.Clock().tick(10)
-                os.remove(audio_file)
-                print(f"Audio playback completed and file {audio_file} removed.")
-            except Exception as e:
-                print(f"Error in audio playback: {e}")
-                self._log_activity(f"Voice playback failed for '{message}' in {language}: {e}")
-            finally:
-                with audio_lock:
-                    playing = False
-
-        threading.Thread(target=play_audio, daemon=True).start()
+        record_activity(message, self.resident_id, "chat")
+
+    def _play_voice(self, message, language, priority="Medium"):
+        speak(message, language, priority)
 
 # Collaboration Agent
+# Shared by every resident; alerts name the resident they are about and go
+# out through the alert pipeline, which may suppress them
 class CollaborationAgent:
-    def send_alert(self, message, emergency=False, priority="Medium"):
-        alert_message = f"Alert (Priority: {priority}): {message}"
-        if emergency:
-            alert_message += " Notifying local contact: Neighbor John to check on user. Estimated arrival: 5 minutes."
-        self._log_activity(alert_message)
-        self._play_voice(alert_message, session.get("language", "en"))
-        return alert_message
-
-    def confirm_action(self, message):
-        self._play_voice(f"Caregiver, {message} Did you help them rest? (Simulated: Yes)", session.get("language", "en"))
-        self._log_activity("Caregiver confirmed: Yes")
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        pipeline.on_dispatch = self._alert_sent
+
+    # kind groups alerts for deduplication. Returns the Alert, or None when
+    # the pipeline suppressed it.
+    def send_alert(self, message, emergency=False, priority="Medium", resident_id=DEFAULT_RESIDENT, kind="alert"):
+        return self.pipeline.dispatch(resident_id, kind, message, priority, emergency)
+
+    # Every alert sent, escalations included, is logged and streamed before delivery
+    def _alert_sent(self, alert):
+        self._log_activity(alert.text, alert.resident_id, "alert", alert.priority)
+        publish(
+            "alert",
+            {"ts": time.time(), "message": alert.text, "priority": alert.priority, "resident": alert.resident_id,
+             "id": alert.alert_id, "kind": alert.kind},
+            alert.resident_id,
+        )
+
+    def confirm_action(self, message, resident_id=DEFAULT_RESIDENT):
+        self._play_voice(CAREGIVER_CONFIRMATION.format(message=message), current_language())
+        self._log_activity("Caregiver confirmed: Yes", resident_id, "caregiver")
         return "Caregiver confirmed: Yes"
 
-    def _log_activity(self, message):
-        with open(ACTIVITY_LOG_FILE, "r") as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                data = []
-        data.append({"timestamp": time.ctime(), "activity": message})
-        with open(ACTIVITY_LOG_FILE, "w") as f:
-            json.dump(data[-5:], f)
-
-    def _play_voice(self, message, language):
-        global playing, audio_lock
-        with audio_lock:
-            if playing:
-                print("Audio already playing, skipping new request.")
-                return
-            playing = True
-
-        def play_audio():
-            global playing
-            try:
-                audio_file = f"temp_{int(time.time() * 1000)}.mp3"
-                print(f"Generating audio for: {message} in language: {language}")
-                lang_code = "hi" if language == "hi" else "en"
-                tts = gTTS(text=message, lang=lang_code)
-                tts.save(audio_file)
-                print(f"Audio file saved as: {audio_file}")
-                pygame.mixer.music.load(audio_file)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    pygame.time.Clock().tick(10)
-                os.remove(audio_file)
-                print(f"Audio playback completed and file {audio_file} removed.")
-            except Exception as e:
-                print(f"Error in audio playback: {e}")
-                self._log_activity(f"Voice playback failed for '{message}' in {language}: {e}")
-            finally:
-                with audio_lock:
-                    playing = False
-
-        threading.Thread(target=play_audio, daemon=True).start()
-
-# Main System
+    def _log_activity(self, message, resident_id=DEFAULT_RESIDENT, kind="other", priority=None):
+        record_activity(message, resident_id, kind, priority)
+
+    def _play_voice(self, message, language, priority="Medium"):
+        speak(message, language, priority)
+
+# One resident's agents. Each resident has its own lock, so requests and
+# monitoring for different residents never wait on each other. Reminders are
+# kept only by the process that fires them, so a follower's residents have none.
+class Resident:
+    def __init__(self, resident_id, reminders=True):
+        self.resident_id = resident_id
+        self.lock = threading.RLock()
+        self.health_agent = HealthMonitoringAgent(resident_id=resident_id)
+        self.reminder_agent = ReminderAgent(resident_id, lock=self.lock) if reminders else None
+        # Baselines start from the readings already in the recent window
+        self.health_agent.anomaly_detector.warm_up(recent_cache.recent("health", RECENT_CACHE_SIZE, resident_id))
+        self.social_agent = SocialEngagementAgent(resident_id)
+        self.stale = False
+
+    def refresh(self):
+        if self.reminder_agent is None:
+            return
+        with self.lock:
+            if self.stale:
+                self.reminder_agent.storage_version = None
+                self.stale = False
+            self.reminder_agent.reload_if_changed()
+
+
+# How often changed trend rollups are written to ROLLUPS_DIR
+ROLLUP_FLUSH_SECONDS = 60
+# "host:port" or a Unix socket path to accept JSON Lines sensor events on; unset: off
+SENSOR_SOCKET = os.environ.get("SENSOR_SOCKET")
+# Alert delivery: a URL to POST alerts of ALERT_WEBHOOK_PRIORITY and above to
+# (unset: no webhook), delivery workers and retries per channel, and each
+# resident's sustained alerts per hour and burst
+ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL")
+ALERT_WEBHOOK_PRIORITY = os.environ.get("ALERT_WEBHOOK_PRIORITY", "High")
+ALERT_WORKERS = int(os.environ.get("ALERT_WORKERS", "4"))
+ALERT_RETRIES = int(os.environ.get("ALERT_RETRIES", "3"))
+ALERT_RATE_PER_HOUR = float(os.environ.get("ALERT_RATE_PER_HOUR", "20"))
+ALERT_BURST = int(os.environ.get("ALERT_BURST", "5"))
+
+
+def _alert_channels():
+    channels = [LogChannel(ALERT_LOG_FILE), AudioChannel(speak, current_language)]
+    if ALERT_WEBHOOK_URL:
+        channels.append(WebhookChannel(ALERT_WEBHOOK_URL, ALERT_WEBHOOK_PRIORITY))
+    return channels
+
+
+# Chat conversations: most kept in memory, seconds unused before one is
+# dropped, messages kept per conversation, and whether the least recently
+# used are written to CHATS_DIR (rather than dropped) when memory is full
+CHAT_CAPACITY = int(os.environ.get("CHAT_CAPACITY", "1000"))
+CHAT_TTL_SECONDS = int(os.environ.get("CHAT_TTL_SECONDS", str(24 * 3600)))
+CHAT_HISTORY_LIMIT = int(os.environ.get("CHAT_HISTORY_LIMIT", "50"))
+CHAT_SPILL = os.environ.get("CHAT_SPILL", "1") != "0"
+# How often expired chat conversations are swept
+CHAT_SWEEP_SECONDS = 600
+
+
+# Main System: one event-driven monitoring engine serving every resident.
+# Readings, falls and activity are pushed to the engine as they happen;
+# inactivity is a per-resident deadline pushed back by every activity.
 class ElderlyCareSystem:
-    def __init__(self):
-        self.health_agent = HealthMonitoringAgent()
-        self.reminder_agent = ReminderAgent()
-        self.social_agent = SocialEngagementAgent()
-        self.collaboration_agent = CollaborationAgent()
+    def __init__(self, clock=time.time):
+        self.residents = {}  # resident_id -> Resident, created on first use
+        self.residents_lock = threading.Lock()
         self.suggestions_agent = HealthSuggestionsAgent()
+        self.clock = clock
+        self.engine = MonitoringEngine(
+            {"reading": self._on_reading, "fall": self._on_fall, "activity": self._on_activity, "accel": self._on_accel},
+            clock,
+        )
+        # Escalations run on the engine's timers
+        self.alerts = AlertPipeline(
+            _alert_channels(), clock, ALERT_WORKERS, ALERT_RETRIES, rate=ALERT_RATE_PER_HOUR / 3600, burst=ALERT_BURST,
+            formatter=format_alert, set_timer=self.engine.set_timer, cancel_timer=self.engine.cancel_timer,
+        )
+        self.collaboration_agent = CollaborationAgent(self.alerts)
+        self.running = False
+
+    def resident(self, resident_id=DEFAULT_RESIDENT):
+        resident = self.residents.get(resident_id)
+        if resident is None:
+            created = False
+            with self.residents_lock:
+                resident = self.residents.get(resident_id)
+                if resident is None:
+                    resident = self.residents[resident_id] = Resident(resident_id, leader_client is None)
+                    resident.health_agent.last_activity_time = self.clock()
+                    created = True
+            if created and self.running:
+                self._arm(resident)
+        resident.refresh()
+        return resident
+
+    # Force a reload of on-disk state on the next request
+    def invalidate(self):
+        for resident in list(self.residents.values()):
+            resident.stale = True
+
+    # Called by routes once a reading is stored. Alerts are raised only when
+    # the resident moves into At Risk, and the all-clear only on the way back.
+    # anomalies are the detector's onsets; the first per metric is reported.
+    # vitals are the latest (heart rate, systolic, diastolic, glucose), which
+    # the engine's suggestions are based on.
+    def reading_received(self, resident_id, previous_status, status, went_at_risk=None, message="At Risk", anomalies=(),
+                         vitals=None):
+        if went_at_risk is None:
+            went_at_risk = status == AT_RISK and previous_status != AT_RISK
+        recovered = not went_at_risk and previous_status == AT_RISK and status == NORMAL
+        unusual = {}
+        for anomaly in anomalies:
+            unusual.setdefault(anomaly.metric, anomaly.describe())
+        self._push("reading", resident_id, {
+            "alert": went_at_risk, "recovered": recovered, "message": message, "unusual": list(unusual.values()),
+            "vitals": vitals,
+        })
+        return went_at_risk
+
+    # Signals for the engine; a follower's go to the leader's
+    def _push(self, kind, resident_id, data=None):
+        if leader_client is not None:
+            leader_client.notify("push", kind, resident_id, data)
+        else:
+            self.engine.push(kind, resident_id, data)
+
+    # Log and score one resident's ReadingBatch, then queue any alerts.
+    # Returns the RiskBatch, whether an At Risk alert was queued and the anomaly onsets.
+    def readings_received(self, batch, label="uploaded readings"):
+        resident = self.resident(batch.resident_id)
+        with resident.lock:
+            previous_status = resident.health_agent.health_status
+            health_agent = resident.health_agent
+            scored = health_agent.monitor_batch(batch)
+            anomalies = health_agent.anomalies
+            vitals = (health_agent.heart_rate, *health_agent.blood_pressure, health_agent.glucose)
+        # One alert per resident and batch, however often the readings flip
+        went_at_risk = any(scored.at_risk[i] for i in scored.transitions)
+        risky = sum(1 for flag in scored.at_risk if flag)
+        alerted = self.reading_received(
+            batch.resident_id, previous_status, scored.last_status, went_at_risk,
+            f"At Risk ({risky} of {len(batch)} {label})", anomalies, vitals,
+        )
+        return scored, alerted, anomalies
+
+    # SensorHub dispatch: readings are handled like an upload; falls, activity
+    # pings and accelerometer windows go to the engine
+    def sensor_events(self, batches, signals):
+        for batch in batches:
+            self.readings_received(batch, "sensor readings")
+        for signal in signals:
+            if signal.kind == "accel":
+                self.resident(signal.resident_id)
+                self._push("accel", signal.resident_id, signal.samples)
+            elif signal.kind == "fall":
+                self.fall_reported(signal.resident_id)
+            else:
+                self.activity_seen(signal.resident_id)
 
-    def run(self):
-        print("Starting Elderly Care System...\n")
-        last_alert_reset = time.time()
+    def fall_reported(self, resident_id):
+        self._push("fall", resident_id)
 
-        # Schedule existing reminders
-        for task in self.reminder_agent.schedule:
-            self.reminder_agent.schedule_reminder(task)
-        for reminder in self.reminder_agent.custom_reminders:
-            self.reminder_agent.schedule_custom_reminder(reminder)
+    def activity_seen(self, resident_id):
+        self._push("activity", resident_id)
 
-        # Start reminder scheduler
-        reminder_thread = threading.Thread(target=self._run_scheduler, daemon=True)
-        reminder_thread.start()
+    def run(self):
+        print("Starting Elderly Care System...\n")
 
-        while True:
-            print("=== Health Monitoring ===")
-            risk_detected, risk_message = self.health_agent.monitor_health(self.health_agent.heart_rate, self.health_agent.blood_pressure, self.health_agent.glucose)
-            if risk_detected:
-                self.collaboration_agent.send_alert(risk_message, emergency=True, priority="High")
-                self.collaboration_agent.confirm_action(f"Health risk detected: {risk_message}")
+        # Load every resident, which registers their reminders
+        self.running = True
+        for resident_id in storage.residents():
+            self.resident(resident_id)
+        for resident in list(self.residents.values()):
+            self._arm(resident)
+        self.engine.set_timer(("rollups",), self.clock() + ROLLUP_FLUSH_SECONDS, self._flush_rollups)
+        self.engine.set_timer(("chats",), self.clock() + CHAT_SWEEP_SECONDS, self._sweep_chats)
+        if SENSOR_SOCKET:
+            print(f"Listening for sensor events on {SocketSource(sensor_hub, SENSOR_SOCKET).start()}")
+
+        reminder_scheduler.start()
+
+        self.engine.run()
+
+    def _arm(self, resident):
+        resident_id = resident.resident_id
+        health_agent = resident.health_agent
+        self.engine.set_timer(
+            ("inactivity", resident_id), health_agent.last_activity_time + health_agent.inactivity_seconds,
+            lambda: self._on_inactive(resident_id),
+        )
+
+    def _touch(self, resident):
+        health_agent = resident.health_agent
+        health_agent.last_activity_time = self.clock()
+        self.engine.set_timer(
+            ("inactivity", resident.resident_id), health_agent.last_activity_time + health_agent.inactivity_seconds,
+            lambda: self._on_inactive(resident.resident_id),
+        )
+
+    def _on_activity(self, resident_id, data):
+        self._touch(self.resident(resident_id))
+
+    def _on_reading(self, resident_id, data):
+        resident = self.resident(resident_id)
+        self._touch(resident)
+        with resident.lock:
+            health_agent = resident.health_agent
+            # A suppressed alert also skips the prompts and schedule changes that follow it
+            if data["alert"] and self.collaboration_agent.send_alert(
+                data["message"], emergency=True, priority="High", resident_id=resident_id, kind="at_risk"
+            ):
+                self.collaboration_agent.confirm_action(f"Health risk detected: {data['message']}", resident_id)
+                # From the reading itself: on a follower it never reached this process's agent
+                heart_rate, systolic, diastolic, glucose = data["vitals"]
                 suggestions = self.suggestions_agent.get_suggestions(
-                    self.health_agent.heart_rate,
-                    self.health_agent.blood_pressure,
-                    self.health_agent.glucose,
-                    self.health_agent.hr_threshold,
-                    self.health_agent.bp_threshold,
-                    self.health_agent.bp_low_threshold,
-                    self.health_agent.glucose_threshold,
-                    self.health_agent.glucose_low_threshold
+                    heart_rate,
+                    (systolic, diastolic),
+                    glucose,
+                    health_agent.hr_threshold,
+                    health_agent.bp_threshold,
+                    health_agent.bp_low_threshold,
+                    health_agent.glucose_threshold,
+                    health_agent.glucose_low_threshold
                 )
                 for suggestion in suggestions:
-                    self.suggestions_agent._play_voice(suggestion, session.get("language", "en"))
-                self.reminder_agent.adjust_schedule(risk_detected)
-            else:
-                if self.health_agent.health_status != self.health_agent.last_health_status:
-                    self.suggestions_agent._play_voice("Your health is normal. You’re doing great!", session.get("language", "en"))
-
-            print("\n=== Fall Detection ===")
-            fall_detected, fall_message = self.health_agent.detect_fall()
-            if fall_detected and not risk_detected:
-                self.collaboration_agent.send_alert(fall_message, emergency=True, priority="Critical")
-                self.suggestions_agent._play_voice("A fall has been detected. Help is on the way.", session.get("language", "en"))
-
-            print("\n=== Safety Monitoring ===")
-            unusual_detected, unusual_message = self.health_agent.detect_unusual_behavior()
-            if unusual_detected and not risk_detected:
-                self.social_agent.start_chat(session.get("language", "en"), session.get("gender", "male"))
-                self.collaboration_agent.send_alert(unusual_message, priority="Medium")
-                self.reminder_agent.adjust_schedule(health_status=False, unusual_behavior=True)
-
-            if time.time() - last_alert_reset >= 86400:  # 24 hours
-                with open(ACTIVITY_LOG_FILE, "r") as f:
-                    try:
-                        activity_log = json.load(f)
-                    except json.JSONDecodeError:
-                        activity_log = []
-                activity_log = [entry for entry in activity_log if not entry.get("timestamp", "").startswith(time.ctime().split()[0])]
-                with open(ACTIVITY_LOG_FILE, "w") as f:
-                    json.dump(activity_log, f)
-                last_alert_reset = time.time()
-
-            time.sleep(300)  # Check every 5 minutes
-
-    def _run_scheduler(self):
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+                    self.suggestions_agent._play_voice(suggestion, current_language())
+                resident.reminder_agent.adjust_schedule(True)
+            elif data["recovered"]:
+                self.suggestions_agent._play_voice(HEALTH_NORMAL, current_language())
+            # Within the thresholds but far from the resident's baseline
+            if data["unusual"] and not data["alert"]:
+                self.collaboration_agent.send_alert(
+                    f"Unusual for this resident: {'; '.join(data['unusual'])}", priority="Medium",
+                    resident_id=resident_id, kind="unusual",
+                )
+
+    def _on_fall(self, resident_id, data):
+        resident = self.resident(resident_id)
+        with resident.lock:
+            _, fall_message = resident.health_agent.record_fall()
+        self._raise_fall(resident_id, fall_message)
+
+    def _raise_fall(self, resident_id, fall_message):
+        if self.collaboration_agent.send_alert(
+            fall_message, emergency=True, priority="Critical", resident_id=resident_id, kind="fall"
+        ):
+            self.suggestions_agent._play_voice(FALL_NOTICE, current_language(), "Critical")
+
+    def _on_accel(self, resident_id, samples):
+        resident = self.resident(resident_id)
+        with resident.lock:
+            fall_detected, fall_message = resident.health_agent.detect_fall(samples)
+        if fall_detected:
+            self._raise_fall(resident_id, fall_message)
+
+    def _on_inactive(self, resident_id):
+        resident = self.resident(resident_id)
+        with resident.lock:
+            unusual_detected, unusual_message = resident.health_agent.detect_unusual_behavior(self.clock())
+            if unusual_detected and self.collaboration_agent.send_alert(
+                unusual_message, priority="Medium", resident_id=resident_id, kind="inactivity"
+            ):
+                resident.social_agent.start_chat(current_language(), current_gender())
+                resident.reminder_agent.adjust_schedule(health_status=False, unusual_behavior=True)
+        # Still inactive: remind again after another full period
+        self._touch(resident)
+
+    def _flush_rollups(self):
+        self.engine.set_timer(("rollups",), self.clock() + ROLLUP_FLUSH_SECONDS, self._flush_rollups)
+        rollups.flush()
+
+    def _sweep_chats(self):
+        self.engine.set_timer(("chats",), self.clock() + CHAT_SWEEP_SECONDS, self._sweep_chats)
+        chat_store.sweep()
+
+# One system per process, shared by every request and the monitoring loop
+_system = None
+_system_lock = threading.Lock()
+
+
+def get_system():
+    global _system
+    if _system is None:
+        with _system_lock:
+            if _system is None:
+                _system = ElderlyCareSystem()
+    return _system
 
 # Flask Routes
 @app.route('/', methods=['GET', 'POST'])
@@ -659,43 +956,152 @@ def dashboard():
             session['language'] = request.form['language']
         if 'gender' in request.form:
             session['gender'] = request.form['gender']
-    try:
-        with open(HEALTH_LOG_FILE, "r") as f:
-            health_data = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        health_data = []
-    for entry in health_data:
-        entry.setdefault('heart_rate', 0)
-        entry.setdefault('glucose', 0)
-    try:
-        with open(ACTIVITY_LOG_FILE, "r") as f:
-            activity_log = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        activity_log = []
-    latest_health = health_data[-1] if health_data else {}
-    alerts_today = sum(1 for log in activity_log if "Alert" in log["activity"] and log.get("timestamp", "").startswith(time.ctime().split()[0])) if activity_log else 0
-    system = ElderlyCareSystem()
-    labels = system.social_agent.activities[session.get("language", "en")]["labels"]
-    chat_history = session.get('chat_history', [])
-    return render_template("dashboard.html", health_data=health_data[-5:], activity_log=activity_log[-5:], latest_health=latest_health, alerts_today=alerts_today, language=session.get("language", "en"), gender=session.get("gender", "male"), labels=labels, chat_history=chat_history)
+    resident_id = current_resident()
+    health_data = recent_cache.recent("health", 5, resident_id)
+    activity_log = recent_cache.recent("activity", 5, resident_id)
+    latest_health = health_data[-1] if health_data else None
+    alerts_today = recent_cache.alerts_today(resident_id)
+    resident = get_system().resident(resident_id)
+    labels = resident.social_agent.activities[current_language()]["labels"]
+    chat_history = on_leader("chat_history", session.get("chat_id"), resident_id, 0)["chat_history"]
+    return render_template("dashboard.html", health_data=health_data, activity_log=activity_log[-5:], latest_health=latest_health, alerts_today=alerts_today, language=current_language(), gender=current_gender(), resident=resident_id, labels=labels, chat_history=chat_history)
+
+# Answer from the storage version counter when the client's copy is current,
+# and send only records after ?since=<cursor> when one is given
+def _log_response(kind, storage_since):
+    resident_id = current_resident()
+    etag = f"{kind}-{resident_id}-{BOOT_ID}-{storage.version(kind, resident_id)}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        since_cursor = request.args.get("since", type=int)
+        if since_cursor is None:
+            records, next_cursor = recent_cache.recent(kind, 5, resident_id), recent_cache.cursor(kind, resident_id)
+        else:
+            # Older cursors than the in-memory window covers go to storage
+            result = recent_cache.since(kind, since_cursor, resident_id=resident_id)
+            if result is None:
+                entries, next_cursor = storage_since(since_cursor, resident_id=resident_id)
+                result = [RECORD_TYPES[kind].from_dict(entry) for entry in entries], next_cursor
+            records, next_cursor = result
+        response = jsonify([record.to_dict() for record in records])
+        response.headers["X-Cursor"] = str(next_cursor)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 @app.route('/api/health')
 def get_health():
-    try:
-        with open(HEALTH_LOG_FILE, "r") as f:
-            health_data = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        health_data = []
-    return jsonify(health_data[-5:])
+    return _log_response("health", storage.health_since)
 
 @app.route('/api/activity')
 def get_activity():
+    return _log_response("activity", storage.activity_since)
+
+# Most buckets returned in one response
+TREND_MAX_POINTS = 5000
+
+
+def _trend_time(value, default):
+    if not value:
+        return default
+    try:
+        ts = float(value)
+    except ValueError:
+        ts = datetime.fromisoformat(value).timestamp()
+    # nan and inf would reach the JSON response, and dates past what the
+    # platform's time functions take raise OverflowError
+    if not (math.isfinite(ts) and 0 <= ts < MAX_TIMESTAMP):
+        raise ValueError(f"not a time: {value}")
+    return ts
+
+# Min/max/mean/count per minute, hour or day between from and to (epoch
+# seconds or ISO dates; the last 7 days by default), answered from rollups
+@app.route('/api/health/trends')
+def health_trends():
+    resident_id = current_resident()
+    try:
+        end = _trend_time(request.args.get("to"), time.time())
+        start = _trend_time(request.args.get("from"), end - 7 * 86400)
+    except ValueError:
+        return jsonify({"status": "error", "message": "from and to must be epoch seconds or ISO dates"}), 400
+    if end <= start:
+        return jsonify({"status": "error", "message": "from must be before to"}), 400
+    resolution = request.args.get("resolution", "auto")
+    if resolution == "auto":
+        resolution = choose_resolution(start, end)
+    if resolution not in RESOLUTIONS:
+        return jsonify({"status": "error", "message": f"resolution must be auto, {', '.join(RESOLUTIONS)}"}), 400
+    points = rollups.trends(resident_id, resolution, start, end)
+    if len(points) > TREND_MAX_POINTS:
+        return jsonify({"status": "error", "message": "Too many points; use a coarser resolution"}), 400
+    return jsonify({
+        "status": "success", "resident": resident_id, "resolution": resolution, "from": start, "to": end, "points": points,
+    })
+
+# Most activity entries returned in one page
+ACTIVITY_PAGE_MAX = 500
+
+# Full activity history, newest first, one page at a time: ?from=&to= (epoch
+# seconds or ISO dates), ?kind=alert&priority=Critical (comma-separated or
+# repeated) and ?limit=. "next" goes in ?before= for the following page.
+@app.route('/api/activity/history')
+def activity_history():
+    resident_id = current_resident()
     try:
-        with open(ACTIVITY_LOG_FILE, "r") as f:
-            activity_log = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        activity_log = []
-    return jsonify(activity_log[-5:])
+        end = _trend_time(request.args.get("to"), None)
+        start = _trend_time(request.args.get("from"), None)
+    except ValueError:
+        return jsonify({"status": "error", "message": "from and to must be epoch seconds or ISO dates"}), 400
+    kinds = {kind for value in request.args.getlist("kind") for kind in value.split(",") if kind}
+    priorities = {priority for value in request.args.getlist("priority") for priority in value.split(",") if priority}
+    unknown = kinds - set(ACTIVITY_KINDS)
+    if unknown:
+        return jsonify({"status": "error", "message": f"Unknown kind: {', '.join(sorted(unknown))}"}), 400
+    before = request.args.get("before", type=int)
+    limit = min(max(request.args.get("limit", 100, type=int), 1), ACTIVITY_PAGE_MAX)
+    entries, next_before = storage.query_activity(
+        start, end, kinds or None, priorities or None, before, limit, resident_id=resident_id
+    )
+    return jsonify({
+        "status": "success", "resident": resident_id, "next": next_before,
+        "entries": [dict(ActivityEvent.from_dict(entry).to_dict(), seq=entry["seq"]) for entry in entries],
+    })
+
+# The resident's baseline per metric, as the anomaly detector sees it now
+@app.route('/api/health/baseline')
+def health_baseline():
+    resident = get_system().resident(current_resident())
+    with resident.lock:
+        baseline = resident.health_agent.anomaly_detector.to_dict()
+    return jsonify({"status": "success", "resident": resident.resident_id, "baseline": baseline})
+
+@app.route('/api/stream')
+def stream():
+    resident_id = current_resident()
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or 0)
+    except ValueError:
+        last_id = 0
+
+    if not _stream_slots.acquire(blocking=False):
+        response = jsonify({"status": "error", "message": "Too many live streams; poll /api/health instead"})
+        return response, 503, {"Retry-After": "60"}
+
+    def generate(last_id):
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while True:
+            events = event_bus.wait(last_id, SSE_HEARTBEAT_SECONDS, resident_id)
+            if not events:
+                yield ": heartbeat\n\n"
+                continue
+            for event in events:
+                yield event.to_sse()
+                last_id = event.id
+
+    response = Response(generate(last_id), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(_stream_slots.release)  # the server closes the response when the client goes away
+    return response
 
 @app.route('/set_reminder', methods=['POST'])
 def set_reminder():
@@ -705,11 +1111,20 @@ def set_reminder():
     category = data.get('category', 'other')
     critical = data.get('critical', False) == 'true'
     if reminder_time and message:
-        system = ElderlyCareSystem()
-        system.reminder_agent.set_custom_reminder(reminder_time, message, category, critical)
+        on_leader("set_reminder", current_resident(), reminder_time, message, category, critical)
         return jsonify({"status": "success", "message": "Reminder set successfully"})
     return jsonify({"status": "error", "message": "Invalid input"})
 
+
+# Reminders live with the scheduler that fires them, on the leader when
+# several processes serve the app
+def _set_reminder(resident_id, reminder_time, message, category, critical):
+    system = get_system()
+    resident = system.resident(resident_id)
+    with resident.lock:
+        resident.reminder_agent.set_custom_reminder(reminder_time, message, category, critical)
+    system.activity_seen(resident_id)
+
 @app.route('/submit_health', methods=['POST'])
 def submit_health():
     data = request.form
@@ -720,37 +1135,343 @@ def submit_health():
         glucose = int(data.get('glucose', 0))
         if not (heart_rate and bp_systolic and bp_diastolic and glucose):
             return jsonify({"status": "error", "message": "All fields are required"})
-        system = ElderlyCareSystem()
-        _, health_status = system.health_agent.monitor_health(heart_rate, (bp_systolic, bp_diastolic), glucose)
+        system = get_system()
+        resident = system.resident(current_resident())
+        with resident.lock:
+            previous_status = resident.health_agent.health_status
+            _, health_status = resident.health_agent.monitor_health(heart_rate, (bp_systolic, bp_diastolic), glucose)
+            system.reading_received(
+                resident.resident_id, previous_status, resident.health_agent.health_status,
+                anomalies=resident.health_agent.anomalies, vitals=(heart_rate, bp_systolic, bp_diastolic, glucose),
+            )
         message = f"Successful submission. Your health status is {health_status}."
-        system.health_agent._play_voice(message, session.get("language", "en"))
+        resident.health_agent._play_voice(message, current_language())
         return jsonify({"status": "success", "message": message, "health_status": health_status})
     except (ValueError, TypeError):
         return jsonify({"status": "error", "message": "Invalid input"})
 
+# Bulk sensor upload: a JSON array, {"resident": ..., "readings": [...]} or
+# JSON Lines. Readings are objects with the /submit_health fields (plus
+# optional "resident" and epoch "ts") or compact arrays in READING_FIELDS order.
+INGEST_MAX_BYTES = int(os.environ.get("INGEST_MAX_BYTES", str(16 * 1024 * 1024)))
+ingest_stats = {"requests": 0, "accepted": 0, "rejected": 0, "alerts": 0, "anomalies": 0, "seconds": 0.0}
+_ingest_stats_lock = threading.Lock()
+
+
+@app.route('/api/ingest', methods=['GET', 'POST'])
+def ingest():
+    if request.method == 'GET':
+        with _ingest_stats_lock:
+            stats = dict(ingest_stats)
+        stats["readings_per_second"] = round(stats["accepted"] / stats["seconds"]) if stats["seconds"] else 0
+        return jsonify(stats)
+
+    if request.content_length and request.content_length > INGEST_MAX_BYTES:
+        return jsonify({"status": "error", "message": "Payload too large"}), 413
+    start = time.perf_counter()
+    try:
+        batches, rejected, errors = parse_readings(request.get_data(), request.mimetype, current_resident())
+    except IngestError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    system = get_system()
+    accepted = transitions = alerts = anomalies = 0
+    for batch in batches:
+        scored, alerted, batch_anomalies = system.readings_received(batch)
+        accepted += len(batch)
+        transitions += len(scored.transitions)
+        anomalies += len(batch_anomalies)
+        alerts += alerted
+
+    elapsed = time.perf_counter() - start
+    with _ingest_stats_lock:
+        ingest_stats["requests"] += 1
+        ingest_stats["accepted"] += accepted
+        ingest_stats["rejected"] += rejected
+        ingest_stats["alerts"] += alerts
+        ingest_stats["anomalies"] += anomalies
+        ingest_stats["seconds"] += elapsed
+    return jsonify({
+        "status": "success" if accepted or not rejected else "error",
+        "accepted": accepted,
+        "rejected": rejected,
+        "errors": errors,
+        "residents": len(batches),
+        "transitions": transitions,
+        "alerts": alerts,
+        "anomalies": anomalies,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "readings_per_second": round(accepted / elapsed) if elapsed else 0,
+    })
+
+# Fall and movement signals from sensors: {"type": "fall" | "activity", "resident"?}
+@app.route('/api/sensor_event', methods=['POST'])
+def sensor_event():
+    data = request.get_json(silent=True)
+    if data is not None and not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Expected a JSON object"}), 400
+    event_type = (data or {}).get("type") or request.form.get("type")
+    system = get_system()
+    resident_id = current_resident()
+    if event_type == "fall":
+        system.fall_reported(resident_id)
+    elif event_type == "activity":
+        system.activity_seen(resident_id)
+    else:
+        return jsonify({"status": "error", "message": "type must be fall or activity"}), 400
+    return jsonify({"status": "accepted"}), 202
+
+# Mixed sensor streams: readings, falls, activity pings and accelerometer
+# windows as JSON Lines or a JSON array (see ingest.parse_events). The same
+# events can come in over SENSOR_SOCKET. GET returns counts per source.
+sensor_hub = SensorHub(lambda batches, signals: get_system().sensor_events(batches, signals))
+
+
+@app.route('/api/sensors', methods=['GET', 'POST'])
+def sensor_stream():
+    if request.method == 'GET':
+        return jsonify(sensor_hub.stats())
+    if request.content_length and request.content_length > INGEST_MAX_BYTES:
+        return jsonify({"status": "error", "message": "Payload too large"}), 413
+    try:
+        accepted, rejected, errors = sensor_hub.feed(request.get_data(), "http", request.mimetype, current_resident())
+    except IngestError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if rejected and not accepted:
+        return jsonify({"status": "error", "accepted": 0, "rejected": rejected, "errors": errors}), 400
+    return jsonify({"status": "accepted", "accepted": accepted, "rejected": rejected, "errors": errors}), 202
+
+# The monitoring engine and the alert pipeline run on the leader
+@app.route('/api/monitor')
+def monitor_stats():
+    return jsonify(on_leader("monitor"))
+
+# Alert pipeline counts and latency, and the alerts awaiting acknowledgement
+@app.route('/api/alerts')
+def alert_stats():
+    return jsonify(on_leader("alerts"))
+
+# Stops an alert (or any alert of its escalation chain) from escalating
+@app.route('/api/alerts/<int:alert_id>/ack', methods=['POST'])
+def acknowledge_alert(alert_id):
+    alert = on_leader("acknowledge", alert_id)
+    if alert is None:
+        return jsonify({"status": "error", "message": "No such alert awaiting acknowledgement"}), 404
+    return jsonify({"status": "success", "alert": alert})
+
+
+def _alert_state():
+    alerts = get_system().alerts
+    return {"stats": alerts.stats(), "open": alerts.open_alerts()}
+
+
+# The acknowledged alert as a dict, or None when it was not awaiting acknowledgement
+def _acknowledge(alert_id):
+    alert = get_system().alerts.acknowledge(alert_id)
+    if alert is None:
+        return None
+    record_activity(f"Alert {alert.root} acknowledged", alert.resident_id, "caregiver")
+    return alert.to_dict()
+
+# Conversations live on the server; the session cookie holds only their id
+chat_store = ChatStore(CHAT_CAPACITY, CHAT_TTL_SECONDS, CHAT_HISTORY_LIMIT, CHATS_DIR if CHAT_SPILL else None)
+
+
+# The conversation with this resident for a session's chat id, or None
+def _conversation(chat_id, resident_id):
+    conversation = chat_store.get(chat_id)
+    if conversation is None or conversation.resident_id != resident_id:
+        return None
+    return conversation
+
+
+# The number of the last message the client has, from ?since= or "since" in
+# the body, or None
+def _chat_since():
+    since = request.values.get("since")
+    if since is None and request.is_json:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            since = payload.get("since")
+    if since is None:
+        return None
+    if isinstance(since, bool):
+        abort(400, description="Invalid since")
+    try:
+        return int(since)
+    except (TypeError, ValueError, OverflowError):
+        abort(400, description="Invalid since")
+
+
+# The session keeps the chat id it is given; older versions kept the history
+def _chat_response(result):
+    chat_id = result.pop("chat_id")
+    if chat_id is not None and chat_id != session.get("chat_id"):
+        session["chat_id"] = chat_id
+        session.pop("chat_history", None)
+    return jsonify(result)
+
+# "seq" in chat responses numbers the latest message, for the next "since"
 @app.route('/api/start_chat', methods=['POST'])
 def start_chat():
-    system = ElderlyCareSystem()
-    language = session.get("language", "en")
-    gender = session.get("gender", "male")
-    chat_history = system.social_agent.start_chat(language, gender)
-    session['chat_history'] = chat_history
-    return jsonify({"chat_history": chat_history})
-
-@app.route('/api/chat', methods=['POST'])
+    return _chat_response(on_leader("chat_start", current_resident(), current_language(), current_gender()))
+
+@app.route('/api/chat', methods=['GET', 'POST'])
 def chat():
-    data = request.json
+    if request.method == 'GET':
+        # The session's kept history, e.g. to redraw the chat after a reload
+        return _chat_response(on_leader("chat_history", session.get("chat_id"), current_resident(), _chat_since() or 0))
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('message', ''), str):
+        abort(400, description="Expected a JSON object with a message")
     user_message = data.get('message', '').strip()
     if not user_message:
         return jsonify({"chat_history": [{"role": "system", "message": "Please enter a message."}]})
-    system = ElderlyCareSystem()
-    language = session.get("language", "en")
-    gender = session.get("gender", "male")
-    chat_history = system.social_agent.respond_to_user(user_message, language, gender)
-    session['chat_history'] = chat_history
-    return jsonify({"chat_history": chat_history})
+    return _chat_response(on_leader(
+        "chat_reply", session.get("chat_id"), current_resident(), user_message, current_language(), current_gender(),
+        _chat_since(),
+    ))
+
+@app.route('/api/chats')
+def chat_stats():
+    return jsonify(on_leader("chat_stats"))
+
+
+# Chat turns run where the conversations are kept: in this process, or on the
+# leader when several processes serve the app. Each returns the chat id for
+# the session, the messages the client does not have yet and the number of
+# the latest as {"chat_id", "chat_history", "seq"}.
+def _chat_start(resident_id, language, gender):
+    system = get_system()
+    resident = system.resident(resident_id)
+    conversation = chat_store.create(resident_id)
+    with resident.lock:
+        messages = resident.social_agent.start_chat(language, gender)
+        added = [conversation.add(message["role"], message["message"]) for message in messages]
+    system.activity_seen(resident_id)
+    return {"chat_id": conversation.chat_id, "chat_history": added, "seq": conversation.seq}
+
+
+def _chat_history(chat_id, resident_id, since):
+    conversation = _conversation(chat_id, resident_id)
+    if conversation is None:
+        return {"chat_id": None, "chat_history": [], "seq": 0}
+    return {"chat_id": chat_id, "chat_history": conversation.since(since), "seq": conversation.seq}
+
+
+# Messages after `since` when given, else the ones just added. A conversation
+# that expired is started afresh, and the client's `since` no longer applies.
+def _chat_reply(chat_id, resident_id, user_message, language, gender, since):
+    system = get_system()
+    resident = system.resident(resident_id)
+    conversation = _conversation(chat_id, resident_id)
+    if conversation is None:
+        conversation = chat_store.create(resident_id)
+        since = None
+    with resident.lock:
+        messages = resident.social_agent.respond_to_user(user_message, language, gender)
+        added = [conversation.add(message["role"], message["message"]) for message in messages]
+        if since is not None:
+            added = conversation.since(since)
+    system.activity_seen(resident_id)
+    return {"chat_id": conversation.chat_id, "chat_history": added, "seq": conversation.seq}
+
+
+# Calls that need the leader's state: run here, or sent to the leader from a
+# follower. Arguments and results are plain JSON values either way.
+LEADER_CALLS = {
+    "set_reminder": _set_reminder,
+    "chat_start": _chat_start,
+    "chat_history": _chat_history,
+    "chat_reply": _chat_reply,
+    "chat_stats": lambda: chat_store.stats(),
+    "alerts": _alert_state,
+    "acknowledge": _acknowledge,
+    "monitor": lambda: get_system().engine.stats(),
+}
+# Followers' fire-and-forget messages
+LEADER_NOTICES = {
+    "push": lambda kind, resident_id, data: get_system().engine.push(kind, resident_id, data),
+    "speak": speak,
+    "publish": publish,
+}
+
+
+def on_leader(op, *args):
+    if leader_client is None:
+        return LEADER_CALLS[op](*args)
+    return leader_client.call(op, *args)
+
+
+@app.errorhandler(LeaderError)
+def leader_unavailable(error):
+    return jsonify({"status": "error", "message": str(error)}), 503
+
+
+# The leader's events since last_id, waiting up to `timeout` seconds for one,
+# for a follower to pass on to its own /api/stream clients
+def _events_since(last_id, timeout):
+    events = event_bus.wait(last_id, timeout)
+    return {"boot": BOOT_ID, "events": [[event.id, event.type, event.data, event.resident_id] for event in events]}
+
+
+def _mirror_events(client):
+    boot = None
+    last_id = 0
+    while leader_client is client:
+        try:
+            answer = client.call("events", last_id, SSE_HEARTBEAT_SECONDS, timeout=SSE_HEARTBEAT_SECONDS + 10)
+        except LeaderError:
+            time.sleep(1)
+            continue
+        if answer["boot"] != boot:
+            # A different leader numbers its events afresh; start over from its first
+            boot = answer["boot"]
+            event_bus.reset()
+            last_id = 0
+            continue
+        for event_id, event_type, data, resident_id in answer["events"]:
+            event_bus.mirror(event_id, event_type, data, resident_id)
+            last_id = max(last_id, event_id)
+
+
+# Serving from several worker processes (wsgi.py). The first to lock
+# LEADER_LOCK_FILE leads: it runs the monitoring engine, reminders, alerts,
+# audio and chat, and answers the other workers on LEADER_SOCKET. Followers
+# store readings and activity themselves and forward the rest; if the leader
+# exits, one of them takes over.
+election = None
+
+
+def start_worker():
+    global election, leader_client
+    preload_rollups()
+    election = Election(LEADER_LOCK_FILE, _lead)
+    if election.start():
+        _lead()
+    else:
+        leader_client = LeaderClient(LEADER_SOCKET)
+        threading.Thread(target=_mirror_events, args=(leader_client,), daemon=True).start()
+        print(f"Worker {os.getpid()} following the leader")
+
+
+def _lead():
+    global leader_client
+    client, leader_client = leader_client, None
+    system = get_system()
+    with system.residents_lock:
+        system.residents.clear()  # made again, with their reminders
+    handlers = dict(LEADER_CALLS, events=_events_since, **LEADER_NOTICES)
+    LeaderServer(LEADER_SOCKET, handlers, LEADER_NOTICES).start()
+    if client is not None:
+        # Whatever was still waiting for the old leader is handled here
+        for op, args in client.close():
+            LEADER_NOTICES[op](*args)
+    threading.Thread(target=system.run, daemon=True).start()
+    print(f"Worker {os.getpid()} is the leader")
 
 if __name__ == "__main__":
-    system = ElderlyCareSystem()
+    preload_rollups()
+    system = get_system()
     threading.Thread(target=system.run, daemon=True).start()
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=True, port=5000)
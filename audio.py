@@ -0,0 +1,487 @@
+import glob
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+AUDIO_SUFFIX = ".mp3"
+
+
+def language_code(language):
+    return "hi" if language == "hi" else "en"
+
+
+# Render speech with Google TTS straight into the given path
+def gtts_synthesize(text, language, path, timeout=None):
+    from gtts import gTTS
+    gTTS(text=text, lang=language_code(language), timeout=timeout).save(path)
+
+
+# Offline stand-in for gTTS; writes the text itself so pipelines can run without network
+def stub_synthesize(text, language, path):
+    with open(path, "wb") as f:
+        f.write(f"{language_code(language)}:{text}".encode("utf-8"))
+
+
+SYNTHESIZERS = {
+    "gtts": gtts_synthesize,
+    "stub": stub_synthesize,
+}
+
+BUNDLE_MANIFEST = "manifest.json"
+BUNDLE_FORMAT = 1
+
+
+# Read-only set of pre-rendered prompts produced by prerender.py
+class AudioBundle:
+    def __init__(self, directory):
+        self.directory = directory
+        self.version = None
+        self.files = {}
+        manifest_path = os.path.join(directory, BUNDLE_MANIFEST)
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            try:
+                manifest = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Ignoring unreadable audio bundle manifest {manifest_path}")
+                return
+        if manifest.get("format") != BUNDLE_FORMAT:
+            print(f"Ignoring audio bundle {directory}: unsupported format {manifest.get('format')}")
+            return
+        self.version = manifest.get("version")
+        for key, entry in manifest.get("entries", {}).items():
+            path = os.path.join(directory, entry["file"])
+            if os.path.exists(path):
+                self.files[key] = path
+
+    def __len__(self):
+        return len(self.files)
+
+    def get(self, key):
+        return self.files.get(key)
+
+
+# Content-addressed cache of synthesized speech keyed by (text, language).
+# Files are written atomically and the least recently played ones are evicted
+# once the cache grows past max_bytes.
+class AudioCache:
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, bundle=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bundle = bundle
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(AUDIO_SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name[:-len(AUDIO_SUFFIX)], stat.st_size))
+            elif name.startswith(".tmp"):
+                os.remove(os.path.join(self.directory, name))  # interrupted write
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def key(text, language):
+        return hashlib.sha256(f"{language_code(language)}\0{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + AUDIO_SUFFIX)
+
+    def get(self, text, language):
+        key = self.key(text, language)
+        if self.bundle is not None:
+            path = self.bundle.get(key)
+            if path is not None:
+                with self.lock:
+                    self.hits += 1
+                return path
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        path = self.path(key)
+        try:
+            os.utime(path)  # keep recency across restarts
+        except FileNotFoundError:
+            with self.lock:
+                self._forget(key)
+            return None
+        return path
+
+    def put(self, text, language, write):
+        key = self.key(text, language)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp", suffix=AUDIO_SUFFIX, dir=self.directory)
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size = os.path.getsize(self.path(key))
+        with self.lock:
+            self._forget(key)
+            self.entries[key] = size
+            self.total_bytes += size
+            self._evict(keep=key)
+        return self.path(key)
+
+    def get_or_create(self, text, language, synthesize=gtts_synthesize):
+        path = self.get(text, language)
+        if path is None:
+            path = self.put(text, language, lambda tmp_path: synthesize(text, language, tmp_path))
+        return path
+
+    def _forget(self, key):
+        size = self.entries.pop(key, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self, keep):
+        for key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # still open by the mixer on Windows; try again next time
+            self._forget(key)
+            self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bundled": len(self.bundle) if self.bundle is not None else 0,
+            }
+
+
+# Renders speech on a bounded thread pool so the next prompts are synthesized
+# while the current one plays. Failed attempts are retried with exponential
+# backoff; cache and bundle hits resolve immediately.
+class SpeechSynthesizer:
+    def __init__(self, cache, synthesize=gtts_synthesize, workers=2, timeout=10.0, retries=2, backoff=0.5):
+        self.cache = cache
+        self.synthesize = synthesize
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.lock = threading.Lock()
+        self.inflight = {}  # cache key -> Future
+        self.synthesized = 0
+        self.retried = 0
+        self.failed = 0
+
+    # Longest a caller should wait for one request, all retries included
+    @property
+    def deadline(self):
+        backoff = sum(self.backoff * 2 ** attempt for attempt in range(self.retries))
+        return self.timeout * (self.retries + 1) + backoff
+
+    def request(self, text, language):
+        path = self.cache.get(text, language)
+        if path is not None:
+            future = Future()
+            future.set_result(path)
+            return future
+        key = self.cache.key(text, language)
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is None:
+                future = self.pool.submit(self._render, text, language)
+                self.inflight[key] = future
+                future.add_done_callback(lambda _: self._done(key))
+        return future
+
+    def _done(self, key):
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    def _render(self, text, language):
+        for attempt in range(self.retries + 1):
+            try:
+                path = self.cache.put(text, language, lambda tmp_path: self.synthesize(text, language, tmp_path))
+                with self.lock:
+                    self.synthesized += 1
+                return path
+            except Exception as e:
+                if attempt == self.retries:
+                    with self.lock:
+                        self.failed += 1
+                    raise
+                with self.lock:
+                    self.retried += 1
+                print(f"Speech synthesis failed ({e}), retrying")
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "inflight": len(self.inflight),
+                "synthesized": self.synthesized,
+                "retried": self.retried,
+                "failed": self.failed,
+            }
+
+
+# Plays files through pygame's mixer; pygame is imported only when audio is used
+class PygameBackend:
+    def __init__(self):
+        import pygame
+        self.mixer = pygame.mixer
+
+    def play(self, path):
+        self.mixer.music.load(path)
+        self.mixer.music.play()
+
+    def busy(self):
+        return self.mixer.music.get_busy()
+
+    def stop(self):
+        self.mixer.music.stop()
+
+
+PRIORITIES = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+PREEMPTING_PRIORITIES = ("Critical", "High")
+
+
+class _Utterance:
+    __slots__ = ("text", "language", "priority", "rank", "enqueued_at", "due", "cancelled", "audio")
+
+    def __init__(self, text, language, priority):
+        self.text = text
+        self.language = language
+        self.priority = priority
+        self.rank = PRIORITIES.get(priority, PRIORITIES["Medium"])
+        self.enqueued_at = time.monotonic()
+        self.due = None  # when to give up on synthesis and play the fallback
+        self.cancelled = False
+        self.audio = None  # Future for the synthesized file
+
+    @property
+    def key(self):
+        return (self.text, language_code(self.language))
+
+
+# Single long-lived audio worker fed by a bounded priority queue.
+# Critical and High messages interrupt anything less urgent that is playing,
+# and a message already waiting or playing is not queued twice. Synthesis
+# starts as soon as a message is queued, and the worker plays the most urgent
+# message whose audio is ready, so a slow one never holds up the rest; if
+# synthesis fails or runs past its deadline, the pre-rendered fallback prompt
+# for that priority is played instead.
+class AudioPlayer:
+    def __init__(self, synthesizer, backend, max_queue=32, on_error=None, poll_interval=0.05, fallbacks=None):
+        self.synthesizer = synthesizer
+        self.backend = backend
+        self.fallbacks = fallbacks or {}
+        self.max_queue = max_queue
+        self.on_error = on_error
+        self.poll_interval = poll_interval
+        self.cond = threading.Condition()
+        self.heap = []
+        self.pending = {}  # key -> queued _Utterance
+        self.current = None
+        self.interrupt = threading.Event()
+        self.counter = itertools.count()
+        self.enqueued = 0
+        self.played = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.preempted = 0
+        self.failed = 0
+        self.fallbacks_played = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.thread = threading.Thread(target=self._run, name="audio-player", daemon=True)
+        self.thread.start()
+
+    def say(self, text, language, priority="Medium"):
+        item = _Utterance(text, language, priority)
+        with self.cond:
+            queued = self.pending.get(item.key)
+            if queued is not None and queued.rank <= item.rank:
+                self.coalesced += 1
+                return False
+            if self.current is not None and self.current.key == item.key and self.current.rank <= item.rank:
+                self.coalesced += 1
+                return False
+            if queued is not None:
+                queued.cancelled = True  # re-queue at the more urgent priority
+                queued.audio.cancel()
+                del self.pending[queued.key]
+            elif len(self.pending) >= self.max_queue and not self._drop_least_urgent(item.rank):
+                self.dropped += 1
+                print(f"Audio queue full, dropping: {text}")
+                return False
+            self._push(item)
+            item.due = item.enqueued_at + self.synthesizer.deadline
+            item.audio = self.synthesizer.request(item.text, item.language)
+            self.enqueued += 1
+            item.audio.add_done_callback(lambda _: self._ready(item))  # runs now on a cache hit
+            self.cond.notify()  # to wait for its deadline
+        return True
+
+    # Wakes the worker for a message whose audio just became ready, stopping
+    # anything less urgent that is playing if it is Critical or High
+    def _ready(self, item):
+        with self.cond:
+            if item.cancelled:
+                return
+            if self._preempts(item):
+                self.interrupt.set()
+            self.cond.notify()
+
+    def _preempts(self, item):
+        return (item.priority in PREEMPTING_PRIORITIES and self.current is not None
+                and item.rank < self.current.rank)
+
+    # A waiting message whose synthesis ran past its deadline preempts as if ready
+    def _overdue_preempting(self):
+        now = time.monotonic()
+        with self.cond:
+            return any(now >= item.due and self._preempts(item) for item in self.pending.values())
+
+    def _push(self, item):
+        self.pending[item.key] = item
+        heapq.heappush(self.heap, (item.rank, next(self.counter), item))
+
+    def _drop_least_urgent(self, rank):
+        victim = max(self.pending.values(), key=lambda queued: (queued.rank, queued.enqueued_at))
+        if victim.rank <= rank:
+            return False
+        victim.cancelled = True
+        victim.audio.cancel()
+        del self.pending[victim.key]
+        self.dropped += 1
+        return True
+
+    # The most urgent message that is ready to play: its audio is done or its
+    # deadline has passed. The ones still being synthesized go back in the queue.
+    def _next(self):
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                waiting = []
+                chosen = None
+                while self.heap:
+                    entry = heapq.heappop(self.heap)
+                    item = entry[2]
+                    if item.cancelled:
+                        continue
+                    if item.audio.done() or now >= item.due:
+                        chosen = item
+                        break
+                    waiting.append(entry)
+                for entry in waiting:
+                    heapq.heappush(self.heap, entry)
+                if chosen is not None:
+                    del self.pending[chosen.key]
+                    self.current = chosen
+                    self.interrupt.clear()
+                    return chosen
+                self.cond.wait(min(entry[2].due for entry in waiting) - now if waiting else None)
+
+    def _run(self):
+        while True:
+            item = self._next()
+            latency = time.monotonic() - item.enqueued_at
+            try:
+                path = self._audio_for(item)
+                self.backend.play(path)
+                stopped = False
+                while self.backend.busy():
+                    if self.interrupt.wait(self.poll_interval) or self._overdue_preempting():
+                        self.backend.stop()
+                        stopped = True
+                        break
+            except Exception as e:
+                with self.cond:
+                    self.failed += 1
+                print(f"Error in audio playback: {e}")
+                if self.on_error:
+                    self.on_error(item.text, item.language, e)
+                continue
+            finally:
+                with self.cond:
+                    self.current = None
+            with self.cond:
+                if stopped:
+                    self.preempted += 1
+                    # Play the interrupted message again once the urgent one is done
+                    if item.key not in self.pending:
+                        item.cancelled = False
+                        self._push(item)
+                else:
+                    self.played += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+
+    # item is ready, so this does not wait; past its deadline it times out at once
+    def _audio_for(self, item):
+        try:
+            return item.audio.result(timeout=max(item.due - time.monotonic(), 0))
+        except Exception as e:
+            fallback = self.fallbacks.get(item.priority)
+            path = self.synthesizer.cache.get(fallback, item.language) if fallback else None
+            if path is None:
+                raise
+            print(f"Synthesis failed for '{item.text}' ({e!r}), playing fallback prompt")
+            with self.cond:
+                self.fallbacks_played += 1
+            return path
+
+    def stats(self):
+        with self.cond:
+            started = self.played + self.preempted
+            return {
+                "depth": len(self.pending),
+                "enqueued": self.enqueued,
+                "played": self.played,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "preempted": self.preempted,
+                "failed": self.failed,
+                "fallbacks": self.fallbacks_played,
+                "latency_avg": self.latency_total / started if started else 0.0,
+                "latency_max": self.latency_max,
+            }
+
+
+# Remove temp_<ms>.mp3 files left behind by the old play-and-delete approach
+def remove_stale_temp_files(directory="."):
+    for path in glob.glob(os.path.join(directory, "temp_*.mp3")):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Could not remove stale audio file {path}: {e}")
@@ -0,0 +1,38 @@
+# Rebuild the health trend rollups from the stored health logs, for history
+# recorded before rollups existed or after their files were removed.
+#
+#   python backfill_rollups.py [--resident ID]
+#
+# Run it while the app is stopped: a running app keeps its own rollups in
+# memory and would write them back over the rebuilt files.
+import argparse
+import os
+import time
+
+os.environ.setdefault("VOICE_ENABLED", "0")
+
+from app import rollups, storage  # noqa: E402
+from storage import RESIDENT_ID_PATTERN  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild health trend rollups from the stored health logs")
+    parser.add_argument("--resident", action="append", help="only this resident (repeatable); default: all")
+    args = parser.parse_args()
+    for resident_id in args.resident or []:
+        if not RESIDENT_ID_PATTERN.match(resident_id):
+            parser.error(f"invalid resident id: {resident_id}")
+
+    start = time.perf_counter()
+    total = 0
+    for resident_id in args.resident or storage.residents():
+        started = time.perf_counter()
+        count = rollups.rebuild(resident_id)
+        total += count
+        print(f"{resident_id}: {count} readings in {time.perf_counter() - started:.2f}s")
+    rollups.flush()
+    print(f"Rebuilt rollups for {total} readings in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Activity journal costs as it grows: append, latest 5, one page of "Critical
+# alerts last week", reopen time and size on disk. Appends and latest-5 reads
+# should not grow with the journal; the full-history JSON array rewrite is
+# shown for comparison at the smaller sizes.
+#
+#   python benchmarks/activity_journal.py [--sizes 10000 100000 1000000] [--no-compress]
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import ActivityJournal  # noqa: E402
+
+KINDS = ["reminder", "chat", "chat", "chat", "other", "alert"]
+PRIORITIES = ["Low", "Medium", "Medium", "High", "Critical"]
+ARRAY_MAX = 20000  # largest size the JSON array rewrite is timed at
+
+
+def entry(rng, ts):
+    kind = rng.choice(KINDS)
+    record = {"ts": ts, "activity": f"{kind} event {rng.randrange(10 ** 6)}", "kind": kind}
+    if kind == "alert":
+        record["priority"] = rng.choice(PRIORITIES)
+    return record
+
+
+def disk_bytes(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(size, args):
+    rng = random.Random(args.seed)
+    directory = tempfile.mkdtemp(prefix="bench_journal_")
+    journal = ActivityJournal(directory, compress=not args.no_compress)
+    # One entry every 30 seconds, ending now
+    now = time.time()
+    first = now - size * 30
+    start = time.perf_counter()
+    journal.extend(entry(rng, first + i * 30) for i in range(size))
+    load = time.perf_counter() - start
+
+    append, _ = timed(lambda: journal.append(entry(rng, time.time())), 2000)
+    recent, _ = timed(lambda: journal.recent(5), 2000)
+    week = (now - 7 * 86400, now + 1)
+    first_page, (page, _) = timed(lambda: journal.query(*week, {"alert"}, {"Critical"}, None, 50), 20)
+    pages = 0
+    before = None
+    start = time.perf_counter()
+    while True:
+        page, before = journal.query(*week, {"alert"}, {"Critical"}, before, 50)
+        pages += 1
+        if before is None:
+            break
+    all_pages = time.perf_counter() - start
+    journal.close()
+    start = time.perf_counter()
+    ActivityJournal(directory, compress=not args.no_compress).close()
+    reopen = time.perf_counter() - start
+
+    array = ""
+    if size <= ARRAY_MAX:
+        file = os.path.join(directory, "array.json")
+        data = [entry(rng, first + i * 30) for i in range(size)]
+
+        def rewrite():
+            with open(file) as f:
+                entries = json.load(f)
+            entries.append(entry(rng, time.time()))
+            with open(file, "w") as f:
+                json.dump(entries, f)
+
+        with open(file, "w") as f:
+            json.dump(data, f)
+        seconds, _ = timed(rewrite, 20)
+        array = f"{seconds * 1e6:.0f}"
+        os.remove(file)
+    print(
+        f"{size:>9} {size / load:>9.0f}/s {append * 1e6:>9.1f} {recent * 1e6:>8.2f} {first_page * 1e3:>9.2f} "
+        f"{pages:>5} {all_pages * 1e3:>9.1f} {reopen * 1e3:>9.1f} {disk_bytes(directory) / 2 ** 20:>8.1f} {array:>10}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Activity journal append, read, query and reopen costs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--no-compress", action="store_true", help="keep closed segments as plain JSON Lines")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(
+        f"{'entries':>9} {'load':>11} {'append us':>9} {'recent us':>8} {'page ms':>9} "
+        f"{'pages':>5} {'all ms':>9} {'reopen ms':>9} {'disk MB':>8} {'array us':>10}"
+    )
+    for size in args.sizes:
+        run(size, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# Alert pipeline under an alert storm and under load, with a local webhook
+# stand-in that fails or stalls some of its requests.
+#
+#   python benchmarks/alert_pipeline.py [--residents 100] [--hours 24] [--alerts 5000] [--fail-rate 0.1]
+#
+# Storm: against a simulated clock, a third of the residents stay at risk and
+# raise a High alert on every reading (what the monitoring loop used to do),
+# everyone has the odd unusual reading and fall, and caregivers acknowledge
+# half of the alerts within five minutes. Shows how many alerts were raised,
+# sent, suppressed and escalated. Load: distinct Critical alerts dispatched
+# as fast as possible; dispatch rate, and delivery counts and latency per channel.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import AlertPipeline, Channel, LogChannel, WebhookChannel  # noqa: E402
+from monitor import MonitoringEngine, SimulatedClock  # noqa: E402
+
+
+def stand_in(fail_rate, delay, seed):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            with lock:
+                fail = rng.random() < fail_rate
+            time.sleep(delay)
+            self.send_response(503 if fail else 204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/alerts"
+
+
+# Stands in for the audio channel, which only queues the text
+class CountingChannel(Channel):
+    name = "audio"
+
+    def deliver(self, alert):
+        pass
+
+
+def channels(directory, url):
+    return [LogChannel(os.path.join(directory, "alerts.jsonl")), CountingChannel(), WebhookChannel(url, "High")]
+
+
+def storm(args, directory, url):
+    rng = random.Random(args.seed)
+    start = time.time()
+    clock = SimulatedClock(start)
+    engine = MonitoringEngine({}, clock)
+    pipeline = AlertPipeline(
+        channels(directory, url), clock, args.workers, args.retries, backoff=0.01,
+        set_timer=engine.set_timer, cancel_timer=engine.cancel_timer,
+    )
+    stuck = set(range(0, args.residents, 3))
+    raised = 0
+    acks = []  # (due, alert id)
+    step = 300
+    for tick in range(int(args.hours * 3600 / step)):
+        clock.now = start + tick * step
+        engine.process()
+        while acks and acks[0][0] <= clock.now:
+            pipeline.acknowledge(acks.pop(0)[1])
+        for resident in range(args.residents):
+            resident_id = f"r{resident}"
+            sent = []
+            if resident in stuck:
+                sent.append(pipeline.dispatch(resident_id, "at_risk", "At Risk", "High", True))
+            if rng.random() < 0.02:
+                sent.append(pipeline.dispatch(resident_id, "unusual", "Unusual for this resident", "Medium"))
+            if rng.random() < 1 / 288:
+                sent.append(pipeline.dispatch(resident_id, "fall", "Fall detected", "Critical", True))
+            raised += len(sent)
+            for alert in sent:
+                if alert is not None and rng.random() < 0.5:
+                    acks.append((clock.now + rng.uniform(60, 300), alert.alert_id))
+            acks.sort()
+    pipeline.close()
+    stats = pipeline.stats()
+    suppressed = sum(stats["suppressed"].values())
+    print(f"storm: {args.residents} residents over {args.hours}h ({len(stuck)} stuck at risk)")
+    print(f"  raised:     {raised}")
+    print(f"  sent:       {stats['dispatched'] - stats['escalated']} ({stats['escalated']} more as escalations)")
+    print(f"  suppressed: {suppressed} ({stats['suppressed']['duplicate']} repeats, {stats['suppressed']['rate_limited']} over rate)")
+    print(f"  acknowledged {stats['acknowledged']}, still open {stats['open']}")
+
+
+def load(args, directory, url):
+    pipeline = AlertPipeline(channels(directory, url), workers=args.workers, retries=args.retries, backoff=0.05)
+    started = time.perf_counter()
+    for i in range(args.alerts):
+        pipeline.dispatch(f"r{i % args.residents}", f"load{i}", f"Load alert {i}", "Critical", True)
+    dispatched = time.perf_counter() - started
+    pipeline.close()
+    drained = time.perf_counter() - started
+    stats = pipeline.stats()
+    print(f"load: {args.alerts} Critical alerts, {args.workers} workers")
+    print(f"  dispatch:   {args.alerts / dispatched:.0f} alerts/s, all delivered or given up after {drained:.2f}s")
+    print(f"  {'channel':<8} {'delivered':>9} {'failed':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, latency in stats["latency"].items():
+        print(
+            f"  {name:<8} {stats['delivered'][name]:>9} {stats['failed'][name]:>7} "
+            f"{latency['p50_ms'] or 0:>8.1f} {latency['p99_ms'] or 0:>8.1f}"
+        )
+    print(f"  retried:    {stats['retried']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert pipeline storm and load runs")
+    parser.add_argument("--residents", type=int, default=100)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--alerts", type=int, default=5000, help="alerts in the load run")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="share of webhook requests answered 503")
+    parser.add_argument("--delay", type=float, default=0.005, help="seconds the webhook takes per request")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_alerts_")
+    server, url = stand_in(args.fail_rate, args.delay, args.seed)
+    storm(args, directory, url)
+    load(args, directory, url)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
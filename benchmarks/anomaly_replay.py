@@ -0,0 +1,134 @@
+# Replay recorded health logs through the streaming anomaly detector and
+# measure readings per second. Without --logs, a seeded recording of several
+# residents with injected deviations (all under the fixed thresholds) is
+# written to a temporary store first, and detections are checked against it.
+#
+#   python benchmarks/anomaly_replay.py [--logs logs] [--backend json|sqlite]
+#   python benchmarks/anomaly_replay.py [--residents 20] [--readings 5000] [--episodes 10]
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anomaly import METRICS, MIN_SPREAD, AnomalyDetector  # noqa: E402
+from records import HealthReading  # noqa: E402
+from storage import open_storage  # noqa: E402
+
+READING_INTERVAL = 300
+EPISODE_READINGS = 3
+
+
+def open_logs(backend, directory):
+    return open_storage(
+        backend,
+        os.path.join(directory, "health_log"),
+        os.path.join(directory, "activity_log"),
+        os.path.join(directory, "schedule.json"),
+        os.path.join(directory, "custom_reminders.json"),
+        os.path.join(directory, "elderly_care.db"),
+        os.path.join(directory, "residents"),
+    )
+
+
+# Each resident gets their own resting values and noise; episodes push one
+# metric 7 to 9 of its standard deviations away for a few readings
+def record(storage, rng, residents, readings, episodes):
+    injected = {}  # (resident_id, index) -> metric
+    start = time.time() - readings * READING_INTERVAL
+    for r in range(residents):
+        resident_id = f"replay-{r:03d}"
+        base = [rng.uniform(58, 75), rng.uniform(110, 125), rng.uniform(70, 80), rng.uniform(85, 105)]
+        noise = [rng.uniform(1.5, 3), rng.uniform(3, 5), rng.uniform(2, 4), rng.uniform(4, 8)]
+        episode_starts = sorted(rng.sample(range(200, readings - EPISODE_READINGS, 100), episodes))
+        jumps = {}
+        for index in episode_starts:
+            metric = rng.randrange(len(METRICS))
+            size = rng.uniform(7, 9) * max(noise[metric], MIN_SPREAD[METRICS[metric]])
+            for offset in range(EPISODE_READINGS):
+                jumps[index + offset] = (metric, size)
+            injected[(resident_id, index)] = METRICS[metric]
+        rows = []
+        for i in range(readings):
+            values = [round(rng.gauss(mean, sd)) for mean, sd in zip(base, noise)]
+            if i in jumps:
+                metric, size = jumps[i]
+                values[metric] = round(values[metric] + size)
+            rows.append(HealthReading(start + i * READING_INTERVAL, *values, source="Sensor Input").to_dict())
+        storage.append_health_many(rows, resident_id)
+    return injected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming anomaly detector replay throughput")
+    parser.add_argument("--logs", help="logs directory of a deployment to replay (default: a seeded recording)")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--residents", type=int, default=20)
+    parser.add_argument("--readings", type=int, default=5000, help="readings per resident")
+    parser.add_argument("--episodes", type=int, default=10, help="injected deviations per resident")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    directory = args.logs or tempfile.mkdtemp(prefix="bench_anomaly_")
+    injected = None
+    try:
+        storage = open_logs(args.backend, directory)
+        if args.logs is None:
+            injected = record(storage, random.Random(args.seed), args.residents, args.readings, args.episodes)
+
+        start = time.perf_counter()
+        recordings = {
+            resident_id: [HealthReading.from_dict(entry) for entry in storage.iter_health(resident_id)]
+            for resident_id in storage.residents()
+        }
+        recordings = {resident_id: readings for resident_id, readings in recordings.items() if readings}
+        load_seconds = time.perf_counter() - start
+        storage.close()
+    finally:
+        if args.logs is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    onsets = []  # (resident_id, index, Anomaly)
+    start = time.perf_counter()
+    for resident_id, readings in recordings.items():
+        update = AnomalyDetector().update
+        for index, reading in enumerate(readings):
+            for anomaly in update(reading):
+                onsets.append((resident_id, index, anomaly))
+    detect_seconds = time.perf_counter() - start
+
+    total = sum(len(readings) for readings in recordings.values())
+    print(f"{total} readings from {len(recordings)} residents ({args.backend} storage)")
+    print(f"load and decode: {total / load_seconds:>10.0f} readings/s")
+    if total:
+        print(f"detect:          {total / detect_seconds:>10.0f} readings/s ({detect_seconds / total * 1e6:.2f} us/reading)")
+    print(f"onsets:          {len(onsets):>10}")
+    for resident_id, index, anomaly in onsets[:5]:
+        print(f"  {resident_id} #{index}: {anomaly.describe()}")
+
+    if injected is not None:
+        found = set()
+        false = 0
+        for resident_id, index, anomaly in onsets:
+            hit = next(
+                (episode for episode in ((resident_id, index - offset) for offset in range(EPISODE_READINGS))
+                 if injected.get(episode) == anomaly.metric),
+                None,
+            )
+            if hit is None:
+                false += 1
+            else:
+                found.add(hit)
+        print(f"injected:        {len(injected):>10}")
+        print(f"detected:        {len(found):>10} ({len(found) / len(injected):.1%})")
+        print(f"false onsets:    {false:>10} ({false / total:.3%} of readings)")
+        if len(found) < 0.9 * len(injected):
+            raise SystemExit("FAILED: fewer than 90% of the injected deviations were detected")
+
+
+if __name__ == "__main__":
+    main()
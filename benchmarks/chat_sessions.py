@@ -0,0 +1,90 @@
+# Chat request and response size over a long conversation, and the chat
+# store's cost with many concurrent sessions pushing each other out of memory.
+#
+#   python benchmarks/chat_sessions.py [--turns 200] [--sessions 20000] [--capacity 1000]
+#
+# Before the server-side store, the session cookie carried the whole history
+# both ways on every request; now it carries a chat id and each response only
+# the new messages, so both should stay flat however long the chat runs.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chats import ChatStore  # noqa: E402
+
+MESSAGES = [
+    "I am feeling happy today", "I went for a walk in the garden", "I feel a bit tired",
+    "My grandson called me", "I miss my friends", "The food was good", "I could not sleep well",
+]
+
+
+def conversation(app, turns):
+    client = app.app.test_client()
+    client.post("/api/start_chat")
+    cookie = client.get_cookie("session")
+    seq = 0
+    sizes = []
+    for turn in range(turns):
+        response = client.post("/api/chat", json={"message": MESSAGES[turn % len(MESSAGES)], "since": seq})
+        seq = response.json["seq"]
+        cookie = client.get_cookie("session") or cookie
+        sizes.append((len(response.data), len(cookie.value)))
+    print(f"{'turn':>6} {'response B':>11} {'cookie B':>9}")
+    for turn in sorted({0, 9, 49, turns - 1}):
+        if turn < turns:
+            print(f"{turn + 1:>6} {sizes[turn][0]:>11} {sizes[turn][1]:>9}")
+
+
+def churn(args, spill_dir):
+    rng = random.Random(args.seed)
+    store = ChatStore(args.capacity, 86400, args.limit, spill_dir)
+    ids = []
+    start = time.perf_counter()
+    for i in range(args.sessions):
+        conversation = store.create("default")
+        for _ in range(rng.randint(1, 5)):
+            conversation.add("user", rng.choice(MESSAGES))
+            conversation.add("system", "That's interesting! Tell me more.")
+        ids.append(conversation.chat_id)
+    created = time.perf_counter() - start
+    # Mostly recent sessions come back, some old ones too
+    lookups = [ids[-1 - min(int(rng.expovariate(1 / args.capacity)), len(ids) - 1)] for _ in range(args.sessions)]
+    start = time.perf_counter()
+    found = sum(1 for chat_id in lookups if store.get(chat_id) is not None)
+    looked_up = time.perf_counter() - start
+    stats = store.stats()
+    label = "spill" if spill_dir else "drop"
+    print(
+        f"{label:<6} {args.sessions / created:>10.0f}/s {args.sessions / looked_up:>10.0f}/s "
+        f"{found:>7}/{len(lookups):<7} {stats['spilled']:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat session sizes and chat store throughput")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--capacity", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=50, help="messages kept per conversation")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_chats_"))
+    os.makedirs("logs", exist_ok=True)
+    os.environ["VOICE_ENABLED"] = "0"
+    import app  # noqa: E402
+
+    conversation(app, args.turns)
+    print()
+    print(f"{'evict':<6} {'create':>12} {'get':>12} {'found':>15} {'spilled':>8}")
+    churn(args, None)
+    churn(args, tempfile.mkdtemp(prefix="chats_"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Chat keyword matching time per message as the phrase table grows: the old
+# loop (a substring test per keyword) against the compiled IntentMatcher, in
+# English and Hindi. The matcher's time should stay flat.
+#
+#   python benchmarks/intent_benchmark.py [--sizes 10 100 1000 5000] [--messages 2000]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import Intent, IntentMatcher, intents_from_keywords  # noqa: E402
+from prompts import ACTIVITIES, KEYWORD_PHRASES  # noqa: E402
+
+CONSONANTS = "कखगघचछजझटठडढतथदधनपफबभमयरलवशसह"
+VOWEL_SIGNS = ["", "ा", "ि", "ी", "ु", "ू", "े", "ै", "ो", "ौ"]
+FILLER = {
+    "en": "i we the a and today my was with went to very so it is had some of in for".split(),
+    "hi": "मैं हम आज मेरा मेरी था थी के साथ गया बहुत यह है और में से को".split(),
+}
+
+
+def word(rng, language):
+    if language == "en":
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+    return "".join(rng.choice(CONSONANTS) + rng.choice(VOWEL_SIGNS) for _ in range(rng.randint(2, 4)))
+
+
+# The real keyword table plus made-up phrases of one to three words
+def intent_table(rng, language, size):
+    keywords = ACTIVITIES[language]["keywords"]
+    intents = intents_from_keywords(keywords, KEYWORD_PHRASES.get(language))
+    while len(intents) < size:
+        phrase = " ".join(word(rng, language) for _ in range(rng.choice((1, 1, 2, 3))))
+        intents.append(Intent(phrase, (phrase,), f"reply {len(intents)}"))
+    return intents[:max(size, 1)]
+
+
+def messages(rng, language, intents, count):
+    phrases = [phrase for intent in intents for phrase in intent.phrases]
+    result = []
+    for _ in range(count):
+        words = [rng.choice(FILLER[language]) for _ in range(rng.randint(6, 16))]
+        for _ in range(rng.choice((0, 1, 1, 2))):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(phrases))
+        result.append(" ".join(words))
+    return result
+
+
+# What respond_to_user did before: a substring test per phrase, first hit wins
+def legacy_match(intents, message):
+    lower = message.lower()
+    for intent in intents:
+        for phrase in intent.phrases:
+            if phrase in lower:
+                return intent
+    return None
+
+
+def timed(match, texts):
+    start = time.perf_counter()
+    hits = sum(1 for text in texts if match(text) is not None)
+    return (time.perf_counter() - start) / len(texts), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat keyword matching time against phrase table size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'lang':<5} {'intents':>8} {'build ms':>9} {'loop us':>9} {'matcher us':>11} {'speedup':>8} {'hits':>11}")
+    for language in ("en", "hi"):
+        for size in args.sizes:
+            rng = random.Random(args.seed)
+            intents = intent_table(rng, language, size)
+            texts = messages(rng, language, intents, args.messages)
+            start = time.perf_counter()
+            matcher = IntentMatcher(intents)
+            build = time.perf_counter() - start
+            loop_seconds, loop_hits = timed(lambda text: legacy_match(intents, text), texts)
+            matcher_seconds, matcher_hits = timed(matcher.match, texts)
+            print(
+                f"{language:<5} {len(intents):>8} {build * 1e3:>9.2f} {loop_seconds * 1e6:>9.1f} "
+                f"{matcher_seconds * 1e6:>11.1f} {loop_seconds / matcher_seconds:>7.1f}x {loop_hits:>5}/{matcher_hits:<5}"
+            )
+
+
+if __name__ == "__main__":
+    main()
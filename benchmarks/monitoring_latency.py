@@ -0,0 +1,128 @@
+# Check the monitoring engine's alert latency.
+#
+#   python benchmarks/monitoring_latency.py [--residents 100]
+#
+# With a simulated clock: falls must alert as soon as the engine runs, and the inactivity alert must fire exactly at its deadline (not
+# on the next polling tick) and be pushed back by activity. With the real clock
+# and the engine on its own thread: wall-clock time from push to alert.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitor import MonitoringEngine, SimulatedClock  # noqa: E402
+
+
+def alerts_for(app, resident_id, text=""):
+    return [
+        event for event in app.event_bus.since(0, resident_id)
+        if event.type == "alert" and text in event.data["message"]
+    ]
+
+
+def inactivity_alerts(app, resident_id):
+    return alerts_for(app, resident_id, "Inactivity")
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAILED: {message}")
+
+
+def simulated(app, residents):
+    clock = SimulatedClock(time.time())
+    system = app.ElderlyCareSystem(clock=clock)
+    system.running = True
+    for resident_id in residents:
+        system.resident(resident_id)
+    system.engine.process()
+
+    inactivity = system.resident(residents[0]).health_agent.inactivity_seconds
+    # Falls alert on the next engine pass, without any clock advance
+    for resident_id in residents:
+        system.fall_reported(resident_id)
+    system.engine.process()
+    for resident_id in residents:
+        check(len(alerts_for(app, resident_id, "Fall")) == 1, f"no fall alert for {resident_id}")
+    print(f"fall: {len(residents)} alerts with 0.000s simulated latency")
+
+    # Activity halfway through pushes the inactivity deadline back
+    clock.advance(inactivity / 2)
+    system.activity_seen(residents[0])
+    system.engine.process()
+    before = {resident_id: len(inactivity_alerts(app, resident_id)) for resident_id in residents}
+
+    # Stop just short of the original deadline: nobody is inactive yet
+    clock.advance(inactivity / 2 - 1)
+    system.engine.process()
+    check(all(len(inactivity_alerts(app, r)) == before[r] for r in residents), "inactivity alert before the deadline")
+
+    # At the deadline every resident but the active one alerts, on time
+    clock.advance(1)
+    system.engine.process()
+    late = [r for r in residents[1:] if len(inactivity_alerts(app, r)) == before[r]]
+    check(not late, f"inactivity alert missing for {len(late)} residents")
+    check(len(inactivity_alerts(app, residents[0])) == before[residents[0]], "activity did not reset the deadline")
+    print(f"inactivity: {len(residents) - 1} alerts exactly at the deadline, none for the active resident")
+
+    clock.advance(inactivity / 2)
+    system.engine.process()
+    check(len(inactivity_alerts(app, residents[0])) == before[residents[0]] + 1, "reset deadline never fired")
+    print("inactivity: reset deadline fired after the full period")
+
+
+def realtime(app, residents):
+    system = app.ElderlyCareSystem()
+    system.running = True
+    for resident_id in residents:
+        system.resident(resident_id)
+    system.engine.start()
+
+    latencies = []
+    for resident_id in residents:
+        last_id = app.event_bus.last_id
+        start = time.perf_counter()
+        system.fall_reported(resident_id)
+        while True:
+            events = app.event_bus.wait(last_id, 5, resident_id)
+            if any(event.type == "alert" for event in events):
+                break
+            check(events or time.perf_counter() - start < 5, f"no alert for {resident_id} within 5s")
+            last_id = events[-1].id if events else last_id
+        latencies.append(time.perf_counter() - start)
+    system.engine.stop()
+
+    latencies.sort()
+    p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+    print(f"real clock: fall-to-alert p50 {p50 * 1e3:.2f} ms, p99 {p99 * 1e3:.2f} ms, max {latencies[-1] * 1e3:.2f} ms")
+    check(latencies[-1] < 1, "alert latency above one second")
+
+    # An idle engine must sleep rather than spin
+    busy = time.process_time()
+    idle = MonitoringEngine({})
+    idle.start()
+    time.sleep(1)
+    idle.stop()
+    print(f"idle engine: {(time.process_time() - busy) * 1e3:.1f} ms CPU in 1s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitoring engine alert latency")
+    parser.add_argument("--residents", type=int, default=100)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_monitor_"))
+    os.makedirs("logs", exist_ok=True)
+    os.environ["VOICE_ENABLED"] = "0"
+    import app  # noqa: E402
+
+    simulated(app, [f"sim-{i:04d}" for i in range(args.residents)])
+    realtime(app, [f"live-{i:04d}" for i in range(args.residents)])
+
+
+if __name__ == "__main__":
+    main()
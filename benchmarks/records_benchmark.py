@@ -0,0 +1,100 @@
+# Memory per health reading in each in-memory form, and the cost of encoding
+# to and decoding from the storage format.
+#
+#   python benchmarks/records_benchmark.py [--readings 1000000]
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import HealthReading, ReadingColumns  # noqa: E402
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+# Timed apart from measure(): tracemalloc slows every allocation down
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Health reading memory and encode/decode cost")
+    parser.add_argument("--readings", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    values = [
+        (now + i, rng.randint(55, 120), rng.randint(85, 160), rng.randint(55, 100), rng.randint(60, 180))
+        for i in range(args.readings)
+    ]
+
+    def legacy_dicts():
+        return [
+            {
+                "timestamp": time.ctime(ts), "heart_rate": hr, "blood_pressure": f"{sys_bp}/{dia_bp}",
+                "glucose": glucose, "event": None, "source": "Sensor Input",
+            }
+            for ts, hr, sys_bp, dia_bp, glucose in values
+        ]
+
+    def records():
+        return [HealthReading(*value, None, "Sensor Input") for value in values]
+
+    def columns():
+        buffer = ReadingColumns()
+        for value in values:
+            buffer.append(*value)
+        return buffer
+
+    legacy, legacy_size = measure(legacy_dicts)
+    readings, readings_size = measure(records)
+    buffer, buffer_size = measure(columns)
+    encoded, encoded_size = measure(lambda: [reading.to_dict() for reading in readings])
+    encode_seconds = timed(lambda: [reading.to_dict() for reading in readings])
+    decode_seconds = timed(lambda: [HealthReading.from_dict(entry) for entry in encoded])
+    # Parsing ctime strings is slow, so old records are timed on a sample
+    sample = legacy[:100000]
+    legacy_decode_seconds = timed(lambda: [HealthReading.from_dict(entry) for entry in sample]) * len(legacy) / len(sample)
+
+    n = args.readings
+    print(f"{n} readings")
+    print(f"{'form':<28} {'MiB':>8} {'bytes/reading':>14}")
+    for name, size in [
+        ("dict, ctime + '120/80'", legacy_size),
+        ("dict, storage format", encoded_size),
+        ("HealthReading", readings_size),
+        ("ReadingColumns", buffer_size),
+    ]:
+        print(f"{name:<28} {size / 1024 / 1024:>8.1f} {size / n:>14.1f}")
+    print(f"encode to_dict:             {encode_seconds / n * 1e6:.2f} us/reading")
+    print(f"decode from_dict:           {decode_seconds / n * 1e6:.2f} us/reading")
+    print(f"decode legacy from_dict:    {legacy_decode_seconds / n * 1e6:.2f} us/reading (ctime parse)")
+
+    # Every form must hold the same measurements
+    def measurements(reading):
+        return reading.heart_rate, reading.systolic, reading.diastolic, reading.glucose
+
+    expected = measurements(readings[-1])
+    for reading in (buffer.reading(n - 1), HealthReading.from_dict(encoded[-1]), HealthReading.from_dict(legacy[-1])):
+        if measurements(reading) != expected:
+            raise SystemExit(f"FAILED: {measurements(reading)} != {expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Store many reminders, then time a cold start that rebuilds the reminder
+# scheduler from the store alone, as a restarted process does. A few reminders
+# are already overdue and must fire on boot. Also times single-reminder saves
+# (one write-ahead log line each) and snapshot compaction.
+#
+#   python benchmarks/reminder_startup_benchmark.py [--reminders 100000] [--residents 1000] [--backend json|sqlite]
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import open_storage  # noqa: E402
+
+# Run in a fresh interpreter so nothing is cached from writing the store
+BOOT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+system = app.get_system()
+for resident_id in app.storage.residents():
+    system.resident(resident_id)
+loaded = time.perf_counter()
+fired = sum(
+    1 for resident in system.residents.values() for reminder in resident.reminder_agent.custom_reminders
+    if reminder.get("triggered")
+)
+print(json.dumps({{
+    "import": imported - start, "load": loaded - imported, "residents": len(system.residents),
+    "jobs": len(app.reminder_scheduler), "fired": fired,
+}}))
+"""
+
+
+def open_app_storage(backend):
+    return open_storage(
+        backend, "logs/health_log", "logs/activity_log", "logs/schedule.json",
+        "logs/custom_reminders.json", "logs/elderly_care.db",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reminder store save and cold-start times")
+    parser.add_argument("--reminders", type=int, default=100000)
+    parser.add_argument("--residents", type=int, default=1000)
+    parser.add_argument("--missed", type=int, default=100, help="reminders already overdue at boot")
+    parser.add_argument("--saves", type=int, default=500, help="single-reminder saves to time")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_reminders_"))
+    os.makedirs("logs", exist_ok=True)
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(microsecond=0)
+    residents = [f"resident-{i:05d}" for i in range(args.residents)]
+    lists = {resident_id: [] for resident_id in residents}
+    for i in range(args.reminders):
+        overdue = i < args.missed
+        lists[residents[i % args.residents]].append({
+            "time": now - timedelta(minutes=rng.randint(1, 60)) if overdue else now + timedelta(seconds=rng.randint(60, 30 * 86400)),
+            "message": f"reminder {i}",
+            "category": rng.choice(["medicine", "doctor", "other"]),
+            "critical": rng.random() < 0.3,
+        })
+
+    storage = open_app_storage(args.backend)
+    start = time.perf_counter()
+    for resident_id, reminders in lists.items():
+        storage.save_schedule([], resident_id)
+        storage.save_custom_reminders(reminders, resident_id)
+    written = time.perf_counter() - start
+
+    # One reminder added at a time, as /set_reminder does
+    saves = []
+    for i in range(args.saves):
+        resident_id = residents[i % args.residents]
+        lists[resident_id].append({"time": now + timedelta(days=1), "message": f"extra {i}", "category": "other", "critical": False})
+        started = time.perf_counter()
+        storage.save_custom_reminders(lists[resident_id], resident_id)
+        saves.append(time.perf_counter() - started)
+    saves.sort()
+    storage.close()
+
+    env = dict(os.environ, STORAGE_BACKEND=args.backend, VOICE_ENABLED="0")
+    result = subprocess.run(
+        [sys.executable, "-c", BOOT.format(root=ROOT)], env=env, capture_output=True, text=True, check=True
+    )
+    boot = json.loads(result.stdout.strip().splitlines()[-1])
+
+    total = args.reminders + args.saves
+    expected_jobs = total - args.missed
+    print(f"{total} reminders across {args.residents} residents, {args.backend} storage")
+    print(f"initial write: {written:.2f}s")
+    print(
+        f"single save: p50 {saves[len(saves) // 2] * 1e3:.2f} ms, p99 {saves[int(len(saves) * 0.99)] * 1e3:.2f} ms, "
+        f"max {saves[-1] * 1e3:.2f} ms"
+    )
+    print(
+        f"cold start: import {boot['import']:.2f}s, load {boot['residents']} residents and schedule "
+        f"{boot['jobs']} jobs {boot['load']:.2f}s ({boot['load'] / total * 1e6:.1f} us per reminder)"
+    )
+    print(f"missed on boot: {boot['fired']} of {args.missed} fired")
+    if boot["jobs"] != expected_jobs or boot["fired"] != args.missed:
+        raise SystemExit(f"FAILED: expected {expected_jobs} jobs and {args.missed} missed reminders fired")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Load many residents into one process and report per-resident memory,
+# request latency and how long the monitoring engine takes to handle the
+# readings they produced.
+#
+#   python benchmarks/residents_benchmark.py [--residents 1000] [--readings 5] [--backend json|sqlite]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1e3
+
+
+def report(name, samples):
+    print(
+        f"{name:<16} {len(samples):>8} {percentile(samples, 0.5):>8.2f} {percentile(samples, 0.95):>8.2f} "
+        f"{percentile(samples, 0.99):>8.2f} {max(samples) * 1e3:>8.2f}"
+    )
+
+
+def timed(samples, call):
+    start = time.perf_counter()
+    response = call()
+    samples.append(time.perf_counter() - start)
+    if response.status_code != 200:
+        raise RuntimeError(f"Request failed with {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-resident memory and request latency with many residents")
+    parser.add_argument("--residents", type=int, default=1000)
+    parser.add_argument("--readings", type=int, default=5, help="health submissions per resident")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    args = parser.parse_args()
+
+    # The app keeps its logs relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="bench_residents_"))
+    os.makedirs("logs", exist_ok=True)
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ["VOICE_ENABLED"] = "0"
+    import app  # noqa: E402
+
+    client = app.app.test_client()
+    system = app.get_system()
+    residents = [f"resident-{i:05d}" for i in range(args.residents)]
+    submit, read = [], []
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for resident_id in residents:
+        for _ in range(args.readings):
+            timed(submit, lambda: client.post("/submit_health", data={
+                "resident": resident_id,
+                "heart_rate": random.randint(55, 120),
+                "bp_systolic": random.randint(85, 160),
+                "bp_diastolic": random.randint(55, 100),
+                "glucose": random.randint(60, 180),
+            }))
+        timed(read, lambda: client.get(f"/api/health?resident={resident_id}"))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    # The engine thread is not running here, so every reading is still queued
+    queued = len(system.engine.signals)
+    start = time.perf_counter()
+    system.engine.process()
+    engine_seconds = time.perf_counter() - start
+
+    print(f"{args.residents} residents, {args.readings} readings each, {args.backend} storage")
+    print(f"memory per resident: {grown / args.residents / 1024:.1f} KiB ({grown / 1024 / 1024:.1f} MiB total)")
+    print(f"monitoring engine: {queued} reading events handled in {engine_seconds:.2f}s")
+    print(f"{'request':<16} {'count':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    report("/submit_health", submit)
+    report("/api/health", read)
+
+
+if __name__ == "__main__":
+    main()
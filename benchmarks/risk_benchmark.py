@@ -0,0 +1,81 @@
+# Score the same readings one at a time (as monitor_health does) and as a
+# batch, check that both give identical results, and compare their speed.
+#
+#   python benchmarks/risk_benchmark.py [--readings 1000000] [--seed 1]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import risk  # noqa: E402
+from risk import AT_RISK, NORMAL, RiskThresholds, evaluate_batch, risk_code, suggestion_keys  # noqa: E402
+
+# The HealthMonitoringAgent defaults
+THRESHOLDS = RiskThresholds(100, (140, 90), (90, 60), 130, 70)
+
+
+def make_columns(n, seed):
+    rng = random.Random(seed)
+    return (
+        [rng.randint(50, 125) for _ in range(n)],
+        [rng.randint(80, 165) for _ in range(n)],
+        [rng.randint(50, 105) for _ in range(n)],
+        [rng.randint(55, 190) for _ in range(n)],
+    )
+
+
+def score_scalar(heart_rate, systolic, diastolic, glucose):
+    codes, transitions, suggestions = [], [], 0
+    status = NORMAL
+    for i, reading in enumerate(zip(heart_rate, systolic, diastolic, glucose)):
+        code = risk_code(*reading, THRESHOLDS)
+        new_status = AT_RISK if code else NORMAL
+        if new_status != status:
+            transitions.append(i)
+        status = new_status
+        suggestions += len(suggestion_keys(code))
+        codes.append(code)
+    return codes, transitions
+
+
+def timed(call):
+    start = time.perf_counter()
+    result = call()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scalar and batch risk scoring")
+    parser.add_argument("--readings", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    columns = make_columns(args.readings, args.seed)
+    (codes, transitions), scalar_seconds = timed(lambda: score_scalar(*columns))
+    rows = [("scalar", scalar_seconds)]
+
+    paths = [("batch (python)", False)]
+    if risk.np is not None:
+        arrays = [risk.np.asarray(column) for column in columns]
+        paths.append(("batch (numpy)", True))
+    else:
+        print("NumPy is not installed; only the pure-Python batch path is measured")
+
+    for name, use_numpy in paths:
+        batch_columns = arrays if use_numpy else columns
+        batch, seconds = timed(lambda: evaluate_batch(*batch_columns, THRESHOLDS, use_numpy=use_numpy))
+        if [int(code) for code in batch.codes] != codes or [int(i) for i in batch.transitions] != transitions:
+            raise SystemExit(f"{name} results differ from the scalar path")
+        rows.append((name, seconds))
+
+    print(f"{args.readings} readings, {len(transitions)} status transitions, results identical")
+    print(f"{'path':<16} {'seconds':>8} {'readings/s':>12} {'speedup':>8}")
+    for name, seconds in rows:
+        print(f"{name:<16} {seconds:>8.3f} {args.readings / seconds:>12,.0f} {scalar_seconds / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Time the reminder scheduler with many reminders spread over many residents:
+# schedule, reschedule, cancel, an idle check and firing everything, driven by
+# a simulated clock. The schedule library's run_pending() is timed for comparison
+# when it is installed.
+#
+#   python benchmarks/scheduler_benchmark.py [--reminders 100000] [--residents 1000]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitor import SimulatedClock  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+
+DAY = 86400
+
+
+def per_op(seconds, count):
+    return seconds / count * 1e6 if count else 0.0
+
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reminder scheduler benchmark")
+    parser.add_argument("--reminders", type=int, default=100000)
+    parser.add_argument("--residents", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    clock = SimulatedClock(0.0)
+    scheduler = Scheduler(clock)
+    fired = []
+    keys = [(f"resident-{i % args.residents:05d}", "custom", i // args.residents) for i in range(args.reminders)]
+    dues = [rng.uniform(1, DAY) for _ in keys]
+
+    def schedule_all():
+        for i, (key, due) in enumerate(zip(keys, dues)):
+            # Every tenth reminder is a daily task
+            scheduler.schedule(key, due, lambda key=key: fired.append(key), DAY if i % 10 == 0 else None)
+
+    moved = keys[::10]
+    cancelled = keys[5::10]
+    rows = [
+        ("schedule", timed(schedule_all), len(keys)),
+        ("reschedule", timed(lambda: [scheduler.reschedule(key, rng.uniform(1, DAY)) for key in moved]), len(moved)),
+        ("cancel", timed(lambda: [scheduler.cancel(key) for key in cancelled]), len(cancelled)),
+        ("idle check", timed(lambda: [scheduler.run_pending() for _ in range(1000)]), 1000),
+    ]
+    remaining = len(scheduler)
+    clock.advance(DAY)
+    rows.append(("fire all due", timed(scheduler.run_pending), remaining))
+    if len(fired) != remaining:
+        raise SystemExit(f"FAILED: {len(fired)} fired, expected {remaining}")
+    cancelled_keys = set(cancelled)
+    daily = sum(1 for i, key in enumerate(keys) if i % 10 == 0 and key not in cancelled_keys)
+    if len(scheduler) != daily:
+        raise SystemExit(f"FAILED: {len(scheduler)} jobs left, expected {daily} daily tasks")
+
+    print(f"{args.reminders} reminders across {args.residents} residents; all {remaining} fired once, {daily} daily tasks re-armed")
+    print(f"{'operation':<14} {'count':>8} {'total ms':>10} {'us/op':>8}")
+    for name, seconds, count in rows:
+        print(f"{name:<14} {count:>8} {seconds * 1e3:>10.1f} {per_op(seconds, count):>8.2f}")
+
+    try:
+        import schedule
+    except ImportError:
+        return
+    for i in range(args.reminders):
+        schedule.every().day.at(f"{rng.randrange(24):02d}:{rng.randrange(60):02d}").do(lambda: None)
+    seconds = timed(lambda: [schedule.run_pending() for _ in range(10)]) / 10
+    print(f"for comparison, schedule.run_pending() with {args.reminders} jobs: {seconds * 1e3:.1f} ms per call (every second)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# Drive the monitoring path end to end with the seeded sensor simulator.
+#
+#   python benchmarks/sensor_load.py [--residents 50] [--hours 24] [--adapter direct|http|socket] [--rate 2000]
+#
+# First against a simulated clock, stepping to every event and timer: each
+# simulated fall must raise exactly one fall alert, and the inactivity alerts
+# must match the gaps in each resident's stream. Then against the real clock,
+# with the engine on its own thread and events sent as fast as the adapter
+# takes them (or at --rate events per second): sustained events and readings
+# per second, and the time from a fall's accelerometer window being sent to
+# its alert. Unpaced, that time includes the backlog queued ahead of the fall.
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitor import SimulatedClock  # noqa: E402
+from sensors import SensorHub, SocketSource, Simulator  # noqa: E402
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAILED: {message}")
+
+
+# (time.perf_counter(), resident_id, message) of every alert the system
+# raises, including those the alert pipeline then suppresses as repeats
+def record_alerts(system):
+    alerts = []
+    send_alert = system.collaboration_agent.send_alert
+
+    def recorded(message, emergency=False, priority="Medium", resident_id="default", kind="alert"):
+        alerts.append((time.perf_counter(), resident_id, message))
+        return send_alert(message, emergency, priority, resident_id, kind)
+
+    system.collaboration_agent.send_alert = recorded
+    return alerts
+
+
+def count(alerts, text):
+    return sum(1 for _, _, message in alerts if text in message)
+
+
+def simulated(app, args):
+    start = time.time() - args.hours * 3600
+    clock = SimulatedClock(start)
+    system = app.ElderlyCareSystem(clock=clock)
+    system.running = True
+    alerts = record_alerts(system)
+    hub = SensorHub(system.sensor_events)
+    simulator = Simulator(args.residents, args.seed, start, args.reading_interval, prefix="simclock")
+
+    # Run every timer due up to ts at its due time, then move the clock to ts
+    def advance(ts):
+        while True:
+            wait = system.engine.process()
+            if wait is None or clock.now + wait > ts:
+                break
+            clock.now += max(wait, 0)
+        clock.now = ts
+
+    touches = defaultdict(list)  # first event, then every reading and activity ping
+    events = 0
+    for event in simulator.events(args.hours * 3600):
+        advance(event["ts"])
+        hub.feed(json.dumps(event).encode(), "simulator")
+        system.engine.process()
+        kind = event.get("type", "reading")
+        if not touches[event["resident"]] or kind in ("reading", "activity"):
+            touches[event["resident"]].append(event["ts"])
+        events += 1
+    end = clock.now
+
+    inactivity = system.resident(simulator.resident_ids[0]).health_agent.inactivity_seconds
+    expected_inactive = 0
+    for times in touches.values():
+        for before, after in zip(times, times[1:] + [end]):
+            expected_inactive += int((after - before) // inactivity)
+    falls = count(alerts, "Fall detected")
+    inactive = count(alerts, "Inactivity")
+    print(f"simulated clock: {events} events from {len(touches)} residents over {args.hours}h")
+    print(f"  falls:      {falls} alerts for {len(simulator.falls)} simulated falls")
+    print(f"  inactivity: {inactive} alerts, {expected_inactive} expected from the gaps")
+    print(f"  other:      {count(alerts, 'At Risk')} at risk, {count(alerts, 'Unusual')} unusual-for-resident")
+    check(falls == len(simulator.falls), "fall alerts do not match the simulated falls")
+    check(inactive == expected_inactive, "inactivity alerts do not match the gaps")
+
+
+def realtime(app, args):
+    system = app.ElderlyCareSystem()
+    system.running = True
+    alerts = record_alerts(system)
+    hub = SensorHub(system.sensor_events)
+    app.get_system = lambda: system  # /api/sensors dispatches to this system
+    app.sensor_hub.dispatch = system.sensor_events
+    simulator = Simulator(args.residents, args.seed + 1, time.time() - args.hours * 3600, args.reading_interval, prefix="live")
+    events = list(simulator.events(args.hours * 3600))
+    fall_events = set(simulator.falls)
+    chunks = []
+    for first in range(0, len(events), args.batch):
+        chunk = events[first:first + args.batch]
+        falls = [event["resident"] for event in chunk if (event["resident"], event["ts"]) in fall_events]
+        chunks.append((b"".join(json.dumps(event).encode() + b"\n" for event in chunk), falls))
+    readings = sum(1 for event in events if "type" not in event)
+
+    if args.adapter == "http":
+        client = app.app.test_client()
+
+        def send(body):
+            response = client.post("/api/sensors", data=body, content_type="application/x-ndjson")
+            check(response.status_code == 202, f"/api/sensors returned {response.status_code}")
+    elif args.adapter == "socket":
+        source = SocketSource(hub, "127.0.0.1:0")
+        connection = socket.create_connection(source.start().rsplit(":", 1))
+
+        def send(body):
+            connection.sendall(body)
+    else:
+        def send(body):
+            hub.feed(body, "simulator")
+
+    system.engine.start()
+    sent = defaultdict(deque)  # resident_id -> send times of their falls, oldest first
+    started = time.perf_counter()
+    for i, (body, falls) in enumerate(chunks):
+        if args.rate:
+            wait = started + i * args.batch / args.rate - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        now = time.perf_counter()
+        for resident_id in falls:
+            sent[resident_id].append(now)
+        send(body)
+    if args.adapter == "socket":
+        connection.close()
+        deadline = time.perf_counter() + 60
+        while sum(counts["readings"] + counts["signals"] for counts in hub.stats().values()) < len(events):
+            check(time.perf_counter() < deadline, "socket source fell behind by more than a minute")
+            time.sleep(0.01)
+    deadline = time.perf_counter() + 60
+    while system.engine.stats()["queued"] or count(alerts, "Fall detected") < len(simulator.falls):
+        check(time.perf_counter() < deadline, "engine did not catch up within a minute")
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    system.engine.stop()
+
+    latencies = []
+    for at, resident_id, message in alerts:
+        if "Fall detected" in message:
+            latencies.append(at - sent[resident_id].popleft())
+    latencies.sort()
+    print(f"real clock ({args.adapter}): {len(events)} events, {readings} readings from {args.residents} residents")
+    print(f"  sustained:  {len(events) / elapsed:.0f} events/s, {readings / elapsed:.0f} readings/s ({elapsed:.2f}s)")
+    if latencies:
+        p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+        print(
+            f"  fall alert: {len(latencies)} falls, send-to-alert p50 {p50 * 1e3:.1f} ms, "
+            f"p99 {p99 * 1e3:.1f} ms, max {latencies[-1] * 1e3:.1f} ms"
+        )
+    check(len(latencies) == len(simulator.falls), "fall alerts do not match the simulated falls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end sensor load and alert checks with the simulator")
+    parser.add_argument("--residents", type=int, default=50)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--reading-interval", type=float, default=300, help="seconds between each resident's vitals")
+    parser.add_argument("--adapter", choices=["direct", "http", "socket"], default="direct")
+    parser.add_argument("--batch", type=int, default=500, help="events per body in the real-clock run")
+    parser.add_argument("--rate", type=float, default=0, help="events per second in the real-clock run; 0: unpaced")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_sensors_"))
+    os.makedirs("logs", exist_ok=True)
+    os.environ["VOICE_ENABLED"] = "0"
+    import app  # noqa: E402
+
+    simulated(app, args)
+    realtime(app, args)
+
+
+if __name__ == "__main__":
+    main()
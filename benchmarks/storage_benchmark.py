@@ -0,0 +1,81 @@
+# Compare the JSON and SQLite storage engines at growing history sizes.
+#
+#   python benchmarks/storage_benchmark.py [--sizes 10000 100000 1000000]
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import HealthReading  # noqa: E402
+from storage import open_storage  # noqa: E402
+
+LOAD_BATCH = 10000
+SAMPLES = 1000
+
+
+def make_entry(i):
+    return HealthReading(
+        time.time(), random.randint(55, 120), random.randint(85, 160), random.randint(55, 100),
+        random.randint(60, 180), source="Sensor Input",
+    ).to_dict()
+
+
+def open_engine(backend, directory):
+    return open_storage(
+        backend,
+        os.path.join(directory, "health_log"),
+        os.path.join(directory, "activity_log"),
+        os.path.join(directory, "schedule.json"),
+        os.path.join(directory, "custom_reminders.json"),
+        os.path.join(directory, "elderly_care.db"),
+    )
+
+
+def run(backend, size):
+    directory = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    try:
+        store = open_engine(backend, directory)
+        start = time.perf_counter()
+        for offset in range(0, size, LOAD_BATCH):
+            store.append_health_many([make_entry(i) for i in range(offset, min(size, offset + LOAD_BATCH))])
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(SAMPLES):
+            store.append_health(make_entry(size + i))
+        append_us = (time.perf_counter() - start) / SAMPLES * 1e6
+
+        start = time.perf_counter()
+        for _ in range(SAMPLES):
+            store.recent_health(5)
+        recent_us = (time.perf_counter() - start) / SAMPLES * 1e6
+
+        start = time.perf_counter()
+        store.close()
+        open_engine(backend, directory).close()
+        reopen_ms = (time.perf_counter() - start) * 1e3
+        return load_seconds, append_us, recent_us, reopen_ms
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the JSON and SQLite storage engines")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--backends", nargs="+", default=["json", "sqlite"])
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'records':>9} {'bulk load s':>12} {'append us':>10} {'recent(5) us':>13} {'reopen ms':>10}")
+    for size in args.sizes:
+        for backend in args.backends:
+            load_seconds, append_us, recent_us, reopen_ms = run(backend, size)
+            print(f"{backend:<8} {size:>9} {load_seconds:>12.2f} {append_us:>10.1f} {recent_us:>13.1f} {reopen_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
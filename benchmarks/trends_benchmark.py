@@ -0,0 +1,104 @@
+# Time trend queries answered from rollups as the raw health history grows:
+# the query time should stay flat. Also times rollup updates per reading and a
+# full rebuild (what backfill_rollups.py does).
+#
+#   python benchmarks/trends_benchmark.py [--sizes 10000 100000 1000000] [--backend json|sqlite]
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import HealthReading  # noqa: E402
+from rollups import RollupEngine, choose_resolution  # noqa: E402
+from storage import open_storage  # noqa: E402
+
+YEAR = 365 * 86400
+BATCH = 10000
+QUERIES = 200
+SPANS = [("7 days", 7 * 86400), ("30 days", 30 * 86400), ("1 year", YEAR)]
+
+
+def open_engine(backend, directory):
+    return open_storage(
+        backend,
+        os.path.join(directory, "health_log"),
+        os.path.join(directory, "activity_log"),
+        os.path.join(directory, "schedule.json"),
+        os.path.join(directory, "custom_reminders.json"),
+        os.path.join(directory, "elderly_care.db"),
+        os.path.join(directory, "residents"),
+    )
+
+
+def run(size, backend, rng):
+    directory = tempfile.mkdtemp(prefix="bench_trends_")
+    try:
+        storage = open_engine(backend, directory)
+        write_lock = threading.Lock()
+        rollups = RollupEngine(storage, os.path.join(directory, "rollups"), write_lock)
+        end = time.time()
+        step = YEAR / size
+        add_seconds = 0.0
+        for first in range(0, size, BATCH):
+            readings = [
+                HealthReading(
+                    end - YEAR + i * step, rng.randint(55, 120), rng.randint(85, 160), rng.randint(55, 100),
+                    rng.randint(60, 180), source="Sensor Input",
+                )
+                for i in range(first, min(size, first + BATCH))
+            ]
+            with write_lock:
+                cursor = storage.append_health_many([reading.to_dict() for reading in readings])
+                start = time.perf_counter()
+                rollups.add("default", readings, cursor)
+                add_seconds += time.perf_counter() - start
+
+        row = [size, add_seconds / size * 1e6]
+        for _, span in SPANS:
+            resolution = choose_resolution(end - span, end)
+            start = time.perf_counter()
+            for _ in range(QUERIES):
+                points = rollups.trends("default", resolution, end - span, end)
+            row.append((time.perf_counter() - start) / QUERIES * 1e3)
+            row.append(f"{len(points)} {resolution}")
+
+        start = time.perf_counter()
+        rebuilt = rollups.rebuild("default")
+        row.append(time.perf_counter() - start)
+        if rebuilt != size:
+            raise SystemExit(f"FAILED: rebuild counted {rebuilt} readings, expected {size}")
+        storage.close()
+        return row
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trend query time against raw history size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    header = f"{'readings':>9} {'add us':>7}"
+    for name, _ in SPANS:
+        header += f" {name + ' ms':>11} {'points':>11}"
+    print(f"{args.backend} storage, readings spread over one year")
+    print(header + f" {'rebuild s':>10}")
+    for size in args.sizes:
+        size_row = run(size, args.backend, rng)
+        line = f"{size_row[0]:>9} {size_row[1]:>7.2f}"
+        for i in range(len(SPANS)):
+            line += f" {size_row[2 + 2 * i]:>11.3f} {size_row[3 + 2 * i]:>11}"
+        print(line + f" {size_row[-1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# Parallel /submit_health load against several worker processes sharing one
+# logs/ directory, then a check that every reading was stored exactly once,
+# that the leader's engine saw every one, and that every worker shows the same
+# latest readings.
+#
+#   python benchmarks/worker_stress.py [--workers 4] [--requests 4000] [--concurrency 32] [--kill-leader]
+#
+# Workers are started as `python wsgi.py --port N` in a temporary directory,
+# each on its own port; requests go round-robin, the way a load balancer would
+# spread them. --kill-leader kills the leader halfway through: one of the
+# others must take over, and requests refused by the dead worker go to the next.
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Distinct in-range vitals for request i, so each stored reading can be traced back to its request
+def vitals(i):
+    return 60 + i % 40, 100 + i // 40 % 40, 60 + i // 1600 % 30, 80 + i // 48000 % 50
+
+
+def request(port, path, data=None, timeout=30):
+    body = urllib.parse.urlencode(data).encode() if data is not None else None
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", body, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def start_workers(args, directory):
+    env = dict(os.environ, VOICE_ENABLED="0", STORAGE_BACKEND="sqlite")
+    workers = []
+    for _ in range(args.workers):
+        port = free_port()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "wsgi.py"), "--port", str(port)], cwd=directory, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        workers.append((port, process))
+    deadline = time.time() + 60
+    for port, _ in workers:
+        while True:
+            try:
+                request(port, "/api/monitor")  # answered by the leader, so it is up too
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if time.time() > deadline:
+                    raise SystemExit(f"Worker on port {port} did not come up")
+                time.sleep(0.2)
+    return workers
+
+
+def leader_pid(directory):
+    with open(os.path.join(directory, "logs", "leader.lock")) as f:
+        return int(f.read())
+
+
+def load(args, workers, directory):
+    ports = [port for port, _ in workers]
+    dead = set()
+    latencies = []
+    errors = []
+    sent = []  # request numbers the server accepted
+    cut = []  # request numbers in flight on the killed worker: stored or not
+    lock = threading.Lock()
+    counter = iter(range(args.requests))
+    killed = threading.Event()
+
+    def run():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            if args.kill_leader and i == args.requests // 2 and not killed.is_set():
+                killed.set()
+                pid = leader_pid(directory)
+                os.kill(pid, signal.SIGKILL)
+                dead.update(port for port, process in workers if process.pid == pid)
+            heart_rate, systolic, diastolic, glucose = vitals(i)
+            data = {
+                "resident": f"stress{i % args.residents}", "heart_rate": heart_rate, "bp_systolic": systolic,
+                "bp_diastolic": diastolic, "glucose": glucose,
+            }
+            for attempt in range(len(ports)):
+                port = ports[(i + attempt) % len(ports)]
+                started = time.perf_counter()
+                try:
+                    answer = request(port, "/submit_health", data)
+                except (urllib.error.URLError, ConnectionError, http.client.HTTPException) as e:
+                    if isinstance(getattr(e, "reason", None), ConnectionRefusedError):
+                        continue  # never reached a worker, so safe to send elsewhere
+                    with lock:
+                        if port in dead:
+                            cut.append(i)  # killed mid-request
+                        else:
+                            errors.append(f"{i}: {e}")
+                    break
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    if answer.get("status") == "success":
+                        sent.append(i)
+                    else:
+                        errors.append(f"{i}: {answer}")
+                break
+            else:
+                with lock:
+                    errors.append(f"{i}: no worker reachable")
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return sent, cut, errors, sorted(latencies), elapsed, [port for port in ports if port not in dead]
+
+
+def check(args, directory, sent, cut, ports):
+    expected = {}
+    for i in sent:
+        expected[(f"stress{i % args.residents}", *vitals(i))] = 0
+    maybe = {(f"stress{i % args.residents}", *vitals(i)) for i in cut}
+    stored = 0
+    unexpected = 0
+    with sqlite3.connect(os.path.join(directory, "logs", "elderly_care.db")) as conn:
+        for resident_id, data in conn.execute("SELECT resident_id, data FROM health WHERE resident_id LIKE 'stress%'"):
+            entry = json.loads(data)
+            key = (resident_id, entry["heart_rate"], entry["systolic"], entry["diastolic"], entry["glucose"])
+            stored += 1
+            if key in expected:
+                expected[key] += 1
+            elif key not in maybe:
+                unexpected += 1
+    lost = sum(1 for count in expected.values() if count == 0)
+    duplicated = sum(count - 1 for count in expected.values() if count > 1)
+
+    # The leader's engine gets one reading signal per submission, forwarded or
+    # not; a leader that took over only counts what came after
+    processed = None
+    for _ in range(50):
+        processed = request(ports[0], "/api/monitor")["processed"]
+        if processed >= len(sent) or args.kill_leader:
+            break
+        time.sleep(0.1)
+
+    # Every worker answers /api/health from its own cache, checked against the shared store
+    differing = 0
+    for r in range(args.residents):
+        views = {json.dumps(request(port, f"/api/health?resident=stress{r}")) for port in ports}
+        differing += len(views) > 1
+    return stored, lost, duplicated, unexpected, processed, differing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process /submit_health stress test")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--residents", type=int, default=20)
+    parser.add_argument("--kill-leader", action="store_true", help="kill the leader halfway through")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_workers_")
+    os.makedirs(os.path.join(directory, "logs"))
+    workers = start_workers(args, directory)
+    try:
+        first_leader = leader_pid(directory)
+        sent, cut, errors, latencies, elapsed, ports = load(args, workers, directory)
+        if args.kill_leader:
+            time.sleep(3)  # a follower takes over within its retry interval
+        stored, lost, duplicated, unexpected, processed, differing = check(args, directory, sent, cut, ports)
+    finally:
+        for _, process in workers:
+            process.kill()
+    print(f"{args.workers} workers, {args.concurrency} clients, {args.residents} residents")
+    print(f"  accepted:   {len(sent)} of {args.requests} in {elapsed:.2f}s ({len(sent) / elapsed:.0f}/s)")
+    if latencies:
+        print(
+            f"  latency:    p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms"
+        )
+    print(f"  stored:     {stored} (lost {lost}, duplicated {duplicated}, unexpected {unexpected})")
+    if args.kill_leader:
+        print(f"  engine:     {processed} reading signals since the takeover, for {len(sent)} accepted")
+    else:
+        print(f"  engine:     {processed} reading signals for {len(sent)} accepted")
+    print(f"  views:      {differing} of {args.residents} residents look different on some worker")
+    if args.kill_leader:
+        print(f"  leader:     {first_leader} killed, now {leader_pid(directory)}; {len(cut)} requests cut off with it")
+    for error in errors[:5]:
+        print(f"  error {error}")
+    if errors or lost or duplicated or unexpected or differing or (processed < len(sent) and not args.kill_leader):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
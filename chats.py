@@ -0,0 +1,161 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Chat ids are random, URL-safe and the only part of a chat kept in the
+# session cookie; they also name spill files, so nothing else is accepted
+CHAT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+# One browser session's chat with a resident's companion. Messages are
+# numbered from 1 in the order they are added, so a client can ask for the
+# ones after the last it has; only the latest `limit` are kept.
+class Conversation:
+    __slots__ = ("chat_id", "resident_id", "messages", "seq", "last_used")
+
+    def __init__(self, chat_id, resident_id, limit, last_used):
+        self.chat_id = chat_id
+        self.resident_id = resident_id
+        self.messages = deque(maxlen=limit)  # {"seq", "role", "message"}, oldest first
+        self.seq = 0  # number of the latest message
+        self.last_used = last_used
+
+    def add(self, role, message):
+        self.seq += 1
+        entry = {"seq": self.seq, "role": role, "message": message}
+        self.messages.append(entry)
+        return entry
+
+    # Kept messages numbered after seq
+    def since(self, seq):
+        if seq >= self.seq:
+            return []
+        return [entry for entry in self.messages if entry["seq"] > seq]
+
+    def to_dict(self):
+        return {
+            "chat_id": self.chat_id, "resident_id": self.resident_id, "seq": self.seq,
+            "last_used": self.last_used, "messages": list(self.messages),
+        }
+
+    @classmethod
+    def from_dict(cls, data, limit):
+        conversation = cls(data["chat_id"], data["resident_id"], limit, data["last_used"])
+        conversation.messages.extend(data["messages"])
+        conversation.seq = data["seq"]
+        return conversation
+
+
+# Server-side chat conversations keyed by chat id. At most `capacity` are
+# held in memory, least recently used first out; with a spill_dir the ones
+# pushed out are written there as <chat_id>.json and read back (and removed)
+# when next used. Conversations unused for `ttl` seconds are dropped, from
+# memory on access or sweep() and from spill_dir on sweep().
+class ChatStore:
+    def __init__(self, capacity=1000, ttl=86400, limit=50, spill_dir=None, clock=time.time):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.limit = limit
+        self.spill_dir = spill_dir
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.conversations = OrderedDict()  # chat_id -> Conversation, least recently used first
+        self.spilled = 0
+        self.expired = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _file(self, chat_id):
+        return os.path.join(self.spill_dir, chat_id + ".json")
+
+    def create(self, resident_id):
+        with self.lock:
+            conversation = Conversation(secrets.token_urlsafe(18), resident_id, self.limit, self.clock())
+            self.conversations[conversation.chat_id] = conversation
+            self._evict()
+        return conversation
+
+    # The conversation for chat_id, or None if it is unknown or has expired
+    def get(self, chat_id):
+        if not chat_id or not CHAT_ID_PATTERN.match(chat_id):
+            return None
+        now = self.clock()
+        with self.lock:
+            conversation = self.conversations.get(chat_id)
+            if conversation is None:
+                conversation = self._unspill(chat_id)
+                if conversation is None:
+                    return None
+                self.conversations[chat_id] = conversation
+            if now - conversation.last_used > self.ttl:
+                del self.conversations[chat_id]
+                self.expired += 1
+                return None
+            conversation.last_used = now
+            self.conversations.move_to_end(chat_id)
+            self._evict()
+        return conversation
+
+    def _evict(self):
+        while len(self.conversations) > self.capacity:
+            _, conversation = self.conversations.popitem(last=False)
+            if self.spill_dir:
+                tmp_file = self._file(conversation.chat_id) + ".tmp"
+                with open(tmp_file, "w") as f:
+                    json.dump(conversation.to_dict(), f)
+                os.replace(tmp_file, self._file(conversation.chat_id))
+                os.utime(self._file(conversation.chat_id), (conversation.last_used, conversation.last_used))
+                self.spilled += 1
+
+    def _unspill(self, chat_id):
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._file(chat_id)) as f:
+                data = json.load(f)
+            os.remove(self._file(chat_id))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading spilled chat {chat_id}: {e}")
+            return None
+        return Conversation.from_dict(data, self.limit)
+
+    # Drop expired conversations from memory and spill_dir. Returns how many.
+    def sweep(self):
+        cutoff = self.clock() - self.ttl
+        dropped = 0
+        with self.lock:
+            while self.conversations:
+                chat_id, conversation = next(iter(self.conversations.items()))
+                if conversation.last_used > cutoff:
+                    break
+                del self.conversations[chat_id]
+                dropped += 1
+            if self.spill_dir:
+                # Spill files carry their conversation's last use as mtime
+                for name in os.listdir(self.spill_dir):
+                    path = os.path.join(self.spill_dir, name)
+                    try:
+                        if name.endswith(".json") and os.path.getmtime(path) <= cutoff:
+                            os.remove(path)
+                            dropped += 1
+                    except FileNotFoundError:
+                        pass
+            self.expired += dropped
+        return dropped
+
+    def stats(self):
+        with self.lock:
+            return {
+                "conversations": len(self.conversations),
+                "capacity": self.capacity,
+                "ttl": self.ttl,
+                "history_limit": self.limit,
+                "spilled": self.spilled,
+                "expired": self.expired,
+            }
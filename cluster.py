@@ -0,0 +1,258 @@
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: the app runs, but only as a single process
+
+
+def _require_flock():
+    if fcntl is None:
+        raise RuntimeError(
+            "Multi-process mode needs fcntl.flock(), which this platform lacks; run a single process with python app.py"
+        )
+
+
+class LeaderError(Exception):
+    pass
+
+
+# A lock shared by threads and processes: a threading lock plus flock() on
+# path. The file is opened once per process, so a lock created before a fork
+# still keeps the forked processes out of each other's way.
+class FileLock:
+    def __init__(self, path):
+        _require_flock()
+        self.path = path
+        self.lock = threading.Lock()
+        self.fd = None
+        self.pid = None
+
+    def acquire(self):
+        self.lock.acquire()
+        try:
+            if self.pid != os.getpid():
+                self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                self.pid = os.getpid()
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        except BaseException:
+            self.lock.release()
+            raise
+        return True
+
+    def release(self):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+# Leader election among the processes sharing path: the leader is whichever
+# holds an exclusive flock() on it, until it exits and the kernel drops the
+# lock. start() returns whether this process won; the others keep trying
+# every `retry` seconds and call on_elected() once they take over.
+class Election:
+    def __init__(self, path, on_elected, retry=2.0):
+        _require_flock()
+        self.path = path
+        self.on_elected = on_elected
+        self.retry = retry
+        self.fd = None
+        self.thread = None
+
+    @property
+    def is_leader(self):
+        return self.fd is not None
+
+    def try_acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())  # for whoever looks at the file
+        self.fd = fd
+        return True
+
+    def start(self):
+        if self.try_acquire():
+            return True
+        self.thread = threading.Thread(target=self._wait, daemon=True)
+        self.thread.start()
+        return False
+
+    def _wait(self):
+        while not self.try_acquire():
+            time.sleep(self.retry)
+        self.on_elected()
+
+
+# The leader's end of a local Unix socket. Followers send one JSON object per
+# line, {"op": name, "args": [...]}, and handlers[op](*args) runs on a thread
+# per connection. Ops in `notices` are fire and forget; every other op is
+# answered with one line, {"result": ...} or {"error": "..."}.
+class LeaderServer:
+    def __init__(self, path, handlers, notices=()):
+        self.path = path
+        self.handlers = handlers
+        self.notices = set(notices)
+        self.server = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)  # left by a leader that died
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen(64)
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self.path
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.close()
+
+    def _accept(self):
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return  # closed by stop()
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        with connection, connection.makefile("rb") as lines:
+            for line in lines:
+                try:
+                    message = json.loads(line)
+                    op = message["op"]
+                    handler = self.handlers[op]
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Leader socket: bad message: {e}")
+                    continue
+                try:
+                    reply = {"result": handler(*message.get("args", ()))}
+                except Exception as e:
+                    print(f"Leader socket: {op} failed: {e}")
+                    reply = {"error": f"{type(e).__name__}: {e}"}
+                if op in self.notices:
+                    continue
+                try:
+                    connection.sendall((json.dumps(reply) + "\n").encode())
+                except OSError:
+                    return
+
+
+# A follower's end. notify() queues a fire-and-forget op for a sender thread
+# that reconnects until the leader is back, dropping the oldest past
+# `backlog`. call() waits for the answer and raises LeaderError when the
+# leader cannot be reached or the op failed there.
+class LeaderClient:
+    def __init__(self, path, timeout=10.0, backlog=10000, retry=0.5):
+        self.path = path
+        self.timeout = timeout
+        self.backlog = backlog
+        self.retry = retry
+        self.cond = threading.Condition()
+        self.queue = deque()  # encoded lines not yet sent
+        self.dropped = 0
+        self.stopped = False
+        self.thread = None
+
+    def _connect(self, timeout):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(timeout)
+        try:
+            connection.connect(self.path)
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def notify(self, op, *args):
+        line = (json.dumps({"op": op, "args": args}) + "\n").encode()
+        with self.cond:
+            if len(self.queue) >= self.backlog:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append(line)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._send, daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def _send(self):
+        connection = None
+        failing = False
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.queue or self.stopped)
+                if self.stopped:
+                    break
+                batch = list(self.queue)
+                self.queue.clear()
+            try:
+                if connection is None:
+                    connection = self._connect(self.timeout)
+                connection.sendall(b"".join(batch))
+                failing = False
+            except OSError as e:
+                if not failing:
+                    print(f"Leader unreachable, holding {len(batch)} messages: {e}")
+                    failing = True
+                if connection is not None:
+                    connection.close()
+                    connection = None
+                with self.cond:
+                    # Back to the front, the oldest dropped past the backlog
+                    keep = batch[max(len(batch) - max(self.backlog - len(self.queue), 0), 0):]
+                    self.dropped += len(batch) - len(keep)
+                    self.queue.extendleft(reversed(keep))
+                time.sleep(self.retry)
+        if connection is not None:
+            connection.close()
+
+    def call(self, op, *args, timeout=None):
+        line = (json.dumps({"op": op, "args": args}) + "\n").encode()
+        try:
+            with self._connect(timeout or self.timeout) as connection:
+                connection.sendall(line)
+                with connection.makefile("rb") as reply:
+                    answer = reply.readline()
+        except OSError as e:
+            raise LeaderError(f"Leader unreachable: {e}") from e
+        if not answer:
+            raise LeaderError("Leader closed the connection")
+        answer = json.loads(answer)
+        if "error" in answer:
+            raise LeaderError(answer["error"])
+        return answer["result"]
+
+    # Stop the sender; returns what was never sent as (op, args) pairs
+    def close(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+        with self.cond:
+            unsent = [json.loads(line) for line in self.queue]
+            self.queue.clear()
+        return [(message["op"], message["args"]) for message in unsent]
+
+    def stats(self):
+        with self.cond:
+            return {"queued": len(self.queue), "dropped": self.dropped}
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class Event:
+    __slots__ = ("id", "type", "data", "resident_id")
+
+    def __init__(self, event_id, event_type, data, resident_id=None):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.resident_id = resident_id
+
+    # Server-Sent Events wire format
+    def to_sse(self):
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+# In-process publish/subscribe bus. Recent events are kept so a client that
+# reconnects with Last-Event-ID receives only what it missed. Subscribers pass
+# a resident_id to see only that resident's events.
+class EventBus:
+    def __init__(self, history=1000):
+        self.cond = threading.Condition()
+        self.events = deque(maxlen=history)
+        self.last_id = 0
+
+    def publish(self, event_type, data, resident_id=None):
+        with self.cond:
+            self.last_id += 1
+            self.events.append(Event(self.last_id, event_type, data, resident_id))
+            self.cond.notify_all()
+            return self.last_id
+
+    # An event another process's bus published, keeping its id; older ids are ignored
+    def mirror(self, event_id, event_type, data, resident_id=None):
+        with self.cond:
+            if event_id <= self.last_id:
+                return
+            self.last_id = event_id
+            self.events.append(Event(event_id, event_type, data, resident_id))
+            self.cond.notify_all()
+
+    # Forget every event, as after a restart; subscribers start over from what comes next
+    def reset(self):
+        with self.cond:
+            self.events.clear()
+            self.last_id = 0
+            self.cond.notify_all()
+
+    def since(self, last_id, resident_id=None):
+        with self.cond:
+            if last_id > self.last_id:
+                last_id = 0  # id from before a restart; replay what we have
+            return [
+                event for event in self.events
+                if event.id > last_id and (resident_id is None or event.resident_id == resident_id)
+            ]
+
+    # Block until there is something newer than last_id for this subscriber or the timeout passes
+    def wait(self, last_id, timeout, resident_id=None):
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            if last_id > self.last_id:
+                last_id = 0
+            seen = last_id
+            while True:
+                events = self.since(seen, resident_id)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                seen = self.last_id  # other residents' events; skip them next time
+                self.cond.wait_for(lambda: self.last_id > seen, remaining)
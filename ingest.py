@@ -0,0 +1,163 @@
+import json
+import time
+
+from records import ReadingColumns
+from storage import RESIDENT_ID_PATTERN
+
+# Order of values in the compact array form: [heart_rate, bp_systolic, bp_diastolic, glucose, ts?]
+READING_FIELDS = ("heart_rate", "bp_systolic", "bp_diastolic", "glucose")
+MAX_ERRORS = 20
+MAX_TIMESTAMP = 32503680000  # year 3000
+MAX_VALUE = 2 ** 31 - 1  # columns are 32-bit integers
+# Sensor events other than readings; "accel" carries accelerometer magnitudes in g
+SIGNAL_TYPES = ("fall", "activity", "accel")
+MAX_ACCEL_SAMPLES = 1000
+MAX_ACCEL_G = 100
+
+
+class IngestError(ValueError):
+    pass
+
+
+# Readings for one resident, validated and stored as columns
+class ReadingBatch(ReadingColumns):
+    __slots__ = ("resident_id",)
+
+    def __init__(self, resident_id):
+        super().__init__()
+        self.resident_id = resident_id
+
+
+# A fall, activity ping or accelerometer window from a sensor
+class SensorSignal:
+    __slots__ = ("kind", "resident_id", "ts", "samples")
+
+    def __init__(self, kind, resident_id, ts, samples=None):
+        self.kind = kind
+        self.resident_id = resident_id
+        self.ts = ts
+        self.samples = samples
+
+
+def _records(body, content_type):
+    text = body.decode("utf-8")
+    if content_type == "application/json":
+        payload = json.loads(text)
+        if isinstance(payload, dict):
+            # {"resident": "...", "readings": [...]}
+            readings = payload.get("readings")
+            if isinstance(readings, list):
+                return [(record, payload.get("resident")) for record in readings]
+        elif isinstance(payload, list):
+            return [(record, None) for record in payload]
+        raise IngestError("Expected a JSON array or an object with a readings array")
+    # JSON Lines: one reading per line; a bad line is an error for that line only
+    records = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append((json.loads(line), None))
+        except json.JSONDecodeError as e:
+            records.append((e, None))
+    return records
+
+
+def _reading(record):
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON: {record}")
+    if isinstance(record, list):
+        if len(record) not in (4, 5):
+            raise ValueError("expected [heart_rate, bp_systolic, bp_diastolic, glucose, ts?]")
+        values, ts, resident_id = record[:4], record[4] if len(record) == 5 else None, None
+    elif isinstance(record, dict):
+        missing = [field for field in READING_FIELDS if field not in record]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        values, ts, resident_id = [record[field] for field in READING_FIELDS], record.get("ts"), record.get("resident")
+    else:
+        raise ValueError("expected an object or an array")
+    if any(isinstance(value, bool) for value in values):
+        raise ValueError("values must be numbers, not true or false")
+    values = [int(value) for value in values]
+    if not all(0 < value <= MAX_VALUE for value in values):
+        raise ValueError(f"all values must be between 1 and {MAX_VALUE}")
+    return values, _timestamp(ts), resident_id
+
+
+def _timestamp(ts):
+    if ts is not None:
+        if isinstance(ts, bool):
+            raise ValueError("ts must be epoch seconds")
+        ts = float(ts)
+        if not 0 <= ts < MAX_TIMESTAMP:
+            raise ValueError("ts must be epoch seconds")
+    return ts
+
+
+def _signal(record):
+    kind = record["type"]
+    if kind not in SIGNAL_TYPES:
+        raise ValueError(f"type must be reading, {', '.join(SIGNAL_TYPES)}")
+    samples = None
+    if kind == "accel":
+        samples = record.get("samples")
+        if not isinstance(samples, list) or not 0 < len(samples) <= MAX_ACCEL_SAMPLES:
+            raise ValueError(f"samples must be a list of 1 to {MAX_ACCEL_SAMPLES} values")
+        samples = [float(g) for g in samples]
+        if not all(0 <= g < MAX_ACCEL_G for g in samples):
+            raise ValueError(f"samples must be between 0 and {MAX_ACCEL_G} g")
+    return kind, _timestamp(record.get("ts")), record.get("resident"), samples
+
+
+def _parse(body, content_type, default_resident, now, signals):
+    if now is None:
+        now = time.time()
+    try:
+        records = _records(body, content_type)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise IngestError(f"Unreadable payload: {e}")
+
+    batches = {}
+    errors = []
+    rejected = 0
+    for index, (record, payload_resident) in enumerate(records):
+        try:
+            if signals is not None and isinstance(record, dict) and record.get("type", "reading") != "reading":
+                kind, ts, resident_id, samples = _signal(record)
+            else:
+                kind = "reading"
+                values, ts, resident_id = _reading(record)
+            resident_id = str(resident_id or payload_resident or default_resident)
+            if not RESIDENT_ID_PATTERN.match(resident_id):
+                raise ValueError("invalid resident id")
+        except (TypeError, ValueError, OverflowError) as e:  # OverflowError: int() of 1e400
+            rejected += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append({"index": index, "error": str(e)})
+            continue
+        if kind != "reading":
+            signals.append(SensorSignal(kind, resident_id, now if ts is None else ts, samples))
+            continue
+        batch = batches.get(resident_id)
+        if batch is None:
+            batch = batches[resident_id] = ReadingBatch(resident_id)
+        batch.append(now if ts is None else ts, *values)
+    return list(batches.values()), rejected, errors
+
+
+# Validate a whole payload. Returns the batches per resident, in the order
+# residents first appear, the number of readings rejected and up to
+# MAX_ERRORS {"index", "error"} details. Readings without a "ts" get now.
+def parse_readings(body, content_type, default_resident, now=None):
+    return _parse(body, content_type, default_resident, now, None)
+
+
+# Like parse_readings, for mixed sensor streams: records with a "type" of
+# fall, activity or accel come back as SensorSignals, in payload order, and
+# everything else is a reading. Returns (batches, signals, rejected, errors).
+def parse_events(body, content_type, default_resident, now=None):
+    signals = []
+    batches, rejected, errors = _parse(body, content_type, default_resident, now, signals)
+    return batches, signals, rejected, errors
@@ -0,0 +1,149 @@
+import re
+import unicodedata
+
+# Words are runs of letters and digits plus the Devanagari block, whose vowel
+# signs and viramas \w alone would split words on; the dandas (। ॥) end a word
+# like any other punctuation
+TOKEN_PATTERN = re.compile(r"[\w\u0900-\u0963\u0966-\u097F]+")
+VOWEL_SIGNS = range(0x093E, 0x094D)  # ा to ौ
+DEVANAGARI = range(0x0900, 0x0980)
+MIN_STEM = 2
+# Plural endings a Latin-script word may add to a phrase word
+LATIN_SUFFIXES = ("es", "s")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(unicodedata.normalize("NFC", text).casefold())
+
+
+def _is_devanagari(token):
+    return ord(token[0]) in DEVANAGARI
+
+
+# Devanagari words inflect by changing their final vowel sign (थका, थकी,
+# थके), so phrase words are indexed by their stem without it and match any
+# message word that starts with the stem (थकान, दोस्तों)
+def _stem(token):
+    if _is_devanagari(token) and len(token) > MIN_STEM and ord(token[-1]) in VOWEL_SIGNS:
+        return token[:-1]
+    return token
+
+
+def _word_matches(word, key):
+    if _is_devanagari(key):
+        return word.startswith(key)
+    return word == key or any(word == key + suffix for suffix in LATIN_SUFFIXES)
+
+
+# One chat topic: the phrases that point to it and what to reply (a string,
+# or a list to pick from). weight scales each matched phrase word.
+class Intent:
+    __slots__ = ("name", "phrases", "replies", "weight")
+
+    def __init__(self, name, phrases, replies, weight=1):
+        self.name = name
+        self.phrases = tuple(phrases)
+        self.replies = replies
+        self.weight = weight
+
+
+# Phrase index for a list of intents, built once. match() reads the message
+# word by word and looks up only the phrases that can start at each word, so
+# its cost depends on the message, not on how many phrases there are. At each
+# word the longest matching phrase wins and its words are skipped. Every
+# match adds weight x phrase words to its intent's score; the highest score
+# wins, and ties go to the intent listed first.
+class IntentMatcher:
+    def __init__(self, intents):
+        self.intents = list(intents)
+        self.index = {}  # first phrase word (stemmed) -> [(words, intent position)], longest first
+        for position, intent in enumerate(self.intents):
+            for phrase in intent.phrases:
+                words = [_stem(word) for word in tokenize(phrase)]
+                if words:
+                    self.index.setdefault(words[0], []).append((words, position))
+        for entries in self.index.values():
+            entries.sort(key=lambda entry: -len(entry[0]))
+        # Devanagari stems by character, so the stems a word starts with are
+        # found in one walk along it; "" marks the end of a stem
+        self.stems = {}
+        for key in self.index:
+            if _is_devanagari(key):
+                node = self.stems
+                for char in key:
+                    node = node.setdefault(char, {})
+                node[""] = key
+
+    # Index keys a message word can be found under, longest first
+    def _keys(self, word):
+        if ord(word[0]) in DEVANAGARI:
+            keys = []
+            node = self.stems
+            for char in word:
+                node = node.get(char)
+                if node is None:
+                    break
+                if "" in node:
+                    keys.append(node[""])
+            keys.reverse()
+            return keys
+        if word[-1] != "s" or len(word) < 3:
+            return (word,)
+        if word.endswith("es") and len(word) > 3:
+            return word, word[:-1], word[:-2]
+        return word, word[:-1]
+
+    def scores(self, text):
+        words = tokenize(text)
+        index = self.index
+        scores = {}  # intent position -> score
+        count = len(words)
+        i = 0
+        while i < count:
+            best = None
+            best_length = 0
+            for key in self._keys(words[i]):
+                entries = index.get(key)
+                if entries is None:
+                    continue
+                for phrase, position in entries:
+                    length = len(phrase)
+                    if length <= best_length:
+                        break
+                    if length == 1 or (length <= count - i and all(
+                        _word_matches(words[i + j], phrase[j]) for j in range(1, length)
+                    )):
+                        best, best_length = position, length
+                        break
+            if best is None:
+                i += 1
+                continue
+            scores[best] = scores.get(best, 0) + self.intents[best].weight * best_length
+            i += best_length
+        return scores
+
+    # The best intent for the message, or None
+    def match(self, text):
+        scores = self.scores(text)
+        if not scores:
+            return None
+        return self.intents[max(scores, key=lambda position: (scores[position], -position))]
+
+
+# Intents from a prompts.ACTIVITIES keyword table, in its order, plus any
+# extra phrases per keyword. The "default" replies are not an intent.
+def intents_from_keywords(keywords, extra_phrases=None):
+    extra_phrases = extra_phrases or {}
+    return [
+        Intent(keyword, (keyword,) + tuple(extra_phrases.get(keyword, ())), replies)
+        for keyword, replies in keywords.items()
+        if keyword != "default"
+    ]
+
+
+def build_matchers(activities, extra_phrases=None):
+    extra_phrases = extra_phrases or {}
+    return {
+        language: IntentMatcher(intents_from_keywords(activity["keywords"], extra_phrases.get(language)))
+        for language, activity in activities.items()
+    }
@@ -0,0 +1,431 @@
+import bisect
+import gzip
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict, deque
+from datetime import date
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+GZIP_SUFFIX = ".gz"
+INDEX_FILE = "index.json"
+INDEX_FORMAT = 1
+# Segments kept decoded for paging through queries
+CACHED_SEGMENTS = 2
+
+
+def _day(ts):
+    return date.fromtimestamp(ts).toordinal() if ts is not None else None
+
+
+def _number(name):
+    return int(name[len(SEGMENT_PREFIX):].split(".", 1)[0])
+
+
+def _decode(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None  # torn write from a crash
+    return record if isinstance(record, dict) else None
+
+
+# Cut a last line left without its newline by a crash, so the next entry
+# written starts on a line of its own instead of being joined to it
+def _drop_torn_tail(path, block_size=8192):
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                position += newline + 1
+                break
+        if position < end:
+            f.truncate(position)
+
+
+# What the index holds for one segment: the seq of its first entry, how many
+# it holds, their time span and a count per (day, kind, priority), so queries
+# only open segments that have what they ask for
+class _Segment:
+    __slots__ = ("name", "first_seq", "count", "first_ts", "last_ts", "days", "closed")
+
+    def __init__(self, name, first_seq, closed=False):
+        self.name = name
+        self.first_seq = first_seq
+        self.count = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.days = {}  # (day ordinal, kind, priority) -> entries
+        self.closed = closed
+
+    @property
+    def last_seq(self):
+        return self.first_seq + self.count - 1
+
+    def add(self, entry):
+        self.count += 1
+        ts = entry.get("ts")
+        if ts is not None:
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+        key = (_day(ts), entry.get("kind", "other"), entry.get("priority"))
+        self.days[key] = self.days.get(key, 0) + 1
+
+    # Whether any entry can fall in the days and match the kinds and priorities
+    def matches(self, start_day, end_day, kinds, priorities):
+        for day, kind, priority in self.days:
+            if start_day is not None and (day is None or day < start_day):
+                continue
+            if end_day is not None and (day is None or day > end_day):
+                continue
+            if (kinds and kind not in kinds) or (priorities and priority not in priorities):
+                continue
+            return True
+        return False
+
+    def to_row(self):
+        return {
+            "name": self.name, "first_seq": self.first_seq, "count": self.count,
+            "first_ts": self.first_ts, "last_ts": self.last_ts,
+            "days": [[day, kind, priority, count] for (day, kind, priority), count in self.days.items()],
+        }
+
+    @classmethod
+    def from_row(cls, row):
+        segment = cls(row["name"], row["first_seq"], closed=True)
+        segment.count = row["count"]
+        segment.first_ts = row["first_ts"]
+        segment.last_ts = row["last_ts"]
+        segment.days = {(day, kind, priority): count for day, kind, priority, count in row["days"]}
+        return segment
+
+
+# Append-only activity journal in JSON Lines segments. Every entry gets the
+# next "seq". A segment is closed once it reaches max_segment_bytes or spans
+# max_segment_seconds, and closed segments are gzipped when compress is set.
+# The summary of every closed segment is kept in memory and in index.json, so
+# opening the journal reads only the index and the open segment, and an
+# append writes one line whatever the journal's size. The latest tail_size
+# entries are also kept in memory for recent() and since().
+class ActivityJournal:
+    def __init__(self, directory, max_segment_bytes=4 * 1024 * 1024, max_segment_seconds=86400,
+                 compress=True, tail_size=100):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.compress = compress
+        self.lock = threading.RLock()
+        self.segments = []  # _Segment, oldest first; the last one is written to
+        self.tail = deque(maxlen=tail_size)
+        self.cache = OrderedDict()  # name -> entries of recently read segments
+        self._active = None
+        self._active_size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        names = {}  # segment number -> file name
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                names[_number(name)] = name
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX + GZIP_SUFFIX):
+                number = _number(name)
+                # A gzip copy is only renamed into place once complete, so the
+                # plain file it was made from is left over from a crash
+                if number in names:
+                    os.remove(self._path(names[number]))
+                names[number] = name
+        rows = self._load_index()
+        numbers = sorted(names)
+        indexed = True
+        for number in numbers:
+            name = names[number]
+            first_seq = self.segments[-1].last_seq + 1 if self.segments else 1
+            if name in rows:
+                self.segments.append(_Segment.from_row(rows[name]))
+                continue
+            # Not indexed: the open segment, or one closed by a run that
+            # stopped before writing the index
+            segment = _Segment(name, first_seq, closed=name.endswith(GZIP_SUFFIX) or number != numbers[-1])
+            if not name.endswith(GZIP_SUFFIX):
+                _drop_torn_tail(self._path(name))
+            entries = self._read_file(name)
+            if entries and "seq" in entries[0]:
+                segment.first_seq = entries[0]["seq"]
+            for entry in entries:
+                segment.add(entry)
+            self.segments.append(segment)
+            if segment.closed:
+                indexed = False
+            else:
+                self._cache(name, entries)
+        for segment in self.segments:
+            if segment.closed and segment.name.endswith(SEGMENT_SUFFIX) and self.compress:
+                self._compress(segment)
+                indexed = False
+        if not indexed:
+            self._write_index()
+        if not self.segments or self.segments[-1].closed:
+            self._new_segment()
+        else:
+            self._active_size = os.path.getsize(self._path(self.segments[-1].name))
+        self.tail.extend(self._newest(self.tail.maxlen))
+
+    def _load_index(self):
+        try:
+            with open(self._path(INDEX_FILE)) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"Rebuilding activity journal index in {self.directory}: {e}")
+            return {}
+        if data.get("format") != INDEX_FORMAT:
+            return {}
+        return {row["name"]: row for row in data["segments"]}
+
+    def _write_index(self):
+        data = {"format": INDEX_FORMAT, "segments": [segment.to_row() for segment in self.segments if segment.closed]}
+        tmp_file = self._path(INDEX_FILE) + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_file, self._path(INDEX_FILE))
+
+    def _new_segment(self):
+        number = _number(self.segments[-1].name) + 1 if self.segments else 1
+        first_seq = self.segments[-1].last_seq + 1 if self.segments else 1
+        name = f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+        self.segments.append(_Segment(name, first_seq))
+        open(self._path(name), "ab").close()
+        self._active_size = 0
+
+    def _compress(self, segment):
+        plain = self._path(segment.name)
+        tmp_file = plain + GZIP_SUFFIX + ".tmp"
+        with open(plain, "rb") as source, gzip.open(tmp_file, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(tmp_file, plain + GZIP_SUFFIX)
+        os.remove(plain)
+        if segment.name in self.cache:
+            self.cache[segment.name + GZIP_SUFFIX] = self.cache.pop(segment.name)
+        segment.name += GZIP_SUFFIX
+
+    def _rotate(self):
+        self.release()
+        segment = self.segments[-1]
+        segment.closed = True
+        if self.compress:
+            self._compress(segment)
+        self._write_index()
+        self._new_segment()
+
+    # The open segment is opened on first write and can be released again
+    # when the caller needs to bound the number of open files
+    def _handle(self):
+        if self._active is None:
+            self._active = open(self._path(self.segments[-1].name), "ab")
+        return self._active
+
+    def is_open(self):
+        return self._active is not None
+
+    def release(self):
+        with self.lock:
+            if self._active:
+                self._active.close()
+                self._active = None
+
+    def _write(self, entry):
+        segment = self.segments[-1]
+        entry = dict(entry, seq=segment.first_seq + segment.count)
+        line = json.dumps(entry).encode("utf-8") + b"\n"
+        ts = entry.get("ts")
+        if segment.count and (
+            self._active_size + len(line) > self.max_segment_bytes
+            or (ts is not None and segment.first_ts is not None and ts - segment.first_ts >= self.max_segment_seconds)
+        ):
+            self._rotate()
+            segment = self.segments[-1]
+        self._handle().write(line)
+        self._active_size += len(line)
+        segment.add(entry)
+        self.tail.append(entry)
+        cached = self.cache.get(segment.name)
+        if cached is not None:
+            cached.append(entry)
+        return entry["seq"]
+
+    # Both return the seq of the last entry written
+    def append(self, entry):
+        with self.lock:
+            seq = self._write(entry)
+            self._active.flush()
+            return seq
+
+    def extend(self, entries):
+        with self.lock:
+            seq = self.cursor()
+            for entry in entries:
+                seq = self._write(entry)
+            if self._active:
+                self._active.flush()
+            return seq
+
+    def cursor(self):
+        with self.lock:
+            return self.segments[-1].last_seq
+
+    def __len__(self):
+        with self.lock:
+            return sum(segment.count for segment in self.segments)
+
+    def _read_file(self, name):
+        opener = gzip.open if name.endswith(GZIP_SUFFIX) else open
+        try:
+            with opener(self._path(name), "rb") as f:
+                return [entry for entry in map(_decode, f) if entry is not None]
+        except FileNotFoundError:
+            return []
+
+    # A segment's entries, oldest first. The open segment's cached copy is
+    # kept up to date by _write, so callers get a snapshot of it.
+    def _read(self, segment):
+        with self.lock:
+            name = segment.name
+            entries = self.cache.get(name)
+            if entries is not None:
+                self.cache.move_to_end(name)
+                return entries if segment.closed else list(entries)
+            if not segment.closed:
+                if self._active:
+                    self._active.flush()
+                entries = self._cache(name, self._read_file(name))
+                return list(entries)
+        # Closed segments never change, so they are read without the lock
+        entries = self._read_file(name)
+        with self.lock:
+            return self._cache(name, entries)
+
+    def _cache(self, name, entries):
+        self.cache[name] = entries
+        while len(self.cache) > CACHED_SEGMENTS:
+            self.cache.popitem(last=False)
+        return entries
+
+    # Entries newest first, from the segments the filter lets through, each
+    # before the seq `before` when given
+    def _scan(self, wanted=lambda segment: True, before=None):
+        with self.lock:
+            segments = list(self.segments)
+        for segment in reversed(segments):
+            if segment.count and wanted(segment):
+                entries = self._read(segment)
+                end = len(entries)
+                if before is not None and before <= segment.last_seq:
+                    end = bisect.bisect_left(entries, before, key=lambda entry: entry["seq"])
+                for i in range(end - 1, -1, -1):
+                    yield entries[i]
+
+    def _newest(self, n):
+        entries = []
+        if n > 0:
+            for entry in self._scan():
+                entries.append(entry)
+                if len(entries) >= n:
+                    break
+        entries.reverse()
+        return entries
+
+    # The latest n entries, oldest first
+    def recent(self, n=5):
+        with self.lock:
+            if n <= len(self.tail) or len(self.tail) == len(self):
+                return list(self.tail)[-n:] if n > 0 else []
+        return self._newest(n)
+
+    # Up to limit of the oldest entries after cursor, and the cursor to resume
+    # from: the last one returned, so paging on from it misses nothing
+    def since(self, cursor, limit=100):
+        with self.lock:
+            seq = self.cursor()
+            if cursor > seq:
+                cursor = 0  # cursor from before the journal was reset
+            if not self.tail or self.tail[0]["seq"] <= cursor + 1:
+                entries = [entry for entry in self.tail if entry["seq"] > cursor][:limit]
+                return entries, entries[-1]["seq"] if entries else seq
+            segments = [segment for segment in self.segments if segment.count and segment.last_seq > cursor]
+        entries = []
+        for segment in segments:
+            for entry in self._read(segment):
+                if entry["seq"] > cursor:
+                    entries.append(entry)
+                    if len(entries) >= limit:
+                        return entries, entry["seq"]
+        return entries, entries[-1]["seq"] if entries else seq
+
+    # One page of entries between start and end (epoch seconds, end
+    # excluded) of the given kinds and priorities, newest first, each before
+    # the seq `before` when given. Returns the page and the `before` for the
+    # next one, or None when there is no more.
+    def query(self, start=None, end=None, kinds=None, priorities=None, before=None, limit=100):
+        start_day, end_day = _day(start), _day(end)
+
+        def wanted(segment):
+            if before is not None and segment.first_seq >= before:
+                return False
+            if start is not None and (segment.last_ts is None or segment.last_ts < start):
+                return False
+            if end is not None and (segment.first_ts is None or segment.first_ts >= end):
+                return False
+            return segment.matches(start_day, end_day, kinds, priorities)
+
+        page = []
+        for entry in self._scan(wanted, before):
+            ts = entry.get("ts")
+            if start is not None and (ts is None or ts < start):
+                continue
+            if end is not None and (ts is None or ts >= end):
+                continue
+            if kinds and entry.get("kind", "other") not in kinds:
+                continue
+            if priorities and entry.get("priority") not in priorities:
+                continue
+            page.append(entry)
+            if len(page) >= limit:
+                return page, entry["seq"]
+        return page, None
+
+    # How many entries of kind were logged on day (a date), from the index alone
+    def count(self, day, kind):
+        day = day.toordinal()
+        with self.lock:
+            return sum(
+                count for segment in self.segments
+                for (entry_day, entry_kind, _), count in segment.days.items()
+                if entry_day == day and entry_kind == kind
+            )
+
+    def __iter__(self):
+        with self.lock:
+            segments = list(self.segments)
+        for segment in segments:
+            yield from self._read(segment)
+
+    def close(self):
+        self.release()
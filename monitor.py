@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+
+from scheduler import Scheduler
+
+
+class SimulatedClock:
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class _Signal:
+    __slots__ = ("kind", "resident_id", "data", "queued_at")
+
+    def __init__(self, kind, resident_id, data, queued_at):
+        self.kind = kind
+        self.resident_id = resident_id
+        self.data = data
+        self.queued_at = queued_at
+
+
+# Event-driven monitoring. Readings, falls and activity pings are pushed onto a
+# queue and handed to handlers[kind](resident_id, data) as they arrive; timers
+# (such as the inactivity deadline) fire at their due time. The worker thread
+# sleeps until there is a signal or the next timer is due, so nothing runs
+# while nothing happens. With a SimulatedClock, call process() to drive it.
+class MonitoringEngine:
+    def __init__(self, handlers, clock=time.time, latency_samples=1000):
+        self.handlers = handlers
+        self.clock = clock
+        self.cond = threading.Condition()
+        self.signals = deque()
+        self.timers = Scheduler(clock)  # run from this engine's thread, never started on its own
+        self.stopped = False
+        self.woken = False  # something changed since the worker last looked
+        self.thread = None
+        self.processed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=latency_samples)  # seconds from push (or due time) to handling
+
+    def push(self, kind, resident_id, data=None):
+        with self.cond:
+            self.signals.append(_Signal(kind, resident_id, data, self.clock()))
+            self.woken = True
+            self.cond.notify()
+
+    def set_timer(self, key, due, callback):
+        self.timers.schedule(key, due, lambda: self._run(callback, due))
+        with self.cond:
+            self.woken = True
+            self.cond.notify()
+
+    def cancel_timer(self, key):
+        self.timers.cancel(key)
+
+    def _run(self, call, started_at):
+        try:
+            call()
+        except Exception as e:
+            self.failed += 1
+            print(f"Monitoring handler failed: {e}")
+        self.latencies.append(self.clock() - started_at)
+
+    # Handle every queued signal and every timer that is due; returns the
+    # seconds until the next timer, or None when none is armed
+    def process(self):
+        while True:
+            with self.cond:
+                signal = self.signals.popleft() if self.signals else None
+            if signal is None:
+                break
+            handler = self.handlers.get(signal.kind)
+            if handler is not None:
+                self._run(lambda: handler(signal.resident_id, signal.data), signal.queued_at)
+            self.processed += 1
+
+        return self.timers.run_pending()
+
+    # Run the worker in the calling thread until stop()
+    def run(self):
+        while True:
+            wait = self.process()
+            with self.cond:
+                if self.stopped:
+                    return
+                if not self.woken:
+                    self.cond.wait(wait)
+                self.woken = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.woken = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "processed": self.processed,
+            "timers_fired": self.timers.fired,
+            "failed": self.failed,
+            "queued": len(self.signals),
+            "timers": len(self.timers),
+            "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+            "latency_max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+        }
@@ -0,0 +1,159 @@
+# Pre-render every static voice prompt into a versioned audio bundle.
+#
+#   python prerender.py [--bundle audio_bundle] [--engine gtts|stub] [--workers 8]
+#
+# Only prompts whose content hash is missing from the current manifest are
+# synthesized; files for prompts that no longer exist are removed.
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from audio import AUDIO_SUFFIX, BUNDLE_FORMAT, BUNDLE_MANIFEST, SYNTHESIZERS, AudioCache
+from prompts import (
+    ACTIVITIES, CATEGORY_MESSAGES, DEFAULT_CATEGORY_MESSAGE, DEFAULT_SCHEDULE, HEALTH_SUGGESTIONS,
+    CAREGIVER_CONFIRMATION, FALL_NOTICE, HEALTH_NORMAL, KNOWN_ALERTS, REMINDER_CONFIRMATION,
+    SCHEDULE_ADJUSTED, SCHEDULE_RESTORED, SUPPORTED_LANGUAGES, VOICE_FALLBACKS, format_alert,
+)
+
+
+def _chat_texts(activity):
+    texts = list(activity["welcome"].values()) + list(activity["questions"])
+    for replies in activity["keywords"].values():
+        texts.extend(replies if isinstance(replies, list) else [replies])
+    return texts
+
+
+# Every (text, language) pair the agents can speak from static text
+def collect_prompts():
+    prompts = set()
+    for language, activity in ACTIVITIES.items():
+        prompts.update((text, language) for text in _chat_texts(activity))
+
+    # These are spoken in the listener's language, whatever it is
+    shared = list(HEALTH_SUGGESTIONS.values())
+    shared += [SCHEDULE_ADJUSTED, SCHEDULE_RESTORED, HEALTH_NORMAL, FALL_NOTICE]
+    shared += list(VOICE_FALLBACKS.values())
+    for message, emergency, priority in KNOWN_ALERTS:
+        shared.append(format_alert(message, emergency, priority))
+    shared.append(CAREGIVER_CONFIRMATION.format(message=f"Health risk detected: {KNOWN_ALERTS[0][0]}"))
+    for category_message in list(CATEGORY_MESSAGES.values()) + [DEFAULT_CATEGORY_MESSAGE]:
+        shared.append(category_message)
+    for language in SUPPORTED_LANGUAGES:
+        prompts.update((text, language) for text in shared)
+
+    # Reminder prompts are spoken in the task's own language
+    for task in DEFAULT_SCHEDULE:
+        category_message = CATEGORY_MESSAGES.get(task["category"], DEFAULT_CATEGORY_MESSAGE)
+        prompts.add((f"{category_message}: {task['task']}", task["language"]))
+        prompts.add((REMINDER_CONFIRMATION, task["language"]))
+    return prompts
+
+
+def load_manifest(bundle_dir):
+    path = os.path.join(bundle_dir, BUNDLE_MANIFEST)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"format": BUNDLE_FORMAT, "version": None, "entries": {}}
+    if manifest.get("format") != BUNDLE_FORMAT:
+        return {"format": BUNDLE_FORMAT, "version": None, "entries": {}}
+    return manifest
+
+
+def _write_manifest(bundle_dir, manifest):
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp", suffix=".json", dir=bundle_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(bundle_dir, BUNDLE_MANIFEST))
+
+
+def _render(bundle_dir, synthesize, text, language, key):
+    file = key + AUDIO_SUFFIX
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp", suffix=AUDIO_SUFFIX, dir=bundle_dir)
+    os.close(fd)
+    try:
+        synthesize(text, language, tmp_path)
+        os.replace(tmp_path, os.path.join(bundle_dir, file))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return file
+
+
+def build_bundle(bundle_dir, synthesize, workers=8, prompts=None):
+    os.makedirs(bundle_dir, exist_ok=True)
+    prompts = collect_prompts() if prompts is None else prompts
+    manifest = load_manifest(bundle_dir)
+    old_entries = manifest["entries"]
+
+    wanted = {AudioCache.key(text, language): (text, language) for text, language in prompts}
+    entries = {}
+    pending = {}
+    for key, (text, language) in wanted.items():
+        entry = old_entries.get(key)
+        if entry and os.path.exists(os.path.join(bundle_dir, entry["file"])):
+            entries[key] = entry
+        else:
+            pending[key] = (text, language)
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_render, bundle_dir, synthesize, text, language, key): key
+            for key, (text, language) in pending.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            text, language = pending[key]
+            try:
+                file = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Failed to render '{text}' in {language}: {e}")
+                continue
+            entries[key] = {"text": text, "language": language, "file": file}
+
+    removed = 0
+    for key, entry in old_entries.items():
+        if key not in wanted:
+            path = os.path.join(bundle_dir, entry["file"])
+            if os.path.exists(path):
+                os.remove(path)
+            removed += 1
+
+    version = hashlib.sha256("".join(sorted(entries)).encode("utf-8")).hexdigest()[:16]
+    manifest = {"format": BUNDLE_FORMAT, "version": version, "built": time.ctime(), "entries": entries}
+    _write_manifest(bundle_dir, manifest)
+    return {
+        "version": version,
+        "prompts": len(wanted),
+        "rendered": len(pending) - failed,
+        "reused": len(wanted) - len(pending),
+        "removed": removed,
+        "failed": failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render static voice prompts into an audio bundle")
+    parser.add_argument("--bundle", default="audio_bundle")
+    parser.add_argument("--engine", choices=sorted(SYNTHESIZERS), default="gtts")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = build_bundle(args.bundle, SYNTHESIZERS[args.engine], workers=args.workers)
+    print(
+        f"Bundle {result['version']}: {result['prompts']} prompts, {result['rendered']} rendered, "
+        f"{result['reused']} reused, {result['removed']} removed, {result['failed']} failed "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
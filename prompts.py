@@ -0,0 +1,169 @@
+# Fixed text spoken or shown by the agents. Keeping it here lets the audio
+# pre-renderer walk every static prompt without starting the app.
+
+SUPPORTED_LANGUAGES = ("en", "hi")
+
+ACTIVITIES = {
+    "en": {
+        "welcome": {
+            "male": "Welcome, Grandpa!",
+            "female": "Welcome, Grandma!"
+        },
+        "questions": [
+            "That’s a wonderful memory! Do you have any other special moments?",
+            "I enjoy hearing about your day. What else is on your mind?",
+            "What a lovely story! Have you had any fun adventures lately?",
+            "That sounds exciting! Tell me more about your friends.",
+            "I’m all ears! What’s something new happening in your life?"
+        ],
+        "labels": {
+            "heart_rate": "Heart Rate (bpm)",
+            "blood_pressure": "Blood Pressure (Systolic/Diastolic)",
+            "glucose": "Glucose (mg/dL)",
+            "submit_health": "Submit Health Data",
+            "reminder_time": "Reminder Time (YYYY-MM-DD HH:MM)",
+            "reminder_message": "Reminder Message",
+            "reminder_category": "Category",
+            "set_reminder": "Set Reminder",
+            "chat": "Let's Chat!",
+            "type_message": "Type your message...",
+            "send": "Send",
+            "start_chat": "Start Chat",
+            "recent_health": "Your Recent Health"
+        },
+        "keywords": {
+            "happy": "I’m glad you’re feeling happy! What made your day special?",
+            "good": "That’s great to hear! Any plans for today?",
+            "family": "Family is so important. Who’s your favorite person to spend time with?",
+            "tired": "I’m sorry you’re tired. Would you like a tip to relax?",
+            "birthday": "What a surprise! Did you celebrate with cake?",
+            "friends": "Your friends sound amazing! What do you love most about them?",
+            "summer": "Summer sounds wonderful! What’s your favorite summer activity?",
+            "enjoying": "I’m happy you’re enjoying yourself! What else are you doing?",
+            "fun": "That sounds fun! What other activities do you enjoy?",
+            "great": "Great to know! What’s making your day great?",
+            "default": [
+                "That’s interesting! Tell me more about what you enjoy related to that.",
+                "I’d love to hear more about that topic. What else can you share?",
+                "That sounds lovely! Can you tell me more about your experience?"
+            ]
+        }
+    },
+    "hi": {
+        "welcome": {
+            "male": "नमस्ते बाबाजी!",
+            "female": "नमस्ते अम्माजी!"
+        },
+        "questions": [
+            "यह एक अद्भुत याद है! क्या आपके पास कोई अन्य विशेष पल हैं?",
+            "मुझे आपके दिन के बारे में सुनना अच्छा लगता है। और क्या आपके दिमाग में है?",
+            "क्या शानदार कहानी! हाल ही में कोई मज़ेदार साहसिक कार्य हुआ?",
+            "यह रोमांचक लगता है! अपने दोस्तों के बारे में और बताएं।",
+            "मैं सुनने के लिए तैयार हूँ! आपके जीवन में क्या नया हो रहा है?"
+        ],
+        "labels": {
+            "heart_rate": "हृदय गति (बीपीएम)",
+            "blood_pressure": "रक्तचाप (सिस्टोलिक/डायस्टोलिक)",
+            "glucose": "ग्लूकोज (मिलीग्राम/डीएल)",
+            "submit_health": "स्वास्थ्य डेटा सबमिट करें",
+            "reminder_time": "रिमाइंडर समय (YYYY-MM-DD HH:MM)",
+            "reminder_message": "रिमाइंडर संदेश",
+            "reminder_category": "श्रेणी",
+            "set_reminder": "रिमाइंडर सेट करें",
+            "chat": "चैट शुरू करें!",
+            "type_message": "अपना संदेश टाइप करें...",
+            "send": "भेजें",
+            "start_chat": "चैट शुरू करें",
+            "recent_health": "आपका हालिया स्वास्थ्य"
+        },
+        "keywords": {
+            "खुश": "मुझे खुशी है कि आप खुश हैं! आपके दिन को खास क्या बनाया?",
+            "अच्छा": "यह सुनकर अच्छा लगा! आज आपके कोई प्लान हैं?",
+            "परिवार": "परिवार बहुत महत्वपूर्ण है। आपका पसंदीदा व्यक्ति कौन है?",
+            "थका": "मुझे दुख है कि आप थके हैं। क्या आपको आराम की सलाह चाहिए?",
+            "जन्मदिन": "क्या आश्चर्यजनक पल! क्या आपने केक के साथ जश्न मनाया?",
+            "दोस्त": "आपके दोस्त शानदार लगते हैं! आप उन्हें सबसे ज्यादा क्या पसंद करते हैं?",
+            "गर्मी": "गर्मी अद्भुत लगती है! आपका पसंदीदा गर्मी का काम क्या है?",
+            "आनंद": "मुझे खुशी है कि आप आनंद ले रहे हैं! और क्या कर रहे हैं?",
+            "मज़ा": "यह मज़ेदार लगता है! आप और कौन सी गतिविधियाँ पसंद करते हैं?",
+            "शानदार": "शानदार जानकर अच्छा लगा! आपका दिन शानदार क्यों है?",
+            "default": [
+                "यह रोचक है! उससे संबंधित और बताएं।",
+                "मुझे उस विषय पर और सुनना अच्छा लगेगा। और क्या बता सकते हैं?",
+                "यह प्यारा लगता है! अपने अनुभव के बारे में और बताएं।"
+            ]
+        }
+    }
+}
+
+# More phrases for the chat keywords above, matched by intents.IntentMatcher.
+# Plurals and Hindi inflections (थका/थकी/थके) are matched already.
+KEYWORD_PHRASES = {
+    "en": {
+        "happy": ("glad", "cheerful"),
+        "tired": ("exhausted", "sleepy", "worn out"),
+        "family": ("grandchildren", "grandkids", "daughter", "son"),
+        "friends": ("friend", "neighbour", "neighbor"),
+        "fun": ("had a blast",),
+        "enjoying": ("enjoyed", "enjoy"),
+    },
+    "hi": {
+        "खुश": ("प्रसन्न",),
+        "परिवार": ("पोते", "बेटी", "बेटा"),
+        "थका": ("नींद",),
+    },
+}
+
+HEALTH_SUGGESTIONS = {
+    "high_heart_rate": "Your heart rate is high. Please try to rest and breathe deeply.",
+    "high_bp": "Your blood pressure is high. Please sit down and avoid stress.",
+    "low_bp": "Your blood pressure is low. Please have some water or a snack.",
+    "high_glucose": "Your glucose is high. Avoid sweets and consult your doctor.",
+    "low_glucose": "Your glucose is low. Please eat a small piece of fruit."
+}
+
+CATEGORY_MESSAGES = {
+    "medicine": "Time to take your medicine",
+    "doctor": "Time to visit the doctor",
+    "other": "Time for your activity"
+}
+DEFAULT_CATEGORY_MESSAGE = "Time for your task"
+
+DEFAULT_SCHEDULE = [
+    {"task": "Take your morning medication", "language": "en", "critical": True, "time": None, "category": "medicine", "triggered": False},
+    {"task": "सुबह की दवा लें", "language": "hi", "critical": True, "time": None, "category": "medicine", "triggered": False},
+    {"task": "Go for a short walk", "language": "en", "critical": False, "time": None, "category": "other", "triggered": False},
+    {"task": "डॉक्टर के पास जाएं", "language": "hi", "critical": True, "time": None, "category": "doctor", "triggered": False}
+]
+
+SCHEDULE_ADJUSTED = "Adjusting your schedule due to health or behavior. Please rest."
+SCHEDULE_RESTORED = "Your health has improved. Schedule restored."
+REMINDER_CONFIRMATION = "Have you completed this? (Simulated: Yes)"
+HEALTH_NORMAL = "Your health is normal. You’re doing great!"
+FALL_NOTICE = "A fall has been detected. Help is on the way."
+CAREGIVER_CONFIRMATION = "Caregiver, {message} Did you help them rest? (Simulated: Yes)"
+
+# Played from the pre-rendered bundle when a prompt cannot be synthesized in time
+VOICE_FALLBACKS = {
+    "Critical": "Attention please. An urgent alert needs your attention. Please check the care dashboard.",
+    "High": "Attention please. An alert needs your attention. Please check the care dashboard.",
+    "Medium": "You have a new message. Please check the care dashboard.",
+    "Low": "You have a new message. Please check the care dashboard.",
+}
+
+ALERT_TEMPLATE = "Alert (Priority: {priority}): {message}"
+EMERGENCY_SUFFIX = " Notifying local contact: Neighbor John to check on user. Estimated arrival: 5 minutes."
+
+# (message, emergency, priority) for every alert the monitoring loop raises
+KNOWN_ALERTS = [
+    ("At Risk", True, "High"),
+    ("Fall detected!", True, "Critical"),
+    ("Inactivity detected: No movement for 30 minutes.", False, "Medium"),
+]
+
+
+def format_alert(message, emergency=False, priority="Medium"):
+    alert_message = ALERT_TEMPLATE.format(priority=priority, message=message)
+    if emergency:
+        alert_message += EMERGENCY_SUFFIX
+    return alert_message
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+from datetime import date
+
+
+def _entry_date(entry):
+    return date.fromtimestamp(entry.ts) if entry.ts is not None else None
+
+
+def _latest_cursor(window):
+    for cursor, _ in reversed(window.records):
+        if cursor is not None:
+            return cursor
+    return window.base_cursor
+
+
+class _Window:
+    __slots__ = ("records", "base_cursor")
+
+    def __init__(self, size):
+        self.records = deque(maxlen=size)  # (cursor, entry); cursor is None for preloaded records
+        self.base_cursor = None  # every record written after this cursor is in the window
+
+
+# Fixed-size, thread-safe window of each resident's latest health readings and
+# activity, filled from storage the first time a resident is read or written
+# and updated on every write, plus a running count of today's alerts that
+# resets at midnight. Records are HealthReadings and ActivityEvents;
+# loader(kind, resident_id) returns (records, cursor), and
+# count_alerts(resident_id, day) seeds the count from storage, since the
+# window only holds the latest records. When other processes
+# write to the same storage, current(kind, resident_id) returns its cursor:
+# writes then drop the window, and a window behind storage is reloaded.
+class RecentCache:
+    def __init__(self, size=100, clock=time.time, loader=None, current=None, count_alerts=None):
+        self.size = size
+        self.clock = clock
+        self.loader = loader
+        self.current = current
+        self.count_alerts = count_alerts
+        self.lock = threading.Lock()
+        self.windows = {}  # (kind, resident_id) -> _Window
+        self.alerts = {}  # resident_id -> alerts logged today
+        self.day = self._today()
+
+    def _today(self):
+        return date.fromtimestamp(self.clock())
+
+    def _window(self, kind, resident_id):
+        window = self.windows.get((kind, resident_id))
+        if window is not None and self.current is not None and _latest_cursor(window) != self.current(kind, resident_id):
+            window = None  # another process wrote since
+        if window is None:
+            window = self.windows[(kind, resident_id)] = _Window(self.size)
+            if self.loader is not None:
+                records, cursor = self.loader(kind, resident_id)
+                self._fill(window, kind, records, cursor, resident_id)
+        return window
+
+    def _fill(self, window, kind, records, cursor, resident_id):
+        window.records.clear()
+        window.records.extend((None, entry) for entry in records[-self.size:])
+        window.base_cursor = cursor
+        if kind == "activity":
+            self._roll_over()
+            if self.count_alerts is not None:
+                self.alerts[resident_id] = self.count_alerts(resident_id, self.day)
+            else:
+                self.alerts[resident_id] = sum(
+                    1 for entry in records if entry.kind == "alert" and _entry_date(entry) == self.day
+                )
+
+    def _roll_over(self):
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self.alerts.clear()
+
+    def load(self, kind, records, cursor, resident_id="default"):
+        with self.lock:
+            window = self.windows.get((kind, resident_id))
+            if window is None:
+                window = self.windows[(kind, resident_id)] = _Window(self.size)
+            self._fill(window, kind, records, cursor, resident_id)
+
+    # Called after the entry is in storage
+    def add(self, kind, entry, cursor, resident_id="default"):
+        self.extend(kind, [entry], cursor, resident_id)
+
+    # Entries written together, with consecutive cursors from first_cursor
+    def extend(self, kind, entries, first_cursor, resident_id="default"):
+        with self.lock:
+            if self.current is not None:
+                # Other processes may have written in between; the next read reloads
+                self.windows.pop((kind, resident_id), None)
+                return
+            if (kind, resident_id) not in self.windows and self.loader is not None:
+                self._window(kind, resident_id)  # the load already includes these entries
+                return
+            window = self._window(kind, resident_id)
+            window.records.extend((first_cursor + offset, entry) for offset, entry in enumerate(entries))
+            if kind == "activity":
+                alerts = sum(1 for entry in entries if entry.kind == "alert")
+                if alerts:
+                    self._roll_over()
+                    self.alerts[resident_id] = self.alerts.get(resident_id, 0) + alerts
+
+    def recent(self, kind, n=5, resident_id="default"):
+        with self.lock:
+            records = self._window(kind, resident_id).records
+            return [entry for _, entry in list(records)[-n:]] if n > 0 else []
+
+    def latest(self, kind, resident_id="default"):
+        with self.lock:
+            records = self._window(kind, resident_id).records
+            return records[-1][1] if records else None
+
+    def cursor(self, kind, resident_id="default"):
+        with self.lock:
+            return _latest_cursor(self._window(kind, resident_id))
+
+    # Up to limit of the oldest records written after cursor and the cursor of
+    # the last one, or None when the window no longer reaches back that far
+    def since(self, kind, cursor, limit=100, resident_id="default"):
+        with self.lock:
+            window = self._window(kind, resident_id)
+            if window.base_cursor is None or cursor < window.base_cursor:
+                return None
+            newer = [(c, entry) for c, entry in window.records if c is not None and c > cursor]
+            if len(newer) == len(window.records) and len(newer) == self.size:
+                return None  # the window may have dropped some of them
+            if len(newer) > limit:
+                newer = newer[:limit]
+                return [entry for _, entry in newer], newer[-1][0]
+            return [entry for _, entry in newer], _latest_cursor(window)
+
+    def alerts_today(self, resident_id="default"):
+        with self.lock:
+            self._window("activity", resident_id)  # loads the count, or reloads it if another process wrote
+            self._roll_over()
+            return self.alerts.get(resident_id, 0)
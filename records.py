@@ -0,0 +1,154 @@
+import re
+import time
+from array import array
+
+# Records written before epoch timestamps carry "timestamp": time.ctime()
+CTIME_FORMAT = "%a %b %d %H:%M:%S %Y"
+# What an activity entry is about; the activity journal is indexed by these
+ACTIVITY_KINDS = ("alert", "reminder", "chat", "caregiver", "voice", "other")
+# Alerts logged before entries had a kind are recognised by their text
+ALERT_PATTERN = re.compile(r"^Alert \(Priority: (\w+)\)")
+
+
+def parse_ctime(text):
+    try:
+        return time.mktime(time.strptime(text, CTIME_FORMAT))
+    except (TypeError, ValueError):
+        return None
+
+
+def format_time(ts):
+    return time.ctime(ts) if ts is not None else "N/A"
+
+
+# One health log record. Stored as {"ts", "heart_rate", "systolic",
+# "diastolic", "glucose"}, plus "event" and "source" when set. Older records
+# ("timestamp" from time.ctime(), "blood_pressure" as "120/80") still decode.
+# A fall logged before any reading has None for the measurements.
+class HealthReading:
+    __slots__ = ("ts", "heart_rate", "systolic", "diastolic", "glucose", "event", "source")
+
+    def __init__(self, ts, heart_rate, systolic, diastolic, glucose, event=None, source=None):
+        self.ts = ts
+        self.heart_rate = heart_rate
+        self.systolic = systolic
+        self.diastolic = diastolic
+        self.glucose = glucose
+        self.event = event
+        self.source = source
+
+    @property
+    def blood_pressure(self):
+        if self.systolic is None or self.diastolic is None:
+            return None
+        return f"{self.systolic}/{self.diastolic}"
+
+    def is_complete(self):
+        return None not in (self.heart_rate, self.systolic, self.diastolic, self.glucose)
+
+    def to_dict(self):
+        entry = {
+            "ts": self.ts,
+            "heart_rate": self.heart_rate,
+            "systolic": self.systolic,
+            "diastolic": self.diastolic,
+            "glucose": self.glucose,
+        }
+        if self.event is not None:
+            entry["event"] = self.event
+        if self.source is not None:
+            entry["source"] = self.source
+        return entry
+
+    @classmethod
+    def from_dict(cls, entry):
+        if "systolic" in entry:
+            return cls(
+                entry["ts"], entry.get("heart_rate"), entry["systolic"], entry.get("diastolic"),
+                entry.get("glucose"), entry.get("event"), entry.get("source"),
+            )
+        systolic = diastolic = None
+        try:
+            bp_systolic, bp_diastolic = str(entry.get("blood_pressure", "")).split("/")
+            systolic, diastolic = int(bp_systolic), int(bp_diastolic)
+        except ValueError:
+            pass
+        ts = entry.get("ts")
+        if ts is None:
+            ts = parse_ctime(entry.get("timestamp"))
+        return cls(
+            ts, entry.get("heart_rate"), systolic, diastolic, entry.get("glucose"), entry.get("event"), entry.get("source")
+        )
+
+
+# One activity log record, stored as {"ts", "activity", "kind"}, plus
+# "priority" for alerts. Older records without a kind are "other", or
+# "alert" when their text is an alert.
+class ActivityEvent:
+    __slots__ = ("ts", "activity", "kind", "priority")
+
+    def __init__(self, ts, activity, kind="other", priority=None):
+        self.ts = ts
+        self.activity = activity
+        self.kind = kind
+        self.priority = priority
+
+    def to_dict(self):
+        entry = {"ts": self.ts, "activity": self.activity, "kind": self.kind}
+        if self.priority is not None:
+            entry["priority"] = self.priority
+        return entry
+
+    @classmethod
+    def from_dict(cls, entry):
+        ts = entry.get("ts")
+        if ts is None:
+            ts = parse_ctime(entry.get("timestamp"))
+        activity = entry.get("activity", "")
+        kind = entry.get("kind")
+        priority = entry.get("priority")
+        if kind is None:
+            match = ALERT_PATTERN.match(activity)
+            kind, priority = ("alert", match.group(1)) if match else ("other", None)
+        return cls(ts, activity, kind, priority)
+
+
+# Complete readings as typed arrays, for bulk paths: 24 bytes per reading
+# instead of a record object and its boxed values
+class ReadingColumns:
+    __slots__ = ("ts", "heart_rate", "systolic", "diastolic", "glucose")
+
+    def __init__(self):
+        self.ts = array("d")
+        self.heart_rate = array("i")
+        self.systolic = array("i")
+        self.diastolic = array("i")
+        self.glucose = array("i")
+
+    def __len__(self):
+        return len(self.ts)
+
+    def append(self, ts, heart_rate, systolic, diastolic, glucose):
+        self.ts.append(ts)
+        self.heart_rate.append(heart_rate)
+        self.systolic.append(systolic)
+        self.diastolic.append(diastolic)
+        self.glucose.append(glucose)
+
+    # Incomplete readings (falls logged before any measurement) are skipped
+    def extend(self, readings):
+        for reading in readings:
+            if reading.is_complete():
+                self.append(reading.ts, reading.heart_rate, reading.systolic, reading.diastolic, reading.glucose)
+
+    def reading(self, i, source=None):
+        return HealthReading(
+            self.ts[i], self.heart_rate[i], self.systolic[i], self.diastolic[i], self.glucose[i], None, source
+        )
+
+    def readings(self, source=None):
+        return [
+            HealthReading(ts, heart_rate, systolic, diastolic, glucose, None, source)
+            for ts, heart_rate, systolic, diastolic, glucose
+            in zip(self.ts, self.heart_rate, self.systolic, self.diastolic, self.glucose)
+        ]
@@ -0,0 +1,167 @@
+import json
+import os
+from datetime import datetime
+
+# Reminder times are datetimes; on disk they are tagged ISO strings so they
+# come back as datetimes instead of failing json.dump or loading as text
+DATETIME_TAG = "$dt"
+# Saves appended to the write-ahead log before it is folded into the snapshot
+COMPACT_AFTER = 256
+
+
+def encode(value):
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    return value
+
+
+def decode(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and DATETIME_TAG in value:
+            stamp = value[DATETIME_TAG]
+            # Epoch seconds are accepted too, for records written by other tools
+            return datetime.fromtimestamp(stamp) if isinstance(stamp, (int, float)) else datetime.fromisoformat(stamp)
+        return {key: decode(item) if isinstance(item, (dict, list)) else item for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode(item) if isinstance(item, (dict, list)) else item for item in value]
+    return value
+
+
+def dumps(value):
+    return json.dumps(encode(value))
+
+
+def loads(text):
+    return decode(json.loads(text))
+
+
+def _apply(items, ops):
+    for op in ops:
+        if "truncate" in op:
+            del items[op["truncate"]:]
+        elif op["set"] < len(items):
+            items[op["set"]] = op["item"]
+        else:
+            items.append(op["item"])
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # directories cannot be opened on every platform
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# One reminder list on disk: a JSON snapshot (the original file, so older
+# copies still read it) plus a write-ahead log next to it. Each save appends
+# one fsynced line holding only the entries that changed, as "set index" and
+# "truncate to length" operations; a torn last line is dropped on replay.
+# Every COMPACT_AFTER saves, and after replaying a log on load, the list is
+# written to a temporary file, fsynced and renamed over the snapshot before the
+# log is emptied. The operations are absolute, so replaying a log that a crash
+# left behind after the rename gives the same list again.
+class ReminderLog:
+    def __init__(self, file, compact_after=COMPACT_AFTER):
+        self.file = file
+        self.wal_file = file + ".wal"
+        self.compact_after = compact_after
+        self.items = None  # encoded list as last loaded or saved
+        self.seen = None  # version() at that point
+        self.pending = 0  # saves in the log since the last compaction
+
+    def _read_snapshot(self):
+        try:
+            with open(self.file, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return None
+        return data if isinstance(data, list) else None
+
+    def _read_wal(self):
+        saves = []
+        try:
+            with open(self.wal_file, "r") as f:
+                for line in f:
+                    try:
+                        saves.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # torn write from a crash: nothing after it was acknowledged
+        except FileNotFoundError:
+            pass
+        return saves
+
+    def load(self):
+        items = self._read_snapshot()
+        saves = self._read_wal()
+        if items is None and not saves:
+            self.items = None
+            self.seen = self.version()
+            return None
+        items = items or []
+        for ops in saves:
+            _apply(items, ops)
+        self.items = items
+        self.pending = len(saves)
+        if saves:
+            self.compact()
+        self.seen = self.version()
+        return decode(items)
+
+    def save(self, items):
+        encoded = encode(items)
+        if self.items is None or self.version() != self.seen:
+            self.load()  # changed by another process: diff against what is on disk
+        current = self.items
+        if current is None:
+            self.items = encoded
+            self.compact()
+            self.seen = self.version()
+            return
+        ops = [
+            {"set": i, "item": item} for i, item in enumerate(encoded)
+            if i >= len(current) or current[i] != item
+        ]
+        if len(encoded) < len(current):
+            ops.append({"truncate": len(encoded)})
+        if not ops:
+            return
+        with open(self.wal_file, "a") as f:
+            f.write(json.dumps(ops) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.items = encoded
+        self.pending += 1
+        if self.pending >= self.compact_after:
+            self.compact()
+        self.seen = self.version()
+
+    def compact(self):
+        tmp_file = self.file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.items or [], f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.file)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.file)))
+        with open(self.wal_file, "w") as f:
+            os.fsync(f.fileno())
+        self.pending = 0
+
+    # Changes whenever the snapshot or the log is written, by this process or another
+    def version(self):
+        version = []
+        for file in (self.file, self.wal_file):
+            try:
+                stat = os.stat(file)
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
@@ -0,0 +1,127 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batches fall back to plain Python
+    np = None
+
+from records import ReadingColumns
+
+# Risk codes are bit sets, one bit per check, in the order suggestions are given
+HIGH_HEART_RATE = 1
+HIGH_BP = 2
+LOW_BP = 4
+HIGH_GLUCOSE = 8
+LOW_GLUCOSE = 16
+
+SUGGESTION_KEYS = (
+    (HIGH_HEART_RATE, "high_heart_rate"),
+    (HIGH_BP, "high_bp"),
+    (LOW_BP, "low_bp"),
+    (HIGH_GLUCOSE, "high_glucose"),
+    (LOW_GLUCOSE, "low_glucose"),
+)
+
+AT_RISK = "At Risk"
+NORMAL = "Normal"
+
+
+class RiskThresholds:
+    __slots__ = ("hr", "bp_high", "bp_low", "glucose_high", "glucose_low")
+
+    def __init__(self, hr, bp_high, bp_low, glucose_high, glucose_low):
+        self.hr = hr
+        self.bp_high = bp_high  # (systolic, diastolic)
+        self.bp_low = bp_low
+        self.glucose_high = glucose_high
+        self.glucose_low = glucose_low
+
+
+# Scalar path: the risk code of one reading
+def risk_code(heart_rate, systolic, diastolic, glucose, thresholds):
+    code = 0
+    if heart_rate > thresholds.hr:
+        code |= HIGH_HEART_RATE
+    if systolic > thresholds.bp_high[0] or diastolic > thresholds.bp_high[1]:
+        code |= HIGH_BP
+    if systolic < thresholds.bp_low[0] or diastolic < thresholds.bp_low[1]:
+        code |= LOW_BP
+    if glucose > thresholds.glucose_high:
+        code |= HIGH_GLUCOSE
+    if glucose < thresholds.glucose_low:
+        code |= LOW_GLUCOSE
+    return code
+
+
+def suggestion_keys(code):
+    return [key for bit, key in SUGGESTION_KEYS if code & bit]
+
+
+# Result of scoring a batch. codes and at_risk have one item per reading;
+# transitions are the indexes whose status differs from the reading before,
+# the first reading being compared with the status the batch started from.
+class RiskBatch:
+    __slots__ = ("codes", "at_risk", "transitions", "last_status")
+
+    def __init__(self, codes, at_risk, transitions, last_status):
+        self.codes = codes
+        self.at_risk = at_risk
+        self.transitions = transitions
+        self.last_status = last_status
+
+    def __len__(self):
+        return len(self.codes)
+
+    def status(self, i):
+        return AT_RISK if self.at_risk[i] else NORMAL
+
+    def suggestion_keys(self, i):
+        return suggestion_keys(int(self.codes[i]))
+
+
+def _evaluate_numpy(heart_rate, systolic, diastolic, glucose, t, previous):
+    heart_rate, systolic, diastolic, glucose = (np.asarray(c) for c in (heart_rate, systolic, diastolic, glucose))
+    codes = np.zeros(len(heart_rate), dtype=np.uint8)
+    codes |= np.where(heart_rate > t.hr, HIGH_HEART_RATE, 0).astype(np.uint8)
+    codes |= np.where((systolic > t.bp_high[0]) | (diastolic > t.bp_high[1]), HIGH_BP, 0).astype(np.uint8)
+    codes |= np.where((systolic < t.bp_low[0]) | (diastolic < t.bp_low[1]), LOW_BP, 0).astype(np.uint8)
+    codes |= np.where(glucose > t.glucose_high, HIGH_GLUCOSE, 0).astype(np.uint8)
+    codes |= np.where(glucose < t.glucose_low, LOW_GLUCOSE, 0).astype(np.uint8)
+    at_risk = codes != 0
+    before = np.empty_like(at_risk)
+    if len(at_risk):
+        before[0] = previous
+        before[1:] = at_risk[:-1]
+    transitions = np.flatnonzero(at_risk != before)
+    return codes, at_risk, transitions
+
+
+def _evaluate_python(heart_rate, systolic, diastolic, glucose, t, previous):
+    codes = [risk_code(*reading, t) for reading in zip(heart_rate, systolic, diastolic, glucose)]
+    at_risk = [code != 0 for code in codes]
+    transitions = []
+    for i, risky in enumerate(at_risk):
+        if risky != previous:
+            transitions.append(i)
+        previous = risky
+    return codes, at_risk, transitions
+
+
+# Score a batch of readings given as columns (lists or NumPy arrays) in one
+# pass. Uses NumPy when it is installed and use_numpy is not False.
+def evaluate_batch(heart_rate, systolic, diastolic, glucose, thresholds, last_status=NORMAL, use_numpy=None):
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise RuntimeError("NumPy is not installed")
+    evaluate = _evaluate_numpy if use_numpy else _evaluate_python
+    codes, at_risk, transitions = evaluate(heart_rate, systolic, diastolic, glucose, thresholds, last_status == AT_RISK)
+    if len(at_risk):
+        last_status = AT_RISK if at_risk[-1] else NORMAL
+    return RiskBatch(codes, at_risk, transitions, last_status)
+
+
+# Columns from logged HealthReadings. Readings without a complete set of
+# measurements (falls logged before any reading) are skipped.
+def columns_from_readings(readings):
+    columns = ReadingColumns()
+    columns.extend(readings)
+    return columns.heart_rate, columns.systolic, columns.diastolic, columns.glucose
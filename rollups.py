@@ -0,0 +1,310 @@
+import bisect
+import json
+import os
+import threading
+import time
+from array import array
+
+from records import HealthReading
+
+# Bucket widths in seconds; day buckets start at local midnight
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+# How far back each resolution is kept, counted from its newest bucket
+RETENTION = {"minute": 2 * 86400, "hour": 120 * 86400, "day": None}
+METRICS = ("heart_rate", "systolic", "diastolic", "glucose")
+# Most points "auto" picks a resolution for
+AUTO_MAX_POINTS = 1000
+ROLLUP_FORMAT = 1
+
+_EMPTY = [0.0] + [float("inf"), float("-inf"), 0.0] * len(METRICS)
+
+
+def bucket_start(ts, resolution):
+    if resolution == "day":
+        local = time.localtime(ts)
+        return int(ts) - (local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec)
+    width = RESOLUTIONS[resolution]
+    return int(ts // width * width)
+
+
+# Finest resolution that covers the span in at most AUTO_MAX_POINTS points
+# and is still retained that far back
+def choose_resolution(start, end):
+    span = end - start
+    for resolution, width in RESOLUTIONS.items():
+        retention = RETENTION[resolution]
+        if span / width <= AUTO_MAX_POINTS and (retention is None or span <= retention):
+            return resolution
+    return "day"
+
+
+# One resolution's buckets: sorted start times and, per start, an array of
+# count followed by min, max and sum for each metric
+class _Series:
+    __slots__ = ("resolution", "starts", "buckets", "current", "current_start", "current_end")
+
+    def __init__(self, resolution):
+        self.resolution = resolution
+        self.starts = []
+        self.buckets = {}
+        # Readings mostly arrive in time order, so the last bucket used is kept
+        # with its bounds and the next reading usually needs no lookup
+        self.current = None
+        self.current_start = self.current_end = 0
+
+    def _bucket(self, ts):
+        start = bucket_start(ts, self.resolution)
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            retention = RETENTION[self.resolution]
+            if retention is not None and self.starts and start < self.starts[-1] - retention:
+                return None  # older than anything this resolution keeps
+            bucket = self.buckets[start] = array("d", _EMPTY)
+            if not self.starts or start > self.starts[-1]:
+                self.starts.append(start)
+                self._prune()
+            else:
+                bisect.insort(self.starts, start)
+        self.current = bucket
+        self.current_start = start
+        if self.resolution == "day":
+            # Local days are 23 to 25 hours long, so 26 hours on is always the next day
+            self.current_end = bucket_start(start + 26 * 3600, "day")
+        else:
+            self.current_end = start + RESOLUTIONS[self.resolution]
+        return bucket
+
+    def add(self, ts, values):
+        if self.current_start <= ts < self.current_end:
+            bucket = self.current
+        else:
+            bucket = self._bucket(ts)
+            if bucket is None:
+                return
+        bucket[0] += 1
+        base = 1
+        for value in values:
+            if value < bucket[base]:
+                bucket[base] = value
+            if value > bucket[base + 1]:
+                bucket[base + 1] = value
+            bucket[base + 2] += value
+            base += 3
+
+    def _prune(self):
+        retention = RETENTION[self.resolution]
+        if retention is None:
+            return
+        cut = bisect.bisect_left(self.starts, self.starts[-1] - retention)
+        if cut:
+            for start in self.starts[:cut]:
+                del self.buckets[start]
+            del self.starts[:cut]
+            self.current = None
+            self.current_start = self.current_end = 0
+
+    # Buckets overlapping [start, end), found by bisection
+    def points(self, start, end):
+        lo = bisect.bisect_left(self.starts, bucket_start(start, self.resolution))
+        hi = bisect.bisect_left(self.starts, end)
+        points = []
+        for bucket_ts in self.starts[lo:hi]:
+            bucket = self.buckets[bucket_ts]
+            count = bucket[0]
+            point = {"ts": bucket_ts, "count": int(count)}
+            for i, metric in enumerate(METRICS):
+                base = 1 + 3 * i
+                point[metric] = {
+                    "min": bucket[base], "max": bucket[base + 1], "mean": round(bucket[base + 2] / count, 1),
+                }
+            points.append(point)
+        return points
+
+    def to_rows(self):
+        return [[start] + list(self.buckets[start]) for start in self.starts]
+
+    def load_rows(self, rows):
+        for row in rows:
+            self.starts.append(int(row[0]))
+            self.buckets[int(row[0])] = array("d", row[1:])
+        self.starts.sort()
+
+
+class _Rollup:
+    __slots__ = ("series", "cursor", "dirty")
+
+    def __init__(self):
+        self.series = {resolution: _Series(resolution) for resolution in RESOLUTIONS}
+        self.cursor = 0  # health cursor of the last reading included
+        self.dirty = False
+
+    def add(self, reading):
+        if reading.ts is None or not reading.is_complete():
+            return  # falls logged before any measurement
+        values = (reading.heart_rate, reading.systolic, reading.diastolic, reading.glucose)
+        for series in self.series.values():
+            series.add(reading.ts, values)
+
+
+# Per-minute, per-hour and per-day min/max/mean/count of each resident's
+# readings, updated as readings are written, so a trend query costs the same
+# whatever the size of the raw history. Each resident's rollups are kept in
+# directory/<resident>.json with the health cursor they cover. preload()
+# loads every resident at startup (on a background thread), and a resident
+# not loaded yet is loaded on its first trend query; readings stored after the
+# file's cursor are replayed from storage, and a resident with no usable file
+# is rebuilt from its whole health log. write_lock is the lock health writes
+# hold. add() is called with it held and updates loaded residents; until the
+# preload is done, the others pick up new readings from storage when loaded,
+# and after it a resident first written since startup is built on the spot.
+# A load reads history up to a cursor without the lock, so a long rebuild
+# never holds up anyone's writes, and takes it only to replay what was
+# written meanwhile.
+# shared: other processes write to the same storage (write_lock then spans
+# processes), so new readings are read back from storage instead.
+class RollupEngine:
+    def __init__(self, storage, directory, write_lock, shared=False):
+        self.storage = storage
+        self.directory = directory
+        self.write_lock = write_lock
+        self.shared = shared
+        self.lock = threading.Lock()
+        self.loading = {}  # resident_id -> lock held while that resident loads, so it loads once
+        self.residents = {}  # resident_id -> _Rollup
+        self.preloaded = False
+        os.makedirs(directory, exist_ok=True)
+
+    def _file(self, resident_id):
+        return os.path.join(self.directory, f"{resident_id}.json")
+
+    def _read_file(self, resident_id):
+        try:
+            with open(self._file(resident_id), "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return None
+        if data.get("format") != ROLLUP_FORMAT or data.get("backend") != self.storage.name:
+            return None  # cursors of another storage engine mean nothing here
+        return data
+
+    # Called without write_lock, which it takes only to catch up at the end
+    def _load(self, resident_id):
+        rollup = self.residents.get(resident_id)
+        if rollup is not None:
+            return rollup
+        with self.lock:
+            loading = self.loading.setdefault(resident_id, threading.Lock())
+        with loading:
+            rollup = self.residents.get(resident_id)
+            if rollup is not None:
+                return rollup  # loaded while this one waited
+            rollup = self._build(resident_id)
+            with self.write_lock:
+                with self.lock:
+                    self.loading.pop(resident_id, None)
+                    if resident_id in self.residents:
+                        return self.residents[resident_id]  # built by add() meanwhile
+                self._catch_up(rollup, resident_id)  # written while history was read
+                with self.lock:
+                    self.residents[resident_id] = rollup
+        return rollup
+
+    # Load every resident's rollups, so the first trend query finds them in
+    # memory and add() keeps them current from then on
+    def preload(self, resident_ids):
+        for resident_id in resident_ids:
+            try:
+                self._load(resident_id)
+            except Exception as e:
+                print(f"Could not load trend rollups for {resident_id}: {e}")
+        self.preloaded = True
+
+    # The rollup from the file and storage, up to the health cursor at the start
+    def _build(self, resident_id):
+        current = self.storage.health_cursor(resident_id)
+        data = self._read_file(resident_id)
+        rollup = _Rollup()
+        since = None
+        if data is not None and data["cursor"] <= current:
+            for resolution, rows in data["series"].items():
+                if resolution in rollup.series:
+                    rollup.series[resolution].load_rows(rows)
+            since = data["cursor"]
+        for entry in self.storage.iter_health(resident_id, since, current):
+            rollup.add(HealthReading.from_dict(entry))
+        rollup.cursor = current
+        rollup.dirty = current > (since or 0)
+        return rollup
+
+    # Replay what storage holds after the rollup's cursor; call with write_lock held
+    def _catch_up(self, rollup, resident_id):
+        current = self.storage.health_cursor(resident_id)
+        if current <= rollup.cursor:
+            return
+        entries, _ = self.storage.health_since(rollup.cursor, current - rollup.cursor, resident_id)
+        with self.lock:
+            for entry in entries:
+                rollup.add(HealthReading.from_dict(entry))
+            rollup.cursor = current
+            rollup.dirty = True
+
+    # Readings just written, the last of them at last_cursor; call with write_lock held.
+    # Before the preload is done, a resident not loaded yet picks them up from
+    # storage when it is; after it, one not loaded is new and has little history.
+    def add(self, resident_id, readings, last_cursor):
+        rollup = self.residents.get(resident_id)
+        if rollup is None:
+            if self.preloaded:
+                rollup = self._build(resident_id)  # these readings included
+                with self.lock:
+                    self.residents[resident_id] = rollup
+            return
+        if self.shared:
+            self._catch_up(rollup, resident_id)  # along with other processes' readings
+            return
+        with self.lock:
+            for reading in readings:
+                rollup.add(reading)
+            rollup.cursor = last_cursor
+            rollup.dirty = True
+
+    def trends(self, resident_id, resolution, start, end):
+        rollup = self._load(resident_id)
+        if self.shared:
+            with self.write_lock:
+                self._catch_up(rollup, resident_id)
+        with self.lock:
+            return self.residents[resident_id].series[resolution].points(start, end)
+
+    # Drop a resident's rollups and rebuild them from the whole health log
+    def rebuild(self, resident_id):
+        with self.write_lock:
+            with self.lock:
+                self.residents.pop(resident_id, None)
+            try:
+                os.remove(self._file(resident_id))
+            except FileNotFoundError:
+                pass
+        rollup = self._load(resident_id)
+        days = rollup.series["day"]
+        return sum(int(days.buckets[start][0]) for start in days.starts)  # readings included
+
+    # Write every changed resident's rollups. They can always be rebuilt from
+    # storage, so the files are replaced atomically but not fsynced.
+    def flush(self):
+        with self.lock:
+            dirty = [(resident_id, rollup) for resident_id, rollup in self.residents.items() if rollup.dirty]
+        for resident_id, rollup in dirty:
+            with self.lock:
+                data = {
+                    "format": ROLLUP_FORMAT,
+                    "backend": self.storage.name,
+                    "cursor": rollup.cursor,
+                    "series": {resolution: series.to_rows() for resolution, series in rollup.series.items()},
+                }
+                rollup.dirty = False
+            tmp_file = self._file(resident_id) + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self._file(resident_id))
+        return len(dirty)
@@ -0,0 +1,141 @@
+import heapq
+import math
+import threading
+import time
+
+
+class Job:
+    __slots__ = ("key", "due", "callback", "interval", "seq")
+
+    def __init__(self, key, due, callback, interval, seq):
+        self.key = key
+        self.due = due  # absolute, in clock seconds
+        self.callback = callback
+        self.interval = interval  # None for one-shot jobs
+        self.seq = seq
+
+
+# Min-heap of jobs keyed by caller-chosen keys. Scheduling a key again
+# replaces its job, so re-registering on restart never duplicates anything.
+# Cancelled and rescheduled jobs leave stale heap entries that are skipped
+# when they reach the top, which keeps every operation O(log n).
+# start() runs jobs on a thread that sleeps until the next due time; with a
+# simulated clock, call run_pending() instead.
+class Scheduler:
+    def __init__(self, clock=time.time, on_error=None):
+        self.clock = clock
+        self.on_error = on_error
+        self.cond = threading.Condition()
+        self.jobs = {}  # key -> Job
+        self.heap = []  # (due, seq, key)
+        self.seq = 0
+        self.stopped = False
+        self.woken = False
+        self.thread = None
+        self.fired = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __contains__(self, key):
+        return key in self.jobs
+
+    def _push(self, job):
+        self.seq += 1
+        job.seq = self.seq
+        heapq.heappush(self.heap, (job.due, job.seq, job.key))
+        if len(self.heap) > 2 * len(self.jobs) + 64:
+            # Mostly stale entries: rebuild from the live jobs
+            self.heap = [(j.due, j.seq, j.key) for j in self.jobs.values()]
+            heapq.heapify(self.heap)
+        self.woken = True
+        self.cond.notify()
+
+    def schedule(self, key, due, callback, interval=None):
+        with self.cond:
+            job = self.jobs[key] = Job(key, due, callback, interval, 0)
+            self._push(job)
+
+    def cancel(self, key):
+        with self.cond:
+            return self.jobs.pop(key, None) is not None
+
+    def reschedule(self, key, due):
+        with self.cond:
+            job = self.jobs.get(key)
+            if job is None:
+                return False
+            job.due = due
+            self._push(job)
+            return True
+
+    def due(self, key):
+        with self.cond:
+            job = self.jobs.get(key)
+            return job.due if job else None
+
+    def _next(self):
+        while self.heap:
+            due, seq, key = self.heap[0]
+            job = self.jobs.get(key)
+            if job is not None and job.seq == seq:
+                return job
+            heapq.heappop(self.heap)
+        return None
+
+    def next_due(self):
+        with self.cond:
+            job = self._next()
+            return job.due if job else None
+
+    # Run every job that is due; returns seconds until the next one, or None
+    def run_pending(self):
+        while True:
+            with self.cond:
+                job = self._next()
+                now = self.clock()
+                if job is None or job.due > now:
+                    return None if job is None else job.due - now
+                heapq.heappop(self.heap)
+                if job.interval:
+                    # Recurring: next occurrence after now, skipping any missed while asleep
+                    job.due += max(1, math.ceil((now - job.due) / job.interval)) * job.interval
+                    self._push(job)
+                else:
+                    del self.jobs[job.key]
+            try:
+                job.callback()
+            except Exception as e:
+                self.failed += 1
+                if self.on_error:
+                    self.on_error(job.key, e)
+                else:
+                    print(f"Scheduled job {job.key} failed: {e}")
+            self.fired += 1
+
+    def run(self):
+        while True:
+            wait = self.run_pending()
+            with self.cond:
+                if self.stopped:
+                    return
+                if not self.woken:
+                    self.cond.wait(wait)
+                self.woken = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.woken = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+    def stats(self):
+        with self.cond:
+            return {"jobs": len(self.jobs), "heap": len(self.heap), "fired": self.fired, "failed": self.failed}
@@ -0,0 +1,310 @@
+import heapq
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+
+from ingest import IngestError, parse_events
+from storage import DEFAULT_RESIDENT
+
+# Accelerometer windows ("accel" events) are magnitudes in g at this rate
+SAMPLE_RATE = 25
+FREE_FALL_G = 0.5  # below this the wearer is falling
+IMPACT_G = 2.5  # the landing
+STILL_G = 0.25  # within this of 1 g the wearer is lying still
+FREE_FALL_SECONDS = 0.1
+IMPACT_WITHIN_SECONDS = 1.0
+STILL_SECONDS = 1.0
+SETTLE_SECONDS = 0.5  # bounce after the impact, not checked for stillness
+
+
+# A fall is a free fall, an impact within a second of it, and then stillness
+def is_fall(samples, rate=SAMPLE_RATE):
+    min_free = max(1, round(FREE_FALL_SECONDS * rate))
+    impact_window = round(IMPACT_WITHIN_SECONDS * rate)
+    settle, still = round(SETTLE_SECONDS * rate), round(STILL_SECONDS * rate)
+    falling = 0
+    for i, g in enumerate(samples):
+        if g < FREE_FALL_G:
+            falling += 1
+            continue
+        if falling >= min_free:
+            for j in range(i, min(len(samples), i + impact_window)):
+                if samples[j] >= IMPACT_G:
+                    after = samples[j + settle:j + settle + still]
+                    if len(after) == still and all(abs(g - 1) < STILL_G for g in after):
+                        return True
+                    break
+        falling = 0
+    return False
+
+
+# Every sensor source delivers JSON Lines events here. Each body is parsed
+# with ingest.parse_events and handed to dispatch(batches, signals), which
+# stores and scores readings per resident and acts on falls, activity and
+# accelerometer windows. Counts are kept per source.
+class SensorHub:
+    def __init__(self, dispatch, default_resident=DEFAULT_RESIDENT):
+        self.dispatch = dispatch
+        self.default_resident = default_resident
+        self.lock = threading.Lock()
+        self.counts = {}  # source -> {"bodies", "readings", "signals", "rejected"}
+
+    def feed(self, body, source="http", content_type="application/x-ndjson", default_resident=None):
+        batches, signals, rejected, errors = parse_events(
+            body, content_type, default_resident or self.default_resident
+        )
+        self.dispatch(batches, signals)
+        readings = sum(len(batch) for batch in batches)
+        with self.lock:
+            counts = self.counts.setdefault(source, {"bodies": 0, "readings": 0, "signals": 0, "rejected": 0})
+            counts["bodies"] += 1
+            counts["readings"] += readings
+            counts["signals"] += len(signals)
+            counts["rejected"] += rejected
+        return readings + len(signals), rejected, errors
+
+    def stats(self):
+        with self.lock:
+            return {source: dict(counts) for source, counts in self.counts.items()}
+
+
+# Newline-delimited JSON events over TCP ("host:port") or a Unix socket (a
+# path): a local stand-in for a broker subscription. Each connection gets a
+# thread; whatever complete lines have arrived are fed as one body.
+class SocketSource:
+    def __init__(self, hub, address, chunk_bytes=65536):
+        self.hub = hub
+        self.address = address
+        self.chunk_bytes = chunk_bytes
+        self.server = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        host, _, port = self.address.rpartition(":")
+        if host and port.isdigit():
+            self.server = socket.create_server((host, int(port)))
+            self.address = f"{host}:{self.server.getsockname()[1]}"  # the real port when 0 was asked for
+        else:
+            if os.path.exists(self.address):
+                os.remove(self.address)  # left over from an earlier run
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(self.address)
+            self.server.listen()
+        self.thread = threading.Thread(target=self._accept, daemon=True)
+        self.thread.start()
+        return self.address
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.close()
+
+    def _accept(self):
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return  # closed by stop()
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        pending = b""
+        with connection:
+            while True:
+                try:
+                    chunk = connection.recv(self.chunk_bytes)
+                except OSError:
+                    return
+                if not chunk:
+                    break
+                pending += chunk
+                end = pending.rfind(b"\n")
+                if end >= 0:
+                    self._feed(pending[:end + 1])
+                    pending = pending[end + 1:]
+        if pending.strip():
+            self._feed(pending)
+
+    def _feed(self, body):
+        try:
+            self.hub.feed(body, "socket")
+        except IngestError as e:
+            print(f"Sensor socket: {e}")
+
+
+# Feed JSON Lines events to the hub with their original spacing divided by
+# speed; speed 0 replays as fast as possible. Lines that are due together go
+# in one body of at most batch lines.
+def replay(hub, lines, speed=1.0, batch=1000, source="replay", stopped=None):
+    pending = []
+    first_ts = started = None
+    for line in lines:
+        if stopped is not None and stopped.is_set():
+            return
+        if not line.strip():
+            continue
+        if speed:
+            ts = json.loads(line).get("ts")
+            if ts is not None:
+                if first_ts is None:
+                    first_ts, started = ts, time.monotonic()
+                wait = (ts - first_ts) / speed - (time.monotonic() - started)
+                if wait > 0:
+                    if pending:
+                        hub.feed(b"".join(pending), source)
+                        pending = []
+                    time.sleep(wait)
+        pending.append(line if line.endswith(b"\n") else line + b"\n")
+        if len(pending) >= batch:
+            hub.feed(b"".join(pending), source)
+            pending = []
+    if pending:
+        hub.feed(b"".join(pending), source)
+
+
+# Replays a recorded JSON Lines file (such as Simulator.record output) on a thread
+class FileReplaySource:
+    def __init__(self, hub, path, speed=1.0, batch=1000):
+        self.hub = hub
+        self.path = path
+        self.speed = speed
+        self.batch = batch
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        with open(self.path, "rb") as f:
+            replay(self.hub, f, self.speed, self.batch, "file", self.stopped)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def _walking(rng, n):
+    return [1 + 0.3 * math.sin(2 * math.pi * 2 * i / SAMPLE_RATE) + rng.gauss(0, 0.05) for i in range(n)]
+
+
+def _still(rng, n):
+    return [1 + rng.gauss(0, 0.04) for _ in range(n)]
+
+
+# Four seconds around a fall: walking, a free fall, the impact, a bounce and
+# lying still
+def _fall_window(rng):
+    samples = _walking(rng, SAMPLE_RATE)
+    samples += [rng.uniform(0.1, 0.4) for _ in range(rng.randint(4, 10))]
+    samples += [rng.uniform(3, 5), rng.uniform(1.5, 2.5)]
+    samples += _still(rng, 4 * SAMPLE_RATE - len(samples))
+    return samples
+
+
+# Movement that is not a fall: walking, sitting down hard (a dip and a jolt
+# but no free fall) or a stumble (a brief dip and a jolt, then walking on)
+def _movement_window(rng):
+    kind = rng.choice(("walk", "sit", "stumble"))
+    if kind == "walk":
+        return _walking(rng, 4 * SAMPLE_RATE)
+    samples = _walking(rng, SAMPLE_RATE)
+    if kind == "sit":
+        samples += [rng.uniform(0.6, 0.8) for _ in range(5)] + [rng.uniform(1.8, 2.3)]
+        return samples + _still(rng, 4 * SAMPLE_RATE - len(samples))
+    samples += [rng.uniform(0.4, 0.5)] + [rng.uniform(2.5, 3)]
+    return samples + _walking(rng, 4 * SAMPLE_RATE - len(samples))
+
+
+# Seeded multi-resident sensor streams: vitals every reading_interval seconds
+# (with a little jitter), activity pings and movement windows at random with
+# the given mean spacing, falls at falls_per_day, and idle spells of 40 to 90
+# minutes in which a resident's sensors send nothing. The same seed gives the
+# same events. Falls generated so far are listed in falls as (resident, ts).
+class Simulator:
+    def __init__(self, residents=10, seed=1, start=None, reading_interval=300, activity_interval=900,
+                 movement_interval=1800, falls_per_day=1.0, idle_per_day=2.0, prefix="sim"):
+        self.resident_ids = [f"{prefix}-{i:04d}" for i in range(residents)]
+        self.seed = seed
+        self.start = time.time() if start is None else start
+        self.reading_interval = reading_interval
+        self.activity_interval = activity_interval
+        self.movement_interval = movement_interval
+        self.falls_per_day = falls_per_day
+        self.idle_per_day = idle_per_day
+        self.falls = []
+
+    def _times(self, rng, mean, end):
+        ts = self.start
+        times = []
+        while mean:
+            ts += rng.expovariate(1 / mean)
+            if ts >= end:
+                break
+            times.append(ts)
+        return times
+
+    def _resident(self, index, resident_id, duration):
+        rng = random.Random(f"{self.seed}:{index}")
+        end = self.start + duration
+        idle = [(ts, ts + rng.uniform(40, 90) * 60) for ts in self._times(rng, self.idle_per_day and 86400 / self.idle_per_day, end)]
+
+        def active(ts):
+            return not any(start <= ts < stop for start, stop in idle)
+
+        timeline = []
+        ts = self.start + rng.uniform(0, self.reading_interval)
+        while ts < end:
+            timeline.append((ts, "reading"))
+            ts += self.reading_interval * rng.uniform(0.9, 1.1)
+        timeline += [(ts, "activity") for ts in self._times(rng, self.activity_interval, end)]
+        timeline += [(ts, "movement") for ts in self._times(rng, self.movement_interval, end)]
+        timeline += [(ts, "fall") for ts in self._times(rng, self.falls_per_day and 86400 / self.falls_per_day, end)]
+        timeline.sort()
+
+        heart_rate, systolic, diastolic, glucose = (
+            rng.uniform(60, 78), rng.uniform(110, 128), rng.uniform(70, 82), rng.uniform(85, 110)
+        )
+        drift = [0.0, 0.0, 0.0, 0.0]
+        for ts, kind in timeline:
+            if not active(ts):
+                continue
+            event = {"type": kind, "resident": resident_id, "ts": round(ts, 3)}
+            if kind == "reading":
+                # Slow per-resident drift plus reading-to-reading noise
+                drift = [0.95 * d + rng.gauss(0, 1) for d in drift]
+                del event["type"]
+                event["heart_rate"] = max(1, round(heart_rate + drift[0] + rng.gauss(0, 2)))
+                event["bp_systolic"] = max(1, round(systolic + drift[1] + rng.gauss(0, 4)))
+                event["bp_diastolic"] = max(1, round(diastolic + drift[2] + rng.gauss(0, 3)))
+                event["glucose"] = max(1, round(glucose + drift[3] + rng.gauss(0, 6)))
+            elif kind == "movement":
+                event["type"] = "accel"
+                event["samples"] = [round(g, 2) for g in _movement_window(rng)]
+            elif kind == "fall":
+                event["type"] = "accel"
+                event["samples"] = [round(g, 2) for g in _fall_window(rng)]
+                self.falls.append((resident_id, event["ts"]))
+            yield event
+
+    # Every resident's events over duration seconds, merged in time order
+    def events(self, duration):
+        streams = [self._resident(i, resident_id, duration) for i, resident_id in enumerate(self.resident_ids)]
+        return heapq.merge(*streams, key=lambda event: event["ts"])
+
+    def lines(self, duration):
+        for event in self.events(duration):
+            yield json.dumps(event).encode() + b"\n"
+
+    def record(self, path, duration):
+        count = 0
+        with open(path, "wb") as f:
+            for line in self.lines(duration):
+                f.write(line)
+                count += 1
+        return count
@@ -0,0 +1,103 @@
+# Seeded sensor streams for load tests and demos without hardware: vitals,
+# activity pings and accelerometer windows (some of them falls) for many
+# residents. Record them to a file, or send them, live or replayed, to a
+# running app over HTTP (/api/sensors) or its SENSOR_SOCKET.
+#
+#   python simulate_sensors.py --record sim.jsonl [--residents 50] [--hours 24]
+#   python simulate_sensors.py --http http://localhost:5000 [--speed 60]
+#   python simulate_sensors.py --socket 127.0.0.1:5055 --replay sim.jsonl --speed 0
+#
+# --speed is simulated seconds per real second; 0 sends as fast as possible.
+import argparse
+import socket
+import time
+import urllib.error
+import urllib.request
+
+from sensors import Simulator, replay
+
+
+class HttpSink:
+    def __init__(self, base_url):
+        self.url = base_url.rstrip("/") + "/api/sensors"
+
+    def feed(self, body, source):
+        request = urllib.request.Request(self.url, body, {"Content-Type": "application/x-ndjson"})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            print(f"{self.url}: {e.code} {e.read().decode(errors='replace')}")
+
+
+class SocketSink:
+    def __init__(self, address):
+        host, _, port = address.rpartition(":")
+        if host and port.isdigit():
+            self.connection = socket.create_connection((host, int(port)))
+        else:
+            self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.connection.connect(address)
+
+    def feed(self, body, source):
+        self.connection.sendall(body)
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate, record or send seeded sensor streams")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--record", metavar="FILE", help="write the events to a JSON Lines file")
+    target.add_argument("--http", metavar="URL", help="POST the events to URL/api/sensors")
+    target.add_argument("--socket", metavar="ADDRESS", help="send the events to host:port or a Unix socket path")
+    parser.add_argument("--replay", metavar="FILE", help="send a recorded file instead of generating events")
+    parser.add_argument("--speed", type=float, default=0, help="simulated seconds per second; 0: as fast as possible")
+    parser.add_argument("--batch", type=int, default=500, help="most events per request")
+    parser.add_argument("--residents", type=int, default=10)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--reading-interval", type=float, default=300)
+    parser.add_argument("--activity-interval", type=float, default=900)
+    parser.add_argument("--movement-interval", type=float, default=1800)
+    parser.add_argument("--falls-per-day", type=float, default=1.0)
+    parser.add_argument("--idle-per-day", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.record and args.replay:
+        parser.error("--record and --replay cannot be combined")
+
+    duration = args.hours * 3600
+    simulator = Simulator(
+        args.residents, args.seed, time.time() - (duration if args.speed == 0 else 0), args.reading_interval,
+        args.activity_interval, args.movement_interval, args.falls_per_day, args.idle_per_day,
+    )
+    start = time.perf_counter()
+    if args.record:
+        count = simulator.record(args.record, duration)
+        print(f"Recorded {count} events ({len(simulator.falls)} falls) to {args.record}")
+        return
+
+    sink = HttpSink(args.http) if args.http else SocketSink(args.socket)
+    sent = 0
+
+    def counted(lines):
+        nonlocal sent
+        for line in lines:
+            sent += 1
+            yield line
+
+    if args.replay:
+        with open(args.replay, "rb") as f:
+            replay(sink, counted(f), args.speed, args.batch, "simulator")
+    else:
+        replay(sink, counted(simulator.lines(duration)), args.speed, args.batch, "simulator")
+        print(f"{len(simulator.falls)} falls simulated")
+    if isinstance(sink, SocketSink):
+        sink.close()
+    elapsed = time.perf_counter() - start
+    print(f"Sent {sent} events in {elapsed:.1f}s ({sent / elapsed:.0f} events/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,37 @@
-let lastActivityCount = 0;
+const POLL_INTERVAL = 10000;
+const MAX_ENTRIES = 5;
 
-setInterval(async () => {
-    const healthResponse = await fetch('/api/health');
-    const healthData = await healthResponse.json();
-    const activityResponse = await fetch('/api/activity');
-    const activityData = await activityResponse.json();
+let healthData = [];
+let activityData = [];
+let pollTimer = null;
 
-    // Update Health Data
+// Records carry epoch seconds and separate blood pressure fields
+function formatTime(ts) {
+    return ts == null ? 'N/A' : new Date(ts * 1000).toLocaleString();
+}
+
+function formatBloodPressure(entry) {
+    return entry['systolic'] == null ? 'N/A' : `${entry['systolic']}/${entry['diastolic']}`;
+}
+
+function renderHealth() {
     const healthList = document.getElementById('health-data');
     healthList.innerHTML = '';
     healthData.forEach(entry => {
         const li = document.createElement('li');
-        li.className = entry['heart_rate'] > 100 || entry['glucose'] > 130 ? 'bg-red-100 dark:bg-red-900 p-3 rounded-lg' : 
+        li.className = entry['heart_rate'] > 100 || entry['glucose'] > 130 ? 'bg-red-100 dark:bg-red-900 p-3 rounded-lg' :
                        entry['heart_rate'] > 90 ? 'bg-yellow-100 dark:bg-yellow-900 p-3 rounded-lg' : 'bg-green-100 dark:bg-green-900 p-3 rounded-lg';
-        li.innerHTML = `<span class="font-medium text-gray-800 dark:text-gray-200">${entry['timestamp']}</span> - 
-                        Heart Rate: <span class="font-bold text-gray-900 dark:text-gray-100">${entry['heart_rate']}</span> bpm, 
-                        BP: <span class="font-bold text-gray-900 dark:text-gray-100">${entry['blood_pressure']}</span>, 
+        li.innerHTML = `<span class="font-medium text-gray-800 dark:text-gray-200">${formatTime(entry['ts'])}</span> -
+                        Heart Rate: <span class="font-bold text-gray-900 dark:text-gray-100">${entry['heart_rate']}</span> bpm,
+                        BP: <span class="font-bold text-gray-900 dark:text-gray-100">${formatBloodPressure(entry)}</span>,
                         Glucose: <span class="font-bold text-gray-900 dark:text-gray-100">${entry['glucose']}</span> mg/dL${
                             entry['event'] ? `<span class="text-red-600 dark:text-red-400 font-bold ml-2"> - ${entry['event']}</span>` : ''
                         }`;
         healthList.appendChild(li);
     });
+}
 
-    // Update Activity Log
+function renderActivity() {
     const activityList = document.getElementById('activity-log');
     const filter = document.getElementById('filter').value;
     activityList.innerHTML = '';
@@ -33,49 +42,96 @@ setInterval(async () => {
     });
     filteredData.forEach(entry => {
         const li = document.createElement('li');
-        li.className = entry['activity'].includes('Alert') ? 
-                       (entry['activity'].includes('Critical') ? 'bg-red-100 dark:bg-red-900 p-3 rounded-lg flex items-center' : 'bg-yellow-100 dark:bg-yellow-900 p-3 rounded-lg flex items-center') : 
+        li.className = entry['activity'].includes('Alert') ?
+                       (entry['activity'].includes('Critical') ? 'bg-red-100 dark:bg-red-900 p-3 rounded-lg flex items-center' : 'bg-yellow-100 dark:bg-yellow-900 p-3 rounded-lg flex items-center') :
                        'bg-gray-100 dark:bg-gray-900 p-3 rounded-lg flex items-center';
         li.innerHTML = `<i class="${entry['activity'].includes('Alert') ? 'fas fa-exclamation-circle text-red-500' : entry['activity'].includes('Reminder') ? 'fas fa-bell text-blue-500' : 'fas fa-info-circle text-gray-500'} mr-2"></i>
-                        <span class="font-medium text-gray-800 dark:text-gray-200">${entry['timestamp']}</span> - 
+                        <span class="font-medium text-gray-800 dark:text-gray-200">${formatTime(entry['ts'])}</span> -
                         <span class="font-bold text-gray-900 dark:text-gray-100">${entry['activity']}</span>`;
         activityList.appendChild(li);
     });
+}
+
+// Show Alert Popup for New Alerts
+function showAlert(message) {
+    const alertPopup = document.getElementById('alert-popup');
+    const alertMessage = document.getElementById('alert-message');
+    alertMessage.textContent = message;
+    alertPopup.classList.remove('hidden');
+}
+
+// ETag and cursor of the last response for each log, so polls only transfer what is new
+const logState = {
+    health: { etag: null, cursor: null },
+    activity: { etag: null, cursor: null }
+};
 
-    // Show Alert Popup for New Alerts
-    const newActivityCount = activityData.length;
-    if (newActivityCount > lastActivityCount) {
-        const latestActivity = activityData[activityData.length - 1];
-        if (latestActivity['activity'].includes('Alert')) {
-            const alertPopup = document.getElementById('alert-popup');
-            const alertMessage = document.getElementById('alert-message');
-            alertMessage.textContent = latestActivity['activity'];
-            alertPopup.classList.remove('hidden');
+async function fetchLog(kind) {
+    const state = logState[kind];
+    const url = state.cursor === null ? `/api/${kind}` : `/api/${kind}?since=${state.cursor}`;
+    const headers = state.etag ? { 'If-None-Match': state.etag } : {};
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    if (response.status === 304) return null;
+    const cursor = Number(response.headers.get('X-Cursor'));
+    if (state.cursor !== null && cursor < state.cursor) {
+        // The server's log was reset; start over with a full fetch
+        state.etag = null;
+        state.cursor = null;
+        return fetchLog(kind);
+    }
+    const incremental = state.cursor !== null;
+    state.etag = response.headers.get('ETag');
+    state.cursor = cursor;
+    return { records: await response.json(), incremental };
+}
+
+async function loadAll() {
+    const health = await fetchLog('health');
+    if (health) {
+        healthData = (health.incremental ? healthData.concat(health.records) : health.records).slice(-MAX_ENTRIES);
+        renderHealth();
+    }
+    const activity = await fetchLog('activity');
+    if (activity) {
+        if (activity.incremental) {
+            const latestAlert = activity.records.filter(entry => entry['activity'].includes('Alert')).pop();
+            if (latestAlert) showAlert(latestAlert['activity']);
         }
+        activityData = (activity.incremental ? activityData.concat(activity.records) : activity.records).slice(-MAX_ENTRIES);
+        renderActivity();
     }
-    lastActivityCount = newActivityCount;
-}, 10000);
+}
 
-// Filter on Change
-document.getElementById('filter').addEventListener('change', async () => {
-    const activityResponse = await fetch('/api/activity');
-    const activityData = await activityResponse.json();
-    const activityList = document.getElementById('activity-log');
-    const filter = document.getElementById('filter').value;
-    activityList.innerHTML = '';
-    const filteredData = activityData.filter(entry => {
-        if (filter === 'alert') return entry['activity'].includes('Alert');
-        if (filter === 'reminder') return entry['activity'].includes('Reminder');
-        return true;
+// Polling is only used when the event stream is unavailable
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(loadAll, POLL_INTERVAL);
+}
+
+function startStream() {
+    const stream = new EventSource('/api/stream');
+    stream.addEventListener('health', e => {
+        healthData = healthData.concat([JSON.parse(e.data)]).slice(-MAX_ENTRIES);
+        renderHealth();
     });
-    filteredData.forEach(entry => {
-        const li = document.createElement('li');
-        li.className = entry['activity'].includes('Alert') ? 
-                       (entry['activity'].includes('Critical') ? 'bg-red-100 dark:bg-red-900 p-3 rounded-lg flex items-center' : 'bg-yellow-100 dark:bg-yellow-900 p-3 rounded-lg flex items-center') : 
-                       'bg-gray-100 dark:bg-gray-900 p-3 rounded-lg flex items-center';
-        li.innerHTML = `<i class="${entry['activity'].includes('Alert') ? 'fas fa-exclamation-circle text-red-500' : entry['activity'].includes('Reminder') ? 'fas fa-bell text-blue-500' : 'fas fa-info-circle text-gray-500'} mr-2"></i>
-                        <span class="font-medium text-gray-800 dark:text-gray-200">${entry['timestamp']}</span> - 
-                        <span class="font-bold text-gray-900 dark:text-gray-100">${entry['activity']}</span>`;
-        activityList.appendChild(li);
+    stream.addEventListener('activity', e => {
+        activityData = activityData.concat([JSON.parse(e.data)]).slice(-MAX_ENTRIES);
+        renderActivity();
     });
-});
\ No newline at end of file
+    stream.addEventListener('alert', e => showAlert(JSON.parse(e.data)['message']));
+    stream.onerror = () => {
+        // The browser reconnects with Last-Event-ID on its own unless the stream was closed for good
+        if (stream.readyState === EventSource.CLOSED) startPolling();
+    };
+}
+
+loadAll().then(() => {
+    if (window.EventSource) {
+        startStream();
+    } else {
+        startPolling();
+    }
+});
+
+// Filter on Change
+document.getElementById('filter').addEventListener('change', renderActivity);
@@ -0,0 +1,729 @@
+import json
+import os
+import re
+import sqlite3
+import time
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import reminder_store
+from journal import ActivityJournal
+from records import ActivityEvent
+from reminder_store import ReminderLog
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+FOOTER_KEY = "_footer"
+DEFAULT_RESIDENT = "default"
+# Resident ids name files and rows, so they are restricted
+RESIDENT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+# Interface every health log backend implements
+class HealthLogBackend:
+    def append(self, entry):
+        raise NotImplementedError
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def tail(self, n):
+        raise NotImplementedError
+
+    def latest(self):
+        records = self.tail(1)
+        return records[-1] if records else None
+
+    def __iter__(self):
+        raise NotImplementedError
+
+
+# Append-only JSON Lines log split into rotated segments.
+# Closed segments end with a footer line holding their record count, so
+# opening the log only reads one line per closed segment.
+class JsonLinesLog(HealthLogBackend):
+    def __init__(self, directory, max_segment_bytes=4 * 1024 * 1024):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.segments = []  # [name, record_count, closed]
+        self._active = None
+        self._active_size = 0
+        self._open_segments()
+
+    def _segment_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open_segments(self):
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        for name in names:
+            footer = _read_footer(self._segment_path(name))
+            if footer is not None:
+                self.segments.append([name, footer["count"], True])
+            else:
+                _drop_torn_tail(self._segment_path(name))
+                self.segments.append([name, _count_lines(self._segment_path(name)), False])
+        # Only the newest segment may stay open; close any older one left open by a crash
+        for segment in self.segments[:-1]:
+            if not segment[2]:
+                self._write_footer(segment)
+        if not self.segments or self.segments[-1][2]:
+            self._new_segment()
+        else:
+            self._active_size = os.path.getsize(self._segment_path(self.segments[-1][0]))
+
+    def _new_segment(self):
+        number = int(self.segments[-1][0][len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if self.segments else 1
+        name = f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+        self.segments.append([name, 0, False])
+        open(self._segment_path(name), "ab").close()
+        self._active_size = 0
+
+    def _write_footer(self, segment):
+        footer = json.dumps({FOOTER_KEY: {"count": segment[1]}}).encode("utf-8") + b"\n"
+        with open(self._segment_path(segment[0]), "ab") as f:
+            f.write(footer)
+        segment[2] = True
+
+    # The newest segment is opened on first write and can be released again
+    # when the caller needs to bound the number of open files
+    def _handle(self):
+        if self._active is None:
+            self._active = open(self._segment_path(self.segments[-1][0]), "ab")
+        return self._active
+
+    def is_open(self):
+        return self._active is not None
+
+    def release(self):
+        with self.lock:
+            if self._active:
+                self._active.close()
+                self._active = None
+
+    def _rotate(self):
+        if self._active:
+            self._active.close()
+            self._active = None
+        self._write_footer(self.segments[-1])
+        self._new_segment()
+
+    def _write(self, entry):
+        line = json.dumps(entry).encode("utf-8") + b"\n"
+        if self._active_size and self._active_size + len(line) > self.max_segment_bytes:
+            self._rotate()
+        self._handle().write(line)
+        self._active_size += len(line)
+        self.segments[-1][1] += 1
+
+    # Both return the number of records in the log after the write
+    def append(self, entry):
+        with self.lock:
+            self._write(entry)
+            self._active.flush()
+            return self._count()
+
+    def extend(self, entries):
+        with self.lock:
+            for entry in entries:
+                self._write(entry)
+            self._active.flush()
+            return self._count()
+
+    def _count(self):
+        return sum(segment[1] for segment in self.segments)
+
+    def __len__(self):
+        with self.lock:
+            return self._count()
+
+    def tail(self, n):
+        if n <= 0:
+            return []
+        with self.lock:
+            segments = [(name, count) for name, count, _ in self.segments]
+        records = []
+        for name, count in reversed(segments):
+            if count == 0:
+                continue
+            needed = n - len(records)
+            records[:0] = _read_tail_records(self._segment_path(name), needed)
+            if len(records) >= n:
+                break
+        return records
+
+    def __iter__(self):
+        return self.range()
+
+    # Records after the first `start` and up to the first `stop`, oldest
+    # first. Segments wholly before start are skipped by their record count,
+    # so only the segments holding the range are read.
+    def range(self, start=0, stop=None):
+        with self.lock:
+            segments = [(name, count) for name, count, _ in self.segments]
+        position = 0
+        for name, count in segments:
+            if stop is not None and position >= stop:
+                return
+            if position + count <= start:
+                position += count
+                continue
+            with open(self._segment_path(name), "rb") as f:
+                for line in f:
+                    record = _decode_line(line)
+                    if record is None:
+                        continue
+                    if stop is not None and position >= stop:
+                        return
+                    if position >= start:
+                        yield record
+                    position += 1
+
+    def close(self):
+        self.release()
+
+
+def _decode_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None  # torn write from a crash
+    if isinstance(record, dict) and FOOTER_KEY in record:
+        return None
+    return record
+
+
+# Cut a last line left without its newline by a crash, so the next record
+# written starts on a line of its own instead of being joined to it
+def _drop_torn_tail(path, block_size=8192):
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                position += newline + 1
+                break
+        if position < end:
+            f.truncate(position)
+
+
+def _count_lines(path):
+    with open(path, "rb") as f:
+        return sum(1 for line in f if _decode_line(line) is not None)
+
+
+def _read_footer(path):
+    lines = _read_tail_lines(path, 1)
+    if not lines:
+        return None
+    try:
+        record = json.loads(lines[0])
+    except json.JSONDecodeError:
+        return None
+    if isinstance(record, dict) and FOOTER_KEY in record:
+        return record[FOOTER_KEY]
+    return None
+
+
+# Read the last n non-empty lines by seeking backwards from the end of the file
+def _read_tail_lines(path, n, block_size=8192):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b""
+        while position > 0 and buffer.count(b"\n") <= n + 1:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            buffer = f.read(step) + buffer
+    lines = [line for line in buffer.split(b"\n") if line.strip()]
+    if position > 0:
+        lines = lines[1:]  # first line may be cut in half
+    return lines[-n:]
+
+
+def _read_tail_records(path, n):
+    # One extra line covers the footer of a closed segment
+    records = [_decode_line(line) for line in _read_tail_lines(path, n + 1)]
+    return [record for record in records if record is not None][-n:]
+
+
+# One-shot import of a legacy JSON array log into an append-only log,
+# passing each record through convert when given
+def migrate_json_array(legacy_file, log, convert=None):
+    if not os.path.exists(legacy_file):
+        return 0
+    with open(legacy_file, "r") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError:
+            data = []
+    if not isinstance(data, list):
+        data = []
+    if convert is not None:
+        data = [convert(entry) for entry in data]
+    log.extend(data)
+    os.replace(legacy_file, legacy_file + ".migrated")
+    print(f"Migrated {len(data)} records from {legacy_file}")
+    return len(data)
+
+
+def _dump_json_list(file, data):
+    with open(file, "w") as f:
+        json.dump(data, f)
+
+
+# In-memory write counters per log and resident, so callers can tell whether a
+# log changed without reading it
+class VersionedStorage:
+    def __init__(self):
+        self.versions = {}
+        self.versions_lock = threading.Lock()
+
+    def _bump(self, kind, resident_id):
+        with self.versions_lock:
+            self.versions[(kind, resident_id)] = self.versions.get((kind, resident_id), 0) + 1
+
+    def version(self, kind, resident_id=DEFAULT_RESIDENT):
+        return self.versions.get((kind, resident_id), 0)
+
+
+# One resident's files for the JSON engine
+class _JsonShard:
+    def __init__(self, health_log_dir, activity_dir, schedule_file, custom_reminders_file):
+        self.health_log = JsonLinesLog(health_log_dir)
+        self.activity_log = ActivityJournal(activity_dir)
+        # The old activity file, a JSON array of the latest entries, is imported once
+        migrate_json_array(activity_dir + ".json", self.activity_log, lambda entry: ActivityEvent.from_dict(entry).to_dict())
+        self.schedule_file = schedule_file
+        self.custom_reminders_file = custom_reminders_file
+        self.schedule_log = ReminderLog(schedule_file)
+        self.custom_reminders_log = ReminderLog(custom_reminders_file)
+        for file in [schedule_file, custom_reminders_file]:
+            if not os.path.exists(file):
+                _dump_json_list(file, [])
+
+
+# Storage engine backed by the original JSON files plus the append-only health
+# log and activity journal. The default resident keeps the original paths;
+# every other resident gets a directory of its own under residents_dir.
+# Health cursors are record counts; activity entries carry a "seq" number.
+class JsonStorage(VersionedStorage):
+    name = "json"
+
+    def __init__(self, health_log_dir, activity_dir, schedule_file, custom_reminders_file,
+                 residents_dir="logs/residents", max_open_logs=64):
+        super().__init__()
+        self.default_paths = (health_log_dir, activity_dir, schedule_file, custom_reminders_file)
+        self.residents_dir = residents_dir
+        self.max_open_logs = max_open_logs
+        self.lock = threading.RLock()
+        self.shards = OrderedDict()  # resident_id -> _JsonShard, most recently written last
+        self.shard(DEFAULT_RESIDENT)
+
+    @property
+    def health_log(self):
+        return self.shard(DEFAULT_RESIDENT).health_log
+
+    def shard(self, resident_id):
+        with self.lock:
+            shard = self.shards.get(resident_id)
+            if shard is None:
+                if resident_id == DEFAULT_RESIDENT:
+                    paths = self.default_paths
+                else:
+                    directory = os.path.join(self.residents_dir, resident_id)
+                    os.makedirs(directory, exist_ok=True)
+                    paths = (
+                        os.path.join(directory, "health_log"),
+                        os.path.join(directory, "activity_log"),
+                        os.path.join(directory, "schedule.json"),
+                        os.path.join(directory, "custom_reminders.json"),
+                    )
+                shard = self.shards[resident_id] = _JsonShard(*paths)
+            return shard
+
+    # Keep file handles bounded when many residents are writing
+    def _touch(self, resident_id):
+        with self.lock:
+            self.shards.move_to_end(resident_id)
+            open_logs = [
+                log for shard in self.shards.values() for log in (shard.health_log, shard.activity_log) if log.is_open()
+            ]
+            for log in open_logs[:-self.max_open_logs]:
+                log.release()
+
+    def residents(self):
+        residents = {DEFAULT_RESIDENT}
+        if os.path.isdir(self.residents_dir):
+            residents.update(
+                name for name in os.listdir(self.residents_dir)
+                if os.path.isdir(os.path.join(self.residents_dir, name))
+            )
+        return sorted(residents)
+
+    # Writes return the cursor of the last record written
+    def append_health(self, entry, resident_id=DEFAULT_RESIDENT):
+        cursor = self.shard(resident_id).health_log.append(entry)
+        self._touch(resident_id)
+        self._bump("health", resident_id)
+        return cursor
+
+    def append_health_many(self, entries, resident_id=DEFAULT_RESIDENT):
+        cursor = self.shard(resident_id).health_log.extend(entries)
+        self._touch(resident_id)
+        self._bump("health", resident_id)
+        return cursor
+
+    def recent_health(self, n=5, resident_id=DEFAULT_RESIDENT):
+        return self.shard(resident_id).health_log.tail(n)
+
+    def health_cursor(self, resident_id=DEFAULT_RESIDENT):
+        return len(self.shard(resident_id).health_log)
+
+    # Up to limit of the oldest records written after cursor, and the cursor
+    # to resume from: the last one returned, so paging on from it misses nothing
+    def health_since(self, cursor, limit=100, resident_id=DEFAULT_RESIDENT):
+        log = self.shard(resident_id).health_log
+        total = len(log)
+        if not 0 <= cursor <= total:
+            cursor = 0  # cursor from before the log was reset
+        stop = min(total, cursor + limit)
+        if stop == total:
+            records = log.tail(total - cursor)  # the usual case, read from the end
+            if len(log) == total:
+                return records, total
+        return list(log.range(cursor, stop)), stop  # by position, if a write came in meanwhile
+
+    # Every reading, or those after the health cursor `since` and up to `until`
+    def iter_health(self, resident_id=DEFAULT_RESIDENT, since=None, until=None):
+        return self.shard(resident_id).health_log.range(since or 0, until)
+
+    def count_health(self, resident_id=DEFAULT_RESIDENT):
+        return len(self.shard(resident_id).health_log)
+
+    def append_activity(self, entry, resident_id=DEFAULT_RESIDENT):
+        cursor = self.shard(resident_id).activity_log.append(entry)
+        self._touch(resident_id)
+        self._bump("activity", resident_id)
+        return cursor
+
+    def recent_activity(self, n=5, resident_id=DEFAULT_RESIDENT):
+        return self.shard(resident_id).activity_log.recent(n)
+
+    def activity_cursor(self, resident_id=DEFAULT_RESIDENT):
+        return self.shard(resident_id).activity_log.cursor()
+
+    def activity_since(self, cursor, limit=100, resident_id=DEFAULT_RESIDENT):
+        return self.shard(resident_id).activity_log.since(cursor, limit)
+
+    # One page of activity between start and end, newest first; see ActivityJournal.query
+    def query_activity(self, start=None, end=None, kinds=None, priorities=None, before=None, limit=100,
+                       resident_id=DEFAULT_RESIDENT):
+        return self.shard(resident_id).activity_log.query(start, end, kinds, priorities, before, limit)
+
+    def iter_activity(self, resident_id=DEFAULT_RESIDENT):
+        return iter(self.shard(resident_id).activity_log)
+
+    def count_activity(self, day, kind, resident_id=DEFAULT_RESIDENT):
+        return self.shard(resident_id).activity_log.count(day, kind)
+
+    def load_schedule(self, resident_id=DEFAULT_RESIDENT):
+        with self.lock:
+            return self.shard(resident_id).schedule_log.load()
+
+    def save_schedule(self, tasks, resident_id=DEFAULT_RESIDENT):
+        with self.lock:
+            self.shard(resident_id).schedule_log.save(tasks)
+
+    def load_custom_reminders(self, resident_id=DEFAULT_RESIDENT):
+        with self.lock:
+            return self.shard(resident_id).custom_reminders_log.load()
+
+    def save_custom_reminders(self, reminders, resident_id=DEFAULT_RESIDENT):
+        with self.lock:
+            self.shard(resident_id).custom_reminders_log.save(reminders)
+
+    # Changes whenever a schedule or reminder file or its log is written, by this process or another
+    def reminders_version(self, resident_id=DEFAULT_RESIDENT):
+        shard = self.shard(resident_id)
+        return shard.schedule_log.version() + shard.custom_reminders_log.version()
+
+    def close(self):
+        with self.lock:
+            for shard in self.shards.values():
+                shard.health_log.close()
+                shard.activity_log.close()
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS health (
+    id INTEGER PRIMARY KEY,
+    resident_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS health_resident_ts ON health (resident_id, ts);
+CREATE INDEX IF NOT EXISTS health_resident_id ON health (resident_id, id);
+CREATE TABLE IF NOT EXISTS activity (
+    id INTEGER PRIMARY KEY,
+    resident_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS activity_resident_ts ON activity (resident_id, ts);
+CREATE INDEX IF NOT EXISTS activity_resident_id ON activity (resident_id, id);
+CREATE TABLE IF NOT EXISTS schedule (
+    id INTEGER PRIMARY KEY,
+    resident_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS schedule_resident_kind ON schedule (resident_id, kind);
+"""
+
+
+# Storage engine backed by SQLite in WAL mode with one connection per thread.
+# Cursors are row ids. shared: other processes write to the same file, so
+# versions come from the file rather than this process's write counters.
+class SqliteStorage(VersionedStorage):
+    name = "sqlite"
+
+    def __init__(self, db_file, shared=False):
+        super().__init__()
+        self.db_file = db_file
+        self.shared = shared
+        self.local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _append(self, table, entries, resident_id):
+        now = time.time()
+        rows = [(resident_id, entry.get("ts", now), json.dumps(entry)) for entry in entries]
+        with self._conn() as conn:
+            conn.executemany(f"INSERT INTO {table} (resident_id, ts, data) VALUES (?, ?, ?)", rows)
+            cursor = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        self._bump(table, resident_id)
+        return cursor
+
+    def _recent(self, table, n, resident_id):
+        rows = self._conn().execute(
+            f"SELECT data FROM {table} WHERE resident_id = ? ORDER BY ts DESC, id DESC LIMIT ?",
+            (resident_id, n),
+        ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def _cursor(self, table, resident_id):
+        row = self._conn().execute(f"SELECT MAX(id) FROM {table} WHERE resident_id = ?", (resident_id,)).fetchone()
+        return row[0] or 0
+
+    # Up to limit of the oldest rows after cursor, and the id of the last one
+    def _since(self, table, cursor, limit, resident_id):
+        rows = self._conn().execute(
+            f"SELECT id, data FROM {table} WHERE resident_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (resident_id, cursor, limit),
+        ).fetchall()
+        if not rows:
+            return [], self._cursor(table, resident_id)
+        return [json.loads(data) for _, data in rows], rows[-1][0]
+
+    def version(self, kind, resident_id=DEFAULT_RESIDENT):
+        if self.shared:
+            return self._cursor(kind, resident_id)
+        return super().version(kind, resident_id)
+
+    def health_cursor(self, resident_id=DEFAULT_RESIDENT):
+        return self._cursor("health", resident_id)
+
+    def health_since(self, cursor, limit=100, resident_id=DEFAULT_RESIDENT):
+        return self._since("health", cursor, limit, resident_id)
+
+    def activity_cursor(self, resident_id=DEFAULT_RESIDENT):
+        return self._cursor("activity", resident_id)
+
+    def activity_since(self, cursor, limit=100, resident_id=DEFAULT_RESIDENT):
+        return self._since("activity", cursor, limit, resident_id)
+
+    # Writes return the cursor of the last record written
+    def append_health(self, entry, resident_id=DEFAULT_RESIDENT):
+        return self._append("health", [entry], resident_id)
+
+    def append_health_many(self, entries, resident_id=DEFAULT_RESIDENT):
+        return self._append("health", entries, resident_id)
+
+    def recent_health(self, n=5, resident_id=DEFAULT_RESIDENT):
+        return self._recent("health", n, resident_id)
+
+    def iter_health(self, resident_id=DEFAULT_RESIDENT, since=None, until=None):
+        sql = "SELECT data FROM health WHERE resident_id = ?"
+        params = [resident_id]
+        for clause, value in (("id > ?", since), ("id <= ?", until)):
+            if value is not None:
+                sql += f" AND {clause}"
+                params.append(value)
+        cursor = self._conn().execute(sql + " ORDER BY ts, id", params)
+        for row in cursor:
+            yield json.loads(row[0])
+
+    def count_health(self, resident_id=DEFAULT_RESIDENT):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM health WHERE resident_id = ?", (resident_id,)
+        ).fetchone()[0]
+
+    def append_activity(self, entry, resident_id=DEFAULT_RESIDENT):
+        return self._append("activity", [entry], resident_id)
+
+    def recent_activity(self, n=5, resident_id=DEFAULT_RESIDENT):
+        return self._recent("activity", n, resident_id)
+
+    def iter_activity(self, resident_id=DEFAULT_RESIDENT):
+        cursor = self._conn().execute(
+            "SELECT data FROM activity WHERE resident_id = ? ORDER BY ts, id", (resident_id,)
+        )
+        for row in cursor:
+            yield json.loads(row[0])
+
+    # Entries of kind logged on day (a date, in local time). Rows written
+    # before entries had a kind are checked after decoding.
+    def count_activity(self, day, kind, resident_id=DEFAULT_RESIDENT):
+        start = time.mktime(day.timetuple())
+        end = time.mktime((day + timedelta(days=1)).timetuple())
+        conn = self._conn()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM activity WHERE resident_id = ? AND ts >= ? AND ts < ? AND json_extract(data, '$.kind') = ?",
+            (resident_id, start, end, kind),
+        ).fetchone()[0]
+        for (data,) in conn.execute(
+            "SELECT data FROM activity WHERE resident_id = ? AND ts >= ? AND ts < ? AND json_extract(data, '$.kind') IS NULL",
+            (resident_id, start, end),
+        ):
+            count += ActivityEvent.from_dict(json.loads(data)).kind == kind
+        return count
+
+    # One page of activity between start and end, newest first, before the
+    # row id `before`; returns the page and the next `before`, or None.
+    # Rows written before entries had a kind are checked after decoding.
+    def query_activity(self, start=None, end=None, kinds=None, priorities=None, before=None, limit=100,
+                       resident_id=DEFAULT_RESIDENT):
+        sql = "SELECT id, data FROM activity WHERE resident_id = ?"
+        params = [resident_id]
+        for clause, value in (("ts >= ?", start), ("ts < ?", end), ("id < ?", before)):
+            if value is not None:
+                sql += f" AND {clause}"
+                params.append(value)
+        if kinds:
+            sql += f" AND (json_extract(data, '$.kind') IS NULL OR json_extract(data, '$.kind') IN ({', '.join('?' * len(kinds))}))"
+            params.extend(kinds)
+        sql += " ORDER BY id DESC"
+        page = []
+        for row_id, data in self._conn().execute(sql, params):
+            entry = json.loads(data)
+            event = ActivityEvent.from_dict(entry)
+            if (kinds and event.kind not in kinds) or (priorities and event.priority not in priorities):
+                continue
+            page.append(dict(entry, seq=row_id))
+            if len(page) >= limit:
+                return page, row_id
+        return page, None
+
+    def _load_list(self, kind, resident_id):
+        rows = self._conn().execute(
+            "SELECT data FROM schedule WHERE resident_id = ? AND kind = ? ORDER BY id",
+            (resident_id, kind),
+        ).fetchall()
+        return [reminder_store.loads(row[0]) for row in rows]
+
+    def _save_list(self, kind, items, resident_id):
+        rows = [(resident_id, kind, reminder_store.dumps(item)) for item in items]
+        with self._conn() as conn:
+            conn.execute("DELETE FROM schedule WHERE resident_id = ? AND kind = ?", (resident_id, kind))
+            conn.executemany("INSERT INTO schedule (resident_id, kind, data) VALUES (?, ?, ?)", rows)
+
+    def load_schedule(self, resident_id=DEFAULT_RESIDENT):
+        return self._load_list("schedule", resident_id)
+
+    def save_schedule(self, tasks, resident_id=DEFAULT_RESIDENT):
+        self._save_list("schedule", tasks, resident_id)
+
+    def load_custom_reminders(self, resident_id=DEFAULT_RESIDENT):
+        return self._load_list("custom_reminder", resident_id)
+
+    def save_custom_reminders(self, reminders, resident_id=DEFAULT_RESIDENT):
+        self._save_list("custom_reminder", reminders, resident_id)
+
+    # Every save deletes and re-inserts rows, so the highest row id moves on each change
+    def reminders_version(self, resident_id=DEFAULT_RESIDENT):
+        return self._conn().execute(
+            "SELECT MAX(id), COUNT(*) FROM schedule WHERE resident_id = ?", (resident_id,)
+        ).fetchone()
+
+    def residents(self):
+        rows = self._conn().execute(
+            "SELECT resident_id FROM health UNION SELECT resident_id FROM activity "
+            "UNION SELECT resident_id FROM schedule"
+        ).fetchall()
+        return sorted({DEFAULT_RESIDENT} | {row[0] for row in rows})
+
+    def is_empty(self):
+        conn = self._conn()
+        return all(
+            conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+            for table in ("health", "activity", "schedule")
+        )
+
+    def import_from(self, other):
+        for resident_id in other.residents():
+            batch = []
+            for entry in other.iter_health(resident_id):
+                batch.append(entry)
+                if len(batch) >= 10000:
+                    self.append_health_many(batch, resident_id)
+                    batch = []
+            if batch:
+                self.append_health_many(batch, resident_id)
+            self._append("activity", list(other.iter_activity(resident_id)), resident_id)
+            self.save_schedule(other.load_schedule(resident_id) or [], resident_id)
+            self.save_custom_reminders(other.load_custom_reminders(resident_id) or [], resident_id)
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+STORAGE_BACKENDS = ("json", "sqlite")
+
+
+# shared: other processes use the same files at the same time (SQLite only)
+def open_storage(backend, health_log_dir, activity_dir, schedule_file, custom_reminders_file, db_file,
+                 residents_dir="logs/residents", shared=False):
+    if backend == "sqlite":
+        return SqliteStorage(db_file, shared)
+    if shared:
+        raise ValueError("Only the sqlite storage backend can be shared by several processes")
+    if backend == "json":
+        return JsonStorage(health_log_dir, activity_dir, schedule_file, custom_reminders_file, residents_dir)
+    raise ValueError(f"Unknown storage backend: {backend} (expected one of {', '.join(STORAGE_BACKENDS)})")
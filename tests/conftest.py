@@ -0,0 +1,44 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# The app keeps its logs/ relative to the working directory and is imported
+# once per test run, so it runs from one temporary directory throughout
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("app")
+    os.makedirs(directory / "logs")
+    cwd = os.getcwd()
+    os.chdir(directory)
+    os.environ["VOICE_ENABLED"] = "0"
+    try:
+        yield importlib.import_module("app")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+# Every storage engine, each in its own temporary directory
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    from storage import JsonStorage, SqliteStorage
+
+    if request.param == "json":
+        store = JsonStorage(
+            str(tmp_path / "health_log"), str(tmp_path / "activity_log"), str(tmp_path / "schedule.json"),
+            str(tmp_path / "custom_reminders.json"), str(tmp_path / "residents"),
+        )
+    else:
+        store = SqliteStorage(str(tmp_path / "elderly_care.db"))
+    yield store
+    store.close()
@@ -0,0 +1,42 @@
+# A JSON array body has no resident field; it goes to the session's resident
+def test_ingest_accepts_json_array(client):
+    response = client.post("/api/ingest?resident=arr", json=[[90, 130, 85, 110], [80, 120, 80, 100]])
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.json["accepted"] == 2
+    response = client.post("/api/ingest", json=[{"heart_rate": 90, "bp_systolic": 130, "bp_diastolic": 85, "glucose": 110}])
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.json["accepted"] == 1
+
+
+def test_sensors_accept_json_array(client):
+    events = [
+        {"heart_rate": 90, "bp_systolic": 130, "bp_diastolic": 85, "glucose": 110},
+        {"type": "activity"},
+    ]
+    response = client.post("/api/sensors", json=events)
+    assert response.status_code == 202, response.get_data(as_text=True)
+    assert response.json["accepted"] == 2
+
+
+# Out-of-range numbers and booleans are rejected per reading, not a 500
+def test_ingest_rejects_overflow_and_booleans(client):
+    body = '[[1e400, 120, 80, 100], [Infinity, 120, 80, 100], [true, 120, 80, 100], [90, 130, 85, 110, true]]'
+    response = client.post("/api/ingest?resident=arr", data=body, content_type="application/json")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert (response.json["status"], response.json["accepted"], response.json["rejected"]) == ("error", 0, 4)
+    response = client.post("/api/ingest?resident=arr", data='[[1e400, 120, 80, 100], [90, 130, 85, 110]]',
+                           content_type="application/json")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert (response.json["accepted"], response.json["rejected"]) == (1, 1)
+
+
+def test_sensor_event_rejects_json_array(client):
+    response = client.post("/api/sensor_event", json=[{"type": "fall"}])
+    assert response.status_code == 400, response.get_data(as_text=True)
+    assert client.post("/api/sensor_event", json={"type": "activity"}).status_code == 202
+
+
+def test_chat_rejects_json_array(client):
+    assert client.post("/api/chat", json=["x"]).status_code == 400
+    assert client.post("/api/chat", json={"message": "hi", "since": 1e400}).status_code == 400
+    assert client.get("/api/chat?since=abc").status_code == 400
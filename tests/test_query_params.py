@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.mark.parametrize("query", ["from=nan", "to=inf", "from=-Infinity"])
+def test_trends_reject_non_finite_times(client, query):
+    response = client.get(f"/api/health/trends?{query}")
+    assert response.status_code == 400, response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("query", ["from=nan", "to=1e400", "to=1e300", "from=-5", "from=9999-01-01"])
+def test_activity_history_rejects_bad_times(client, query):
+    response = client.get(f"/api/activity/history?{query}")
+    assert response.status_code == 400, response.get_data(as_text=True)
+
+
+def test_activity_history_accepts_dates(client):
+    response = client.get("/api/activity/history?from=2020-01-01&to=1900000000")
+    assert response.status_code == 200, response.get_data(as_text=True)
@@ -0,0 +1,108 @@
+import os
+from datetime import datetime
+
+from journal import ActivityJournal
+from reminder_store import ReminderLog
+from storage import JsonLinesLog
+
+
+def tear_last_line(path, nbytes=4):
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - nbytes)
+
+
+def segment_files(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+
+def test_health_log_append_after_torn_tail(tmp_path):
+    log = JsonLinesLog(str(tmp_path / "health_log"))
+    log.extend([{"i": i} for i in range(5)])
+    log.close()
+    tear_last_line(segment_files(str(tmp_path / "health_log"))[-1])
+
+    log = JsonLinesLog(str(tmp_path / "health_log"))
+    assert len(log) == 4
+    assert log.append({"i": 99}) == 5
+    log.close()
+
+    log = JsonLinesLog(str(tmp_path / "health_log"))
+    assert [record["i"] for record in log] == [0, 1, 2, 3, 99]
+    assert len(log) == 5
+    assert log.tail(2) == [{"i": 3}, {"i": 99}]
+    log.close()
+
+
+# A crash can leave an older segment without its footer; it is closed on the
+# next open, and the footer must not be joined to a torn last line
+def test_health_log_closes_torn_older_segment(tmp_path):
+    directory = tmp_path / "health_log"
+    directory.mkdir()
+    (directory / "segment-000001.jsonl").write_bytes(b'{"i": 0}\n{"i": 1}\n{"i": 2}\n{"i"')
+    (directory / "segment-000002.jsonl").write_bytes(b"")
+
+    log = JsonLinesLog(str(directory))
+    assert len(log) == 3
+    log.append({"i": 99})
+    log.close()
+
+    log = JsonLinesLog(str(directory))
+    assert [record["i"] for record in log] == [0, 1, 2, 99]
+    assert len(log) == 4
+    assert log.tail(2) == [{"i": 2}, {"i": 99}]
+    log.close()
+
+
+def test_activity_journal_append_after_torn_tail(tmp_path):
+    directory = str(tmp_path / "activity_log")
+    journal = ActivityJournal(directory)
+    for i in range(5):
+        journal.append({"ts": 1700000000 + i, "i": i})
+    journal.release()
+    tear_last_line(os.path.join(directory, "segment-000001.jsonl"))
+
+    journal = ActivityJournal(directory)
+    assert journal.cursor() == 4
+    assert journal.append({"ts": 1700000100, "i": 99}) == 5
+    journal.release()
+
+    journal = ActivityJournal(directory)
+    entries, cursor = journal.since(0, 10)
+    assert [(entry["seq"], entry["i"]) for entry in entries] == [(1, 0), (2, 1), (3, 2), (4, 3), (5, 99)]
+    assert cursor == 5
+    journal.release()
+
+
+def reminders(n, dose=1):
+    return [{"time": datetime(2030, 1, 1, 8, i), "message": f"pill {i} x{dose}"} for i in range(n)]
+
+
+def test_reminder_log_replays_up_to_a_torn_save(tmp_path):
+    file = str(tmp_path / "custom_reminders.json")
+    log = ReminderLog(file, compact_after=100)
+    for n in range(1, 5):
+        log.save(reminders(n))
+    with open(log.wal_file, "a") as f:
+        f.write('[{"set": 4, "item"')  # the fifth save never finished
+
+    assert ReminderLog(file).load() == reminders(4)
+    # Loading folded the log into the snapshot, so later saves start clean
+    log = ReminderLog(file)
+    log.save(reminders(2))
+    assert ReminderLog(file).load() == reminders(2)
+
+
+# A crash after the snapshot was renamed into place but before the log was
+# emptied replays the same saves over the new snapshot
+def test_reminder_log_replays_over_compacted_snapshot(tmp_path):
+    file = str(tmp_path / "custom_reminders.json")
+    log = ReminderLog(file, compact_after=100)
+    for dose, n in enumerate([3, 5, 2, 4, 3]):
+        log.save(reminders(n, dose))
+    with open(log.wal_file) as f:
+        saves = f.read()
+    log.compact()
+    with open(log.wal_file, "w") as f:
+        f.write(saves)
+
+    assert ReminderLog(file).load() == reminders(3, 4)
@@ -0,0 +1,71 @@
+from records import HealthReading
+from recent import RecentCache
+
+
+def reading(i):
+    return {"ts": 1700000000 + i, "heart_rate": 60 + i % 40, "systolic": 120, "diastolic": 80, "glucose": i}
+
+
+# Every record after the cursor, following the returned cursor a page at a time
+def page_through(since, cursor, limit):
+    seen = []
+    while True:
+        records, cursor = since(cursor, limit)
+        if not records:
+            return seen, cursor
+        assert len(records) <= limit
+        seen.extend(records)
+
+
+def test_health_since_pages_through_every_record(storage):
+    for start in range(0, 350, 50):
+        storage.append_health_many([reading(i) for i in range(start, start + 50)], "r1")
+        storage.append_health(reading(1000 + start), "r2")  # interleaved rows of another resident
+    seen, cursor = page_through(lambda c, n: storage.health_since(c, n, "r1"), 0, 100)
+    assert [entry["glucose"] for entry in seen] == list(range(350))
+    assert cursor == storage.health_cursor("r1")
+
+    # From a cursor part way through, only what follows
+    _, middle = storage.health_since(0, 120, "r1")
+    seen, _ = page_through(lambda c, n: storage.health_since(c, n, "r1"), middle, 100)
+    assert [entry["glucose"] for entry in seen] == list(range(120, 350))
+
+
+def test_activity_since_pages_through_every_record(storage):
+    for i in range(250):
+        storage.append_activity({"ts": 1700000000 + i, "activity": f"event {i}", "kind": "other"}, "r1")
+    seen, cursor = page_through(lambda c, n: storage.activity_since(c, n, "r1"), 0, 100)
+    assert [entry["activity"] for entry in seen] == [f"event {i}" for i in range(250)]
+    assert cursor == storage.activity_cursor("r1")
+
+
+def test_recent_cache_since_returns_oldest_first():
+    cache = RecentCache(size=50)
+    cache.load("health", [], 0, "r1")
+    cache.extend("health", [HealthReading.from_dict(reading(i)) for i in range(30)], 1, "r1")
+    records, cursor = cache.since("health", 0, limit=10, resident_id="r1")
+    assert [record.glucose for record in records] == list(range(10))
+    assert cursor == 10
+    records, cursor = cache.since("health", cursor, limit=100, resident_id="r1")
+    assert [record.glucose for record in records] == list(range(10, 30))
+    assert cursor == 30
+
+
+# Polling /api/health with the X-Cursor it returns sees every reading once,
+# even when the client is further behind than one page
+def test_health_polling_misses_nothing(client):
+    first = client.get("/api/health?resident=pager")
+    cursor = first.headers["X-Cursor"]
+    body = "\n".join(
+        f'{{"heart_rate": {60 + i % 40}, "bp_systolic": 120, "bp_diastolic": 80, "glucose": {i + 1}}}' for i in range(250)
+    )
+    response = client.post("/api/ingest?resident=pager", data=body, content_type="application/x-ndjson")
+    assert response.json["accepted"] == 250
+    seen = []
+    while True:
+        response = client.get(f"/api/health?resident=pager&since={cursor}")
+        cursor = response.headers["X-Cursor"]
+        if not response.json:
+            break
+        seen.extend(entry["glucose"] for entry in response.json)
+    assert seen == list(range(1, 251))
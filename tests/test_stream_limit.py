@@ -0,0 +1,17 @@
+import threading
+
+
+# Streams past SSE_MAX_STREAMS get a 503, and a closed stream frees its slot
+def test_stream_cap(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "_stream_slots", threading.BoundedSemaphore(2))
+    streams = [client.get("/api/stream", buffered=False) for _ in range(2)]
+    assert [response.status_code for response in streams] == [200, 200]
+    refused = client.get("/api/stream")
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"]
+    streams.pop().close()
+    again = client.get("/api/stream", buffered=False)
+    assert again.status_code == 200
+    again.close()
+    for response in streams:
+        response.close()
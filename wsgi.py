@@ -0,0 +1,38 @@
+# Entry point for serving the app from several worker processes:
+#
+#   gunicorn --workers 4 --threads 8 --bind 0.0.0.0:5000 wsgi:application
+#
+# The workers share the SQLite store (STORAGE_BACKEND defaults to sqlite here;
+# the JSON backend is for a single process) and each stores what it receives.
+# One of them is elected leader and runs the monitoring engine, reminders,
+# alerts, audio and chat for all of them; see app.start_worker. Every open
+# /api/stream connection holds one of a worker's --threads, so each worker
+# takes at most SSE_MAX_STREAMS of them (default 4, half of --threads 8) and
+# turns further dashboards away to poll; raise both together. Do not use
+# --preload: every worker must import the app after it is forked to take part
+# in the election.
+#
+#   python wsgi.py [--port 5001]
+#
+# serves one worker on Werkzeug's threaded server instead, e.g. several side by
+# side on different ports as benchmarks/worker_stress.py does.
+import argparse
+import os
+
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SSE_MAX_STREAMS", "4")
+os.environ["MULTI_PROCESS"] = "1"
+
+import app  # noqa: E402
+
+app.start_worker()
+application = app.app
+
+if __name__ == "__main__":
+    from werkzeug.serving import run_simple
+
+    parser = argparse.ArgumentParser(description="Serve one worker of a multi-process deployment")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+    run_simple(args.host, args.port, application, threaded=True)